@@ -68,42 +68,42 @@ for freq, desc in frequencias.items():
 print("\n2. CRIANDO SÉRIE TEMPORAL DE DADOS")
 print("-" * 40)
 
+# Perfis sazonais como tabelas de consulta: fator por dia da semana
+# (seg=0 ... dom=6) e por hora do dia (picos às 12h e 18h)
+PERFIL_SEMANAL = np.array([1.3] * 5 + [0.7] * 2)
+PERFIL_HORARIO = np.array([0.3] * 7 + [1.0] * 2 + [1.5] * 3 + [2.0] * 2
+                          + [1.5] * 3 + [2.0] * 3 + [1.0] * 4)
+
+
+def gerar_series_sinteticas(datas, n_series=1, niveis=100, crescimento=0.2, ruido=0.2,
+                            posicao_inicial=0, total=None, rng=np.random):
+    """Matriz (len(datas), n_series) de valores sintéticos, sem laço por elemento
+
+    valor = nível × perfil semanal × perfil horário × tendência × ruído, tudo
+    por broadcasting: os fatores de tempo são vetores (n, 1) e os níveis das
+    séries um vetor (n_series,). posicao_inicial/total situam um bloco dentro
+    de uma série maior, para a tendência continuar entre blocos.
+    """
+    datas = pd.DatetimeIndex(datas)
+    total = total or len(datas)
+    posicao = posicao_inicial + np.arange(len(datas))
+
+    fator_tempo = (PERFIL_SEMANAL[datas.dayofweek]
+                   * PERFIL_HORARIO[datas.hour]
+                   * (1 + (posicao / total) * crescimento))
+    niveis = np.broadcast_to(np.asarray(niveis, dtype=float), (n_series,))
+    valores = niveis * fator_tempo[:, None] * rng.normal(1, ruido, (len(datas), n_series))
+    return np.maximum(valores, 0)  # Não permitir valores negativos
+
+
 # Dados de vendas horárias por 30 dias
 np.random.seed(42)
 datas = pd.date_range(start='2024-01-01', periods=30*24, freq='H')
 
-# Simulando padrões realistas de vendas
-vendas_base = 100
-vendas = []
-
-for i, data in enumerate(datas):
-    # Padrão semanal (mais vendas em dias úteis)
-    fator_semana = 1.3 if data.weekday() < 5 else 0.7
-    
-    # Padrão diário (picos às 12h e 18h)
-    hora = data.hour
-    if 9 <= hora <= 11 or 14 <= hora <= 16:
-        fator_hora = 1.5
-    elif 12 <= hora <= 13 or 17 <= hora <= 19:
-        fator_hora = 2.0
-    elif 0 <= hora <= 6:
-        fator_hora = 0.3
-    else:
-        fator_hora = 1.0
-    
-    # Tendência de crescimento
-    fator_tendencia = 1 + (i / len(datas)) * 0.2
-    
-    # Ruído aleatório
-    ruido = np.random.normal(1, 0.2)
-    
-    venda = vendas_base * fator_semana * fator_hora * fator_tendencia * ruido
-    vendas.append(max(0, venda))  # Não permitir vendas negativas
-
-# Criando DataFrame
+# Uma série só: mesmos valores do antigo laço for com data.weekday()/data.hour
 df_vendas = pd.DataFrame({
     'data_hora': datas,
-    'vendas': vendas
+    'vendas': gerar_series_sinteticas(datas)[:, 0]
 })
 
 # Definindo índice temporal
@@ -114,6 +114,58 @@ print(f"Período: {df_vendas.index.min()} até {df_vendas.index.max()}")
 print("\nPrimeiros registros:")
 print(df_vendas.head())
 
+print("\n2.1 Painel de séries em blocos (uma série por servidor):")
+import time
+
+
+def gerar_painel_em_blocos(servidores, inicio, periodos, freq='min', pontos_por_bloco=5_000_000,
+                           semente=42, **kwargs):
+    """Gerar (datas, matriz tempo × servidor) bloco a bloco
+
+    A série inteira nunca fica em memória: cada bloco tem no máximo
+    pontos_por_bloco valores, então 10^9 pontos saem em algumas centenas de
+    blocos de ~40 MB. Cada servidor tem seu próprio nível base.
+    """
+    rng = np.random.default_rng(semente)
+    niveis = rng.uniform(50, 150, len(servidores))
+    passo = pd.tseries.frequencies.to_offset(freq)
+    linhas_por_bloco = max(1, pontos_por_bloco // len(servidores))
+    for posicao in range(0, periodos, linhas_por_bloco):
+        n = min(linhas_por_bloco, periodos - posicao)
+        datas_bloco = pd.date_range(pd.Timestamp(inicio) + posicao * passo, periods=n, freq=freq)
+        yield datas_bloco, gerar_series_sinteticas(datas_bloco, len(servidores), niveis=niveis,
+                                                   posicao_inicial=posicao, total=periodos,
+                                                   rng=rng, **kwargs)
+
+
+# Nomes no padrão de metricas_performance.csv, em escala de frota
+servidores = [f"srv-{tipo}-{i:04d}" for tipo in ('web', 'api', 'db', 'cache') for i in range(1, 501)]
+periodos = 14 * 24 * 60  # duas semanas por minuto
+
+inicio = time.perf_counter()
+soma = np.zeros(len(servidores))
+pontos = 0
+blocos = 0
+for datas_bloco, valores in gerar_painel_em_blocos(servidores, '2024-01-01', periodos):
+    soma += valores.sum(axis=0)
+    pontos += valores.size
+    blocos += 1
+duracao = time.perf_counter() - inicio
+
+print(f"{len(servidores):,} servidores × {periodos:,} minutos = {pontos:,} pontos "
+      f"em {blocos} blocos, {duracao:.2f}s ({pontos / duracao / 1e6:.0f} M pontos/s)")
+print(f"Estimativa para 10^9 pontos: {1e9 / (pontos / duracao):.0f}s")
+media_servidor = pd.Series(soma / periodos, index=servidores)
+print("Média por tipo de servidor:")
+print(media_servidor.groupby(media_servidor.index.str.split('-').str[1]).mean().round(1))
+
+# Formato longo (data_hora, servidor, valor), como em metricas_performance.csv
+datas_bloco, valores = next(gerar_painel_em_blocos(servidores[:3], '2024-01-01', 3))
+df_painel = pd.DataFrame(valores, index=datas_bloco, columns=servidores[:3])
+df_longo = df_painel.rename_axis('data_hora').reset_index().melt(
+    id_vars='data_hora', var_name='servidor', value_name='valor')
+print(df_longo.round(1))
+
 # 3. EXPLORANDO COMPONENTES TEMPORAIS
 print("\n3. COMPONENTES TEMPORAIS")
 print("-" * 30)
@@ -224,6 +276,7 @@ print("-" * 30)
 
 # Tendência usando regressão linear simples
 from scipy import stats
+import time
 
 def calcular_tendencia(series, janela=24*7):  # Janela de 1 semana
     """Calcular tendência usando regressão linear"""
@@ -234,10 +287,81 @@ def calcular_tendencia(series, janela=24*7):  # Janela de 1 semana
     slope, intercept, r_value, p_value, std_err = stats.linregress(x, series)
     return slope
 
-# Tendência móvel
-df_vendas['tendencia'] = df_vendas['vendas'].rolling(window=24*7).apply(
+def regressao_movel(series, janela, min_periods=None, unidade_tempo='1h'):
+    """Regressão linear (slope, intercept, r²) em cada janela móvel, em O(n)
+    
+    Em vez de um linregress por janela (O(n·w)), usa somas móveis de x, y,
+    x², xy e y² (rolling().sum() do pandas, com soma compensada) e as
+    fórmulas fechadas de mínimos quadrados.
+    
+    - janela: número de linhas (x = posição da linha) ou offset temporal
+      como '7D' (x = tempo decorrido em unidade_tempo; exige índice de datas)
+    - NaN são ignorados; janelas com menos de min_periods valores válidos
+      (padrão: a janela inteira, ou 2 para janelas temporais) ficam NaN
+    - intercept: valor da reta na primeira linha da janela (x = 0), como no
+      linregress de calcular_tendencia
+    """
+    y = series.astype(float)
+    valido = y.notna()
+    temporal = not isinstance(janela, (int, np.integer))
+    if temporal:
+        x = (series.index - series.index[0]) / pd.Timedelta(unidade_tempo)
+        x = np.asarray(x, dtype=float)
+        # Primeira linha dentro de (t - janela, t]
+        primeira = np.searchsorted(series.index, series.index - pd.Timedelta(janela), side='right')
+        min_periods = 2 if min_periods is None else min_periods
+    else:
+        x = np.arange(len(series), dtype=float)
+        primeira = np.maximum(np.arange(len(series)) - janela + 1, 0)
+        min_periods = janela if min_periods is None else min_periods
+    # Centralizar x reduz a magnitude das somas (menos cancelamento numérico)
+    x = x - x.mean() if len(x) else x
+    
+    xs = pd.Series(x, index=series.index).where(valido)
+    somar = lambda s: s.rolling(janela, min_periods=1).sum()
+    n = somar(valido.astype(float))
+    sx, sy = somar(xs), somar(y)
+    sxx, sxy, syy = somar(xs * xs), somar(xs * y), somar(y * y)
+    
+    media_x, media_y = sx / n, sy / n
+    var_x = (sxx - sx * media_x).clip(lower=0)
+    var_y = (syy - sy * media_y).clip(lower=0)
+    cov = sxy - sx * media_y
+    
+    slope = cov / var_x.where(var_x > 0)
+    intercept = media_y - slope * (media_x - x[primeira])
+    r2 = cov ** 2 / (var_x * var_y).where((var_x > 0) & (var_y > 0))
+    
+    resultado = pd.DataFrame({'slope': slope, 'intercept': intercept, 'r2': r2.clip(upper=1)})
+    return resultado.where(n >= max(min_periods, 2))
+
+# Tendência móvel: O(n·w) com rolling().apply vs O(n) com somas móveis
+inicio = time.perf_counter()
+tendencia_apply = df_vendas['vendas'].rolling(window=24*7).apply(
     calcular_tendencia, raw=False
 )
+tempo_apply = time.perf_counter() - inicio
+
+inicio = time.perf_counter()
+regressao = regressao_movel(df_vendas['vendas'], janela=24*7)
+tempo_somas = time.perf_counter() - inicio
+df_vendas['tendencia'] = regressao['slope']
+
+print(f"rolling().apply(linregress): {tempo_apply*1000:.1f} ms | somas móveis: {tempo_somas*1000:.1f} ms")
+print(f"Diferença máxima entre os slopes: {(tendencia_apply - df_vendas['tendencia']).abs().max():.2e}")
+
+# Janela temporal: (t - 7 dias, t], com x em horas
+regressao_7d = regressao_movel(df_vendas['vendas'], janela='7D', min_periods=24)
+print(f"Janela '7D': slope atual {regressao_7d['slope'].iloc[-1]:.4f}/h, R² {regressao_7d['r2'].iloc[-1]:.3f}")
+
+# Escala: 1 ano de métricas por minuto com janela de 1 semana (10.080 pontos por janela)
+rng_minutos = np.random.default_rng(8)
+serie_minutos = pd.Series(rng_minutos.normal(0, 1, 525_600).cumsum(),
+                          index=pd.date_range('2024-01-01', periods=525_600, freq='min'))
+inicio = time.perf_counter()
+regressao_minutos = regressao_movel(serie_minutos, janela='7D')
+print(f"1 ano por minuto ({len(serie_minutos):,} pontos), janela de 7 dias: "
+      f"{time.perf_counter() - inicio:.2f}s")
 
 print("Análise de tendência:")
 print(f"Tendência média: {df_vendas['tendencia'].mean():.4f}")
@@ -340,13 +464,106 @@ print("\n12. CORRELAÇÃO TEMPORAL")
 print("-" * 30)
 
 # Autocorrelação (correlação com valores anteriores)
+# Em vez de um series.corr(series.shift(lag)) por lag (uma passada e uma
+# cópia deslocada para cada lag), todas as somas por lag saem de
+# correlações cruzadas via FFT: O(n log n) para todos os lags de uma vez
+from scipy import fft as sp_fft
+
+
+def _correlacao_cruzada_fft(a, b, max_lag):
+    """Somas Σ_t a[t] · b[t + lag] para lag = 0..max_lag, coluna a coluna (eixo 0)"""
+    n = a.shape[0]
+    # Preenchimento com zeros evita a correlação circular nos lags usados
+    tamanho = sp_fft.next_fast_len(n + max_lag, real=True)
+    fa = sp_fft.rfft(a, tamanho, axis=0)
+    fb = fa if b is a else sp_fft.rfft(b, tamanho, axis=0)
+    return sp_fft.irfft(np.conj(fa) * fb, tamanho, axis=0)[:max_lag + 1]
+
+
+def autocorrelacao_fft(valores, max_lag=None, metodo='pearson'):
+    """ACF de todos os lags 0..max_lag para uma série ou um painel (n, séries)
+
+    - metodo='pearson': o mesmo que series.corr(series.shift(lag)), ou seja,
+      correlação de Pearson dos pares sobrepostos com médias e desvios de cada
+      trecho, ignorando pares com NaN. O arredondamento da FFT é relativo à
+      energia da série inteira: trechos constantes dão NaN, como no pandas,
+      mas trechos com variância abaixo de ~1e-14 da energia também dão NaN,
+      e trechos pouco acima disso perdem dígitos em relação ao pandas
+    - metodo='padrao': ACF clássica (autocovariância com a média global e
+      divisor n); é a que entra na PACF. NaN é tratado como a média
+
+    Retorna um array (max_lag + 1,) para 1-D ou (max_lag + 1, séries) para 2-D.
+    """
+    valores = np.asarray(valores, dtype=float)
+    unidimensional = valores.ndim == 1
+    if unidimensional:
+        valores = valores[:, None]
+    n = valores.shape[0]
+    max_lag = n - 1 if max_lag is None else min(max_lag, n - 1)
+    if metodo not in ('pearson', 'padrao'):
+        raise ValueError(f"Método inválido: {metodo}")
+
+    # Centralizar pela média reduz o cancelamento numérico nas somas
+    # (média calculada à mão: colunas só com NaN não geram aviso)
+    validos = ~np.isnan(valores)
+    x = np.where(validos, valores, 0.0)
+    x = np.where(validos, x - x.sum(axis=0) / np.maximum(validos.sum(axis=0), 1), 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if metodo == 'padrao':
+            autocov = _correlacao_cruzada_fft(x, x, max_lag)
+            acf = autocov / autocov[0]
+        else:
+            m = validos.astype(float)
+            x2 = x * x
+            # Pares (t, t + lag) válidos: contagem, somas e somas de quadrados
+            # de cada lado, e a soma dos produtos
+            pares = np.rint(_correlacao_cruzada_fft(m, m, max_lag))
+            soma_a = _correlacao_cruzada_fft(x, m, max_lag)
+            soma_b = _correlacao_cruzada_fft(m, x, max_lag)
+            quad_a = _correlacao_cruzada_fft(x2, m, max_lag)
+            quad_b = _correlacao_cruzada_fft(m, x2, max_lag)
+            produtos = _correlacao_cruzada_fft(x, x, max_lag)
+
+            cov = produtos - soma_a * soma_b / pares
+            var_a = quad_a - soma_a ** 2 / pares
+            var_b = quad_b - soma_b ** 2 / pares
+            # Um trecho constante tem variância zero, mas o arredondamento da
+            # FFT deixa um resíduo proporcional à energia da série: abaixo da
+            # tolerância a variância conta como zero e a correlação fica NaN
+            tolerancia = 1e-14 * quad_a[0]
+            acf = cov / np.sqrt(np.maximum(var_a, 0) * np.maximum(var_b, 0))
+            acf[(pares < 2) | (var_a <= tolerancia) | (var_b <= tolerancia)] = np.nan
+        acf = np.clip(acf, -1, 1)
+    return acf[:, 0] if unidimensional else acf
+
+
+def autocorrelacao_parcial(acf, max_lag=None):
+    """PACF pelos lags 1..max_lag a partir da ACF clássica (Durbin-Levinson)
+
+    Recebe a saída de autocorrelacao_fft(..., metodo='padrao'), 1-D ou 2-D;
+    a recursão é O(max_lag²), vetorizada entre as séries do painel.
+    """
+    acf = np.asarray(acf, dtype=float)
+    unidimensional = acf.ndim == 1
+    if unidimensional:
+        acf = acf[:, None]
+    max_lag = acf.shape[0] - 1 if max_lag is None else min(max_lag, acf.shape[0] - 1)
+
+    pacf = np.empty((max_lag, acf.shape[1]))
+    phi = np.zeros((0, acf.shape[1]))  # coeficientes AR(k - 1)
+    for k in range(1, max_lag + 1):
+        numerador = acf[k] - (phi * acf[k - 1:0:-1]).sum(axis=0)
+        denominador = 1 - (phi * acf[1:k]).sum(axis=0)
+        phi_kk = numerador / denominador
+        phi = np.vstack([phi - phi_kk * phi[::-1], phi_kk])
+        pacf[k - 1] = phi_kk
+    return pacf[:, 0] if unidimensional else pacf
+
+
 def calcular_autocorrelacao(series, lags=24):
     """Calcular autocorrelação para diferentes lags"""
-    autocorr = []
-    for lag in range(1, lags+1):
-        corr = series.corr(series.shift(lag))
-        autocorr.append(corr)
-    return autocorr
+    return list(autocorrelacao_fft(series.to_numpy(dtype=float), lags)[1:])
 
 autocorr_vendas = calcular_autocorrelacao(df_vendas['vendas'])
 print("Autocorrelação mais forte (top 5):")
@@ -354,6 +571,49 @@ for i, corr in enumerate(sorted(autocorr_vendas, reverse=True)[:5]):
     lag = autocorr_vendas.index(corr) + 1
     print(f"Lag {lag}h: {corr:.3f}")
 
+print("\n12.1 Autocorrelação parcial (vendas):")
+pacf_vendas = autocorrelacao_parcial(autocorrelacao_fft(df_vendas['vendas'], 24, metodo='padrao'))
+print(" ".join(f"{lag}h:{valor:+.2f}" for lag, valor in enumerate(pacf_vendas[:6], start=1)))
+
+print("\n12.2 Lags na casa dos milhares (um servidor, 4 semanas por minuto):")
+datas_minuto, valores_minuto = next(gerar_painel_em_blocos(['srv-web-01'], '2024-01-01', 28 * 24 * 60,
+                                                           pontos_por_bloco=10**9))
+serie_minuto = pd.Series(valores_minuto[:, 0], index=datas_minuto)
+
+lags_laco = 200
+inicio = time.perf_counter()
+acf_laco = [serie_minuto.corr(serie_minuto.shift(lag)) for lag in range(1, lags_laco + 1)]
+tempo_laco = time.perf_counter() - inicio
+
+lag_semanal = 7 * 24 * 60
+inicio = time.perf_counter()
+acf_minuto = autocorrelacao_fft(serie_minuto, lag_semanal)
+tempo_fft = time.perf_counter() - inicio
+
+print(f"Laço corr/shift: {lags_laco} lags em {tempo_laco:.2f}s "
+      f"(~{tempo_laco / lags_laco * lag_semanal:.0f}s para {lag_semanal:,} lags)")
+print(f"FFT: {lag_semanal:,} lags em {tempo_fft:.3f}s "
+      f"(diferença máxima: {np.abs(acf_minuto[1:lags_laco + 1] - acf_laco).max():.1e})")
+print(f"ACF no lag de 1 dia: {acf_minuto[24 * 60]:.3f}, de 1 semana: {acf_minuto[lag_semanal]:.3f}")
+
+print("\n12.3 ACF em lote para um painel de servidores:")
+servidores_painel = servidores[:500]
+datas_painel, painel = next(gerar_painel_em_blocos(servidores_painel, '2024-01-01', 14 * 24 * 60,
+                                                   pontos_por_bloco=10**9, semente=7))
+inicio = time.perf_counter()
+acf_painel = autocorrelacao_fft(painel, lag_semanal, metodo='padrao')
+tempo_painel = time.perf_counter() - inicio
+
+# Período dominante: maior pico da ACF depois que ela cruza o zero pela
+# primeira vez (antes disso é só a inércia de curto prazo da série)
+cruzou_zero = np.maximum.accumulate(acf_painel < 0, axis=0)
+periodo = np.argmax(np.where(cruzou_zero, acf_painel, -np.inf), axis=0)
+periodos_detectados = pd.Series(periodo).map(
+    lambda lag: '1 dia' if abs(lag - 1440) <= 5 else '1 semana' if abs(lag - lag_semanal) <= 5 else f"{lag} min")
+print(f"{painel.shape[1]} séries × {painel.shape[0]:,} pontos, {lag_semanal + 1:,} lags: {tempo_painel:.2f}s")
+print("Período dominante detectado:")
+print(periodos_detectados.value_counts().to_string())
+
 # 13. PREVISÃO SIMPLES
 print("\n13. PREVISÃO SIMPLES")
 print("-" * 25)
@@ -434,19 +694,25 @@ class AnalisadorSeriesTemporal:
         return self.resultados['sazonalidade']
     
     def calcular_tendencia(self, janela=24*7):
-        """Calcular tendência geral"""
+        """Calcular tendência geral e a móvel (janela em linhas ou offset como '7D')"""
         serie = self.df[self.coluna_valor].dropna()
-        if len(serie) < janela:
+        if isinstance(janela, int) and len(serie) < janela:
             return None
         
         x = np.arange(len(serie))
         slope, _, r_value, p_value, _ = stats.linregress(x, serie)
         
+        # Tendência por janela, em O(n), sobre a série original (NaN ignorados)
+        movel = regressao_movel(self.df[self.coluna_valor], janela).dropna()
+        
         self.resultados['tendencia'] = {
             'slope': slope,
             'r_squared': r_value**2,
             'p_value': p_value,
-            'significativa': p_value < 0.05
+            'significativa': p_value < 0.05,
+            'slope_recente': movel['slope'].iloc[-1] if len(movel) else np.nan,
+            'r_squared_recente': movel['r2'].iloc[-1] if len(movel) else np.nan,
+            'janelas_em_alta': (movel['slope'] > 0).mean() if len(movel) else np.nan
         }
         return self.resultados['tendencia']
     
@@ -475,6 +741,8 @@ class AnalisadorSeriesTemporal:
             print(f"\nTendência: {tend['slope']:.6f}")
             print(f"R²: {tend['r_squared']:.3f}")
             print(f"Significativa: {tend['significativa']}")
+            print(f"Tendência da última janela: {tend['slope_recente']:.6f} (R² {tend['r_squared_recente']:.3f})")
+            print(f"Janelas em alta: {tend['janelas_em_alta']:.1%}")
 
 # Usando o pipeline
 analisador = AnalisadorSeriesTemporal(df_vendas.reset_index(), 'vendas', 'data_hora')
@@ -44,7 +44,8 @@ def criar_dataset_grande(n_rows=100000):
         'valor': np.random.uniform(10, 10000, n_rows),
         'quantidade': np.random.randint(1, 100, n_rows),
         'data': pd.date_range('2020-01-01', periods=n_rows, freq='H'),
-        'descricao': [f'Produto {i}' for i in np.random.randint(1, 1000, n_rows)],
+        # Rótulos criados uma vez e indexados (evita uma f-string por linha)
+        'descricao': np.array([f'Produto {i}' for i in range(1000)], dtype=object)[np.random.randint(1, 1000, n_rows)],
         'ativo': np.random.choice([True, False], n_rows),
         'score': np.random.normal(50, 15, n_rows)
     }
@@ -56,6 +57,8 @@ def criar_dataset_grande(n_rows=100000):
 
 # Criando dataset de teste
 df_grande = criar_dataset_grande(100000)
+print("Para gerar 1e7-1e9 linhas em disco (chunks, partições em paralelo):")
+print("python benchmarks/gerador_dados.py vendas 1e9 --destino output/carga")
 
 # 2. MONITORAMENTO DE MEMÓRIA
 print("\n2. MONITORAMENTO DE MEMÓRIA")
@@ -144,6 +147,139 @@ df_otimizado = otimizar_tipos(df_grande.head(1000))
 print("\nDataset otimizado:")
 info_memoria_df(df_otimizado)
 
+# 3.1 Inferência de schema antes da leitura
+print("\n3.1 Inferência de schema: tipos otimizados desde a leitura")
+
+def _menor_inteiro(col_min, col_max, nulos=False, minimo_bits=8, com_sinal=False):
+    """Menor tipo inteiro que comporta [col_min, col_max] (nullable se houver nulos)"""
+    prefixo = 'uint' if col_min >= 0 and not com_sinal else 'int'
+    for bits in (8, 16, 32, 64):
+        if bits < minimo_bits:
+            continue
+        info = np.iinfo(f'{prefixo}{bits}')
+        if info.min <= col_min and col_max <= info.max:
+            tipo = f'{prefixo}{bits}'
+            return tipo.capitalize().replace('Uint', 'UInt') if nulos else tipo
+    return 'Int64' if nulos else 'int64'
+
+def inferir_schema_csv(arquivo_csv, chunk_size=100000, amostra_linhas=None,
+                       limite_categoria=0.5, limite_distintos=10000, usar_float32=True):
+    """Varrer o CSV em chunks e gerar dtype=/parse_dates= para pd.read_csv
+
+    - amostra_linhas=None varre o arquivo inteiro (ranges exatos)
+    - com amostra, inteiros usam no mínimo 32 bits, com sinal e nullable
+      (Int32/Int64), booleanos viram 'boolean' e categorias ficam abertas,
+      pois negativos, nulos e valores fora da amostra podem aparecer no
+      restante do arquivo
+    """
+    estatisticas = {}
+    
+    leitor = pd.read_csv(arquivo_csv, chunksize=chunk_size, nrows=amostra_linhas)
+    for chunk in leitor:
+        for col in chunk.columns:
+            serie = chunk[col]
+            est = estatisticas.setdefault(col, {
+                'tipos': set(), 'total': 0, 'nulos': 0, 'min': None, 'max': None,
+                'inteiro': True, 'distintos': set(), 'data': True
+            })
+            est['total'] += len(serie)
+            est['nulos'] += int(serie.isna().sum())
+            valores = serie.dropna()
+            if valores.empty:
+                continue
+            
+            if pd.api.types.is_bool_dtype(valores):
+                est['tipos'].add('bool')
+            elif pd.api.types.is_numeric_dtype(valores):
+                est['tipos'].add('numero')
+                est['min'] = valores.min() if est['min'] is None else min(est['min'], valores.min())
+                est['max'] = valores.max() if est['max'] is None else max(est['max'], valores.max())
+                if est['inteiro'] and not pd.api.types.is_integer_dtype(valores):
+                    est['inteiro'] = bool((valores % 1 == 0).all())
+            else:
+                est['tipos'].add('texto')
+                if est['data']:
+                    amostra = valores.iloc[:1000].astype(str)
+                    convertidas = pd.to_datetime(amostra, errors='coerce', format='ISO8601')
+                    est['data'] = bool(convertidas.notna().all())
+            
+            # Cardinalidade exata até limite_distintos (memória limitada)
+            if est['distintos'] is not None:
+                est['distintos'].update(valores.unique())
+                if len(est['distintos']) > limite_distintos:
+                    est['distintos'] = None
+    
+    dtype, parse_dates, linhas = {}, [], []
+    for col, est in estatisticas.items():
+        tem_nulos = est['nulos'] > 0
+        n_distintos = len(est['distintos']) if est['distintos'] is not None else None
+        
+        if not est['tipos']:
+            # Coluna só com nulos: nada para inferir (e 0 distintos passaria
+            # no teste de cardinalidade como categoria vazia)
+            tipo = 'object'
+        elif est['tipos'] == {'bool'}:
+            tipo = 'boolean' if tem_nulos or amostra_linhas else 'bool'
+        elif est['tipos'] == {'numero'}:
+            if est['inteiro'] and amostra_linhas:
+                tipo = _menor_inteiro(est['min'], est['max'], nulos=True, minimo_bits=32, com_sinal=True)
+            elif est['inteiro']:
+                tipo = _menor_inteiro(est['min'], est['max'], tem_nulos)
+            else:
+                tipo = 'float32' if usar_float32 else 'float64'
+        elif est['tipos'] == {'texto'} and est['data']:
+            tipo = 'datetime64[ns]'
+            parse_dates.append(col)
+        elif n_distintos is not None and n_distintos / max(1, est['total'] - est['nulos']) < limite_categoria:
+            if amostra_linhas:
+                tipo = 'category'
+            else:
+                tipo = pd.CategoricalDtype(sorted(map(str, est['distintos'])))
+        else:
+            tipo = 'object'  # Tipos mistos ou alta cardinalidade
+        
+        if col not in parse_dates:
+            dtype[col] = tipo
+        linhas.append({
+            'coluna': col, 'tipo': str(tipo), 'nulos': est['nulos'],
+            'min': est['min'], 'max': est['max'],
+            'distintos': n_distintos if n_distintos is not None else f'>{limite_distintos}'
+        })
+    
+    return {'dtype': dtype, 'parse_dates': parse_dates, 'estatisticas': pd.DataFrame(linhas)}
+
+def ler_csv_otimizado(arquivo_csv, schema=None, **kwargs):
+    """Ler CSV já com os tipos otimizados (sem cópia larga + astype depois)"""
+    schema = schema or inferir_schema_csv(arquivo_csv)
+    return pd.read_csv(arquivo_csv, dtype=schema['dtype'], parse_dates=schema['parse_dates'], **kwargs)
+
+arquivo_schema = 'temp_schema.csv'
+df_grande.to_csv(arquivo_schema, index=False)
+
+try:
+    schema = inferir_schema_csv(arquivo_schema, chunk_size=25000)
+    print("Schema inferido:")
+    print(schema['estatisticas'].to_string(index=False))
+    
+    df_padrao = pd.read_csv(arquivo_schema)
+    memoria_padrao = df_padrao.memory_usage(deep=True).sum() / 1024 / 1024
+    del df_padrao
+    
+    df_tipado = ler_csv_otimizado(arquivo_schema, schema)
+    memoria_tipado = df_tipado.memory_usage(deep=True).sum() / 1024 / 1024
+    
+    print(f"\nread_csv padrão: {memoria_padrao:.2f} MB")
+    print(f"read_csv com schema: {memoria_tipado:.2f} MB ({memoria_tipado/memoria_padrao:.0%} do padrão)")
+    print(f"Tipos: {dict(df_tipado.dtypes.astype(str))}")
+    
+    # O mesmo schema serve para leitura em chunks
+    schema_amostra = inferir_schema_csv(arquivo_schema, amostra_linhas=5000)
+    print(f"\nSchema por amostra (5.000 linhas): {schema_amostra['dtype']}")
+    del df_tipado
+finally:
+    if os.path.exists(arquivo_schema):
+        os.remove(arquivo_schema)
+
 # 4. VECTORIZAÇÃO VS LOOPS
 print("\n4. VECTORIZAÇÃO VS LOOPS")
 print("-" * 30)
@@ -199,29 +335,341 @@ for nome, tempo in tempos.items():
         speedup = tempo_base / tempo
         print(f"{nome}: {speedup:.1f}x mais rápido")
 
+print("\nUma única execução é ruído: para mediana/IQR em vários tamanhos, use")
+print("python benchmarks/benchmark_aulas.py --filtro aula10")
+
 # 5. CHUNKING PARA GRANDES DATASETS
 print("\n5. CHUNKING PARA GRANDES DATASETS")
 print("-" * 40)
 
-def processar_em_chunks(arquivo_csv, chunk_size=10000):
-    """Processar arquivo grande em pedaços"""
-    print(f"Processando em chunks de {chunk_size:,} registros...")
+# Estados de agregação mergeáveis: cada chunk gera um estado parcial por grupo
+# e estados parciais são combinados sem precisar dos dados originais.
+def _colunas_chave(chaves):
+    """Colunas do chunk usadas pelas chaves de agrupamento (str ou pd.Grouper)"""
+    return [c.key if isinstance(c, pd.Grouper) else c for c in chaves]
+
+def _niveis(estado, excluir=0):
+    return list(range(estado.index.nlevels - excluir))
+
+class EstadoMomentos:
+    """count/sum/mean/var/std com combinação de Welford/Chan"""
+    funcoes = ('count', 'sum', 'mean', 'var', 'std')
+    
+    def parcial(self, chunk, coluna, chaves):
+        grupos = chunk.groupby(chaves)[coluna]
+        n = grupos.count()
+        return pd.DataFrame({
+            'n': n,
+            'soma': grupos.sum(),
+            'media': grupos.mean(),
+            'm2': (grupos.var(ddof=0) * n).fillna(0)
+        })
+    
+    def combinar(self, a, b):
+        indice = a.index.union(b.index)
+        a, b = a.reindex(indice), b.reindex(indice)
+        na, nb = a['n'].fillna(0), b['n'].fillna(0)
+        n = na + nb
+        media_a, media_b = a['media'].fillna(0), b['media'].fillna(0)
+        delta = media_b - media_a
+        return pd.DataFrame({
+            'n': n,
+            'soma': a['soma'].fillna(0) + b['soma'].fillna(0),
+            'media': media_a + (delta * nb / n).fillna(0),
+            'm2': a['m2'].fillna(0) + b['m2'].fillna(0) + (delta ** 2 * na * nb / n).fillna(0)
+        })
+    
+    def finalizar(self, estado, funcao):
+        n = estado['n']
+        if funcao == 'count':
+            return n.astype('int64')
+        if funcao == 'sum':
+            return estado['soma']
+        if funcao == 'mean':
+            return estado['media'].where(n > 0)
+        variancia = (estado['m2'] / (n - 1)).where(n > 1)
+        return variancia if funcao == 'var' else np.sqrt(variancia)
+
+class EstadoExtremos:
+    """min/max (funciona também para strings e datas)"""
+    funcoes = ('min', 'max')
+    
+    def parcial(self, chunk, coluna, chaves):
+        grupos = chunk.groupby(chaves)[coluna]
+        return pd.DataFrame({'min': grupos.min(), 'max': grupos.max()})
+    
+    def combinar(self, a, b):
+        return pd.concat([a, b]).groupby(level=_niveis(a)).agg({'min': 'min', 'max': 'max'})
+    
+    def finalizar(self, estado, funcao):
+        return estado[funcao]
+
+class EstadoBordas:
+    """first/last não nulos, respeitando a ordem dos chunks"""
+    funcoes = ('first', 'last')
+    
+    def parcial(self, chunk, coluna, chaves):
+        grupos = chunk.groupby(chaves)[coluna]
+        return pd.DataFrame({'first': grupos.first(), 'last': grupos.last()})
+    
+    def combinar(self, a, b):
+        return pd.DataFrame({
+            'first': a['first'].combine_first(b['first']),
+            'last': b['last'].combine_first(a['last'])
+        })
+    
+    def finalizar(self, estado, funcao):
+        return estado[funcao]
+
+class EstadoHyperLogLog:
+    """nunique aproximado com HyperLogLog (erro relativo ~1.04/sqrt(2^precisao))
+
+    O estado é esparso: Series indexada por (grupo..., registro) com o maior rank visto.
+    """
+    funcoes = ('nunique',)
+    
+    def __init__(self, precisao=12):
+        self.precisao = precisao
+        self.m = 2 ** precisao
+    
+    def parcial(self, chunk, coluna, chaves):
+        df = chunk[_colunas_chave(chaves) + [coluna]].dropna(subset=[coluna])
+        hashes = pd.util.hash_pandas_object(df[coluna], index=False).to_numpy()
+        
+        bits_resto = 64 - self.precisao
+        registro = (hashes >> np.uint64(bits_resto)).astype('int64')
+        resto = hashes & np.uint64((1 << bits_resto) - 1)
+        
+        # bit_length exato: frexp pode arredondar para cima perto de potências de 2
+        _, expoente = np.frexp(resto.astype('float64'))
+        expoente = expoente.astype('int64')
+        potencia = np.left_shift(np.uint64(1), np.maximum(expoente - 1, 0).astype('uint64'))
+        expoente = np.where((expoente > 0) & (potencia > resto), expoente - 1, expoente)
+        rank = (bits_resto - expoente + 1).astype('int8')
+        
+        df = df.assign(_registro=registro, _rank=rank)
+        return df.groupby(chaves + ['_registro'])['_rank'].max()
+    
+    def combinar(self, a, b):
+        return pd.concat([a, b]).groupby(level=_niveis(a)).max()
+    
+    def finalizar(self, estado, funcao):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        niveis = _niveis(estado, excluir=1)
+        
+        soma = (2.0 ** -estado.astype('float64')).groupby(level=niveis).sum()
+        zeros = m - estado.groupby(level=niveis).size()
+        estimativa = alpha * m * m / (soma + zeros)
+        
+        # Correção para cardinalidades pequenas (linear counting)
+        pequena = (estimativa <= 2.5 * m) & (zeros > 0)
+        linear = m * np.log(m / zeros.where(zeros > 0, 1))
+        return estimativa.where(~pequena, linear).round().astype('int64')
+
+class EstadoQuantis:
+    """Quantis aproximados com sketch de centroides de peso uniforme (estilo t-digest)
+
+    O estado é um DataFrame indexado pelo grupo com colunas 'valor' e 'peso';
+    cada grupo mantém no máximo n_centroides linhas (erro de rank ~1/(2·n_centroides)).
+    """
+    
+    def __init__(self, n_centroides=200):
+        self.n_centroides = n_centroides
+    
+    def _comprimir(self, centroides):
+        nomes = list(centroides.index.names)
+        c = centroides.reset_index().sort_values(nomes + ['valor'])
+        grupos = c.groupby(nomes, sort=False)['peso']
+        posicao = (grupos.cumsum() - c['peso'] / 2) / grupos.transform('sum')
+        c['_bin'] = np.minimum((posicao * self.n_centroides).astype('int64'), self.n_centroides - 1)
+        c['_valor_peso'] = c['valor'] * c['peso']
+        r = c.groupby(nomes + ['_bin'], sort=False)[['_valor_peso', 'peso']].sum()
+        r['valor'] = r['_valor_peso'] / r['peso']
+        return r[['valor', 'peso']].reset_index(level='_bin', drop=True)
+    
+    def parcial(self, chunk, coluna, chaves):
+        # Valores distintos com contagem já são centroides exatos
+        contagem = chunk.groupby(chaves + [coluna]).size().rename('peso')
+        centroides = contagem.reset_index(level=-1).rename(columns={coluna: 'valor'})
+        return self._comprimir(centroides.astype({'valor': 'float64', 'peso': 'float64'}))
     
-    resultados = []
+    def combinar(self, a, b):
+        return self._comprimir(pd.concat([a, b]))
+    
+    def finalizar(self, estado, funcao):
+        q = 0.5 if funcao == 'median' else int(funcao[1:]) / 100
+        
+        def quantil(grupo):
+            peso = grupo['peso'].to_numpy()
+            posicao = (np.cumsum(peso) - peso / 2) / peso.sum()
+            return np.interp(q, posicao, grupo['valor'].to_numpy())
+        
+        return estado.groupby(level=_niveis(estado), sort=False).apply(quantil)
+
+class AgregadorIncremental:
+    """Agregação agrupada out-of-core com a mesma sintaxe de agg do pandas
+
+    Funções suportadas: count, sum, mean, var, std, min, max, first, last,
+    nunique (aproximado) e quantis aproximados ('median', 'p25', 'p95', ...).
+    """
+    
+    def __init__(self, group_by, agg, precisao_hll=12, n_centroides=200):
+        self.chaves = group_by if isinstance(group_by, list) else [group_by]
+        self.agg = {col: (funcs if isinstance(funcs, list) else [funcs]) for col, funcs in agg.items()}
+        self.colunas_multiplas = any(isinstance(funcs, list) for funcs in agg.values())
+        self.tipos_estado = {
+            'momentos': EstadoMomentos(),
+            'extremos': EstadoExtremos(),
+            'bordas': EstadoBordas(),
+            'hll': EstadoHyperLogLog(precisao_hll),
+            'quantis': EstadoQuantis(n_centroides)
+        }
+        self.estados = {}
+        self.registros = 0
+    
+    def _tipo_estado(self, funcao):
+        if funcao == 'median' or (funcao.startswith('p') and funcao[1:].isdigit()):
+            return 'quantis'
+        for tipo, estado in self.tipos_estado.items():
+            if funcao in getattr(estado, 'funcoes', ()):
+                return tipo
+        raise ValueError(f"Função de agregação não suportada: {funcao}")
+    
+    def _chaves_estado(self):
+        """Um estado por (coluna, tipo) - ex: sum/mean/std da mesma coluna compartilham momentos"""
+        return {(col, self._tipo_estado(f)) for col, funcs in self.agg.items() for f in funcs}
+    
+    def atualizar(self, chunk):
+        """Acumular um chunk nos estados parciais"""
+        for col, tipo in self._chaves_estado():
+            estado = self.tipos_estado[tipo]
+            parcial = estado.parcial(chunk, col, self.chaves)
+            atual = self.estados.get((col, tipo))
+            self.estados[(col, tipo)] = parcial if atual is None else estado.combinar(atual, parcial)
+        self.registros += len(chunk)
+        return self
+    
+    def combinar(self, outro):
+        """Combinar com outro agregador (ex: resultado de outro processo)"""
+        for chave, parcial in outro.estados.items():
+            atual = self.estados.get(chave)
+            estado = self.tipos_estado[chave[1]]
+            self.estados[chave] = parcial if atual is None else estado.combinar(atual, parcial)
+        self.registros += outro.registros
+        return self
+    
+    def resultado(self):
+        """Finalizar os estados em um DataFrame no formato de df.groupby().agg()"""
+        colunas = {}
+        for col, funcs in self.agg.items():
+            for funcao in funcs:
+                tipo = self._tipo_estado(funcao)
+                colunas[(col, funcao)] = self.tipos_estado[tipo].finalizar(self.estados[(col, tipo)], funcao)
+        
+        resultado = pd.concat(colunas, axis=1).sort_index()
+        for col, funcao in colunas:
+            if funcao in ('count', 'nunique'):
+                resultado[(col, funcao)] = resultado[(col, funcao)].fillna(0).astype('int64')
+        
+        if not self.colunas_multiplas:
+            resultado.columns = resultado.columns.get_level_values(0)
+        return resultado
+
+class LeitorChunksAdaptativo:
+    """Ler CSV em chunks dimensionados por um orçamento de memória (em vez de linhas)
+
+    O primeiro chunk (pequeno) mede bytes por linha com memory_usage(deep=True),
+    como em info_memoria_df; os seguintes são redimensionados continuamente:
+    - alvo = orcamento / (bytes_por_linha × fator_processamento)
+    - fator_processamento cobre intermediários criados ao processar o chunk
+    - se o RSS do processo passar do orçamento, o próximo chunk encolhe
+    - crescimento limitado a 2x por chunk (dados podem ficar mais largos adiante)
+    """
+    
+    def __init__(self, arquivo_csv, orcamento_memoria_mb, chunk_inicial=10000,
+                 fator_processamento=3.0, max_linhas=10_000_000, **kwargs_leitura):
+        self.arquivo_csv = arquivo_csv
+        self.orcamento_bytes = orcamento_memoria_mb * 1024 * 1024
+        self.chunk_inicial = chunk_inicial
+        self.fator_processamento = fator_processamento
+        self.max_linhas = max_linhas
+        self.kwargs_leitura = kwargs_leitura
+        self.estatisticas = []
+    
+    def __iter__(self):
+        rss_base = monitorar_memoria() * 1024 * 1024
+        bytes_por_linha = None
+        tamanho = self.chunk_inicial
+        
+        with pd.read_csv(self.arquivo_csv, iterator=True, **self.kwargs_leitura) as leitor:
+            while True:
+                try:
+                    chunk = leitor.get_chunk(tamanho)
+                except StopIteration:
+                    return
+                if chunk.empty:
+                    return
+                
+                bytes_chunk = chunk.memory_usage(deep=True).sum()
+                medido = bytes_chunk / len(chunk)
+                # Média móvel exponencial, mas reage rápido se as linhas ficarem mais largas
+                bytes_por_linha = medido if bytes_por_linha is None else max(medido, 0.7 * bytes_por_linha + 0.3 * medido)
+                
+                self.estatisticas.append({
+                    'linhas': len(chunk),
+                    'mb': bytes_chunk / 1024 / 1024,
+                    'bytes_por_linha': medido
+                })
+                
+                yield chunk
+                del chunk
+                
+                # Feedback do processo: RSS acima do orçamento encolhe o próximo chunk
+                excesso = monitorar_memoria() * 1024 * 1024 - rss_base
+                alvo = self.orcamento_bytes / (bytes_por_linha * self.fator_processamento)
+                if excesso > self.orcamento_bytes:
+                    alvo *= self.orcamento_bytes / excesso
+                tamanho = int(max(1000, min(alvo, tamanho * 2, self.max_linhas)))
+    
+    def resumo(self):
+        df = pd.DataFrame(self.estatisticas)
+        return {
+            'chunks': len(df),
+            'linhas_total': int(df['linhas'].sum()),
+            'maior_chunk_mb': df['mb'].max(),
+            'maior_chunk_linhas': int(df['linhas'].max()),
+            'bytes_por_linha': df['bytes_por_linha'].mean()
+        }
+
+def processar_em_chunks(arquivo_csv, chunk_size=10000, group_by='categoria', agg=None,
+                        orcamento_memoria_mb=None, **kwargs_leitura):
+    """Processar arquivo grande em pedaços, combinando estados parciais de agregação
+
+    Com orcamento_memoria_mb, o tamanho dos chunks é adaptado ao orçamento
+    e chunk_size é usado apenas como chunk inicial de medição.
+    """
+    if orcamento_memoria_mb:
+        print(f"Processando em chunks adaptativos (orçamento {orcamento_memoria_mb} MB)...")
+        leitor = LeitorChunksAdaptativo(arquivo_csv, orcamento_memoria_mb, chunk_size, **kwargs_leitura)
+    else:
+        print(f"Processando em chunks de {chunk_size:,} registros...")
+        leitor = pd.read_csv(arquivo_csv, chunksize=chunk_size, **kwargs_leitura)
+    
+    agregador = AgregadorIncremental(group_by, agg or {'valor': 'sum'})
     chunk_count = 0
     
     # Simulando leitura de arquivo grande
-    for chunk in pd.read_csv(arquivo_csv, chunksize=chunk_size):
+    for chunk in leitor:
         chunk_count += 1
         
-        # Processamento do chunk
-        chunk_processado = chunk.groupby('categoria')['valor'].sum()
-        resultados.append(chunk_processado)
+        # Processamento do chunk: só os estados parciais ficam em memória
+        agregador.atualizar(chunk)
         
         print(f"Chunk {chunk_count} processado: {len(chunk)} registros")
     
     # Combinando resultados
-    resultado_final = pd.concat(resultados).groupby(level=0).sum()
+    resultado_final = agregador.resultado()
     print(f"Processamento concluído: {chunk_count} chunks")
     
     return resultado_final
@@ -235,6 +683,56 @@ try:
     resultado_chunks = processar_em_chunks(arquivo_temp, chunk_size=10000)
     print("Resultado por categoria:")
     print(resultado_chunks)
+    
+    print("\n5.1 Agregações mergeáveis (média, desvio, extremos, distintos, quantis):")
+    agg_completo = {
+        'valor': ['count', 'sum', 'mean', 'std', 'median', 'p95'],
+        'score': ['min', 'max'],
+        'descricao': ['nunique', 'first']
+    }
+    resultado_completo = processar_em_chunks(arquivo_temp, chunk_size=10000, agg=agg_completo)
+    print(resultado_completo.round(2))
+    
+    # Conferindo com o pandas em memória
+    df_amostra = df_grande.head(50000)
+    exato = df_amostra.groupby('categoria').agg({
+        'valor': ['mean', 'std', 'median', lambda x: x.quantile(0.95)],
+        'descricao': 'nunique'
+    })
+    print("Diferença máxima vs pandas em memória:")
+    print(f"  mean: {(resultado_completo[('valor', 'mean')] - exato[('valor', 'mean')]).abs().max():.2e}")
+    print(f"  std: {(resultado_completo[('valor', 'std')] - exato[('valor', 'std')]).abs().max():.2e}")
+    erro_mediana = (resultado_completo[('valor', 'median')] / exato[('valor', 'median')] - 1).abs().max()
+    erro_p95 = (resultado_completo[('valor', 'p95')] / exato[('valor', '<lambda_0>')] - 1).abs().max()
+    erro_nunique = (resultado_completo[('descricao', 'nunique')] / exato[('descricao', 'nunique')] - 1).abs().max()
+    print(f"  median (aprox.): {erro_mediana:.2%}, p95 (aprox.): {erro_p95:.2%}, nunique (aprox.): {erro_nunique:.2%}")
+    
+    print("\n5.2 KPIs mensais no formato de AnalisadorVendas.kpis_por_periodo:")
+    kpis_chunks = processar_em_chunks(
+        arquivo_temp, chunk_size=10000,
+        group_by=pd.Grouper(key='data', freq='M'),
+        agg={'valor': ['sum', 'count', 'mean'], 'subcategoria': 'nunique', 'descricao': 'nunique'},
+        parse_dates=['data']
+    )
+    print(kpis_chunks.round(2).head())
+    
+    print("\n5.3 Chunks dimensionados por orçamento de memória:")
+    # Mesmo orçamento, arquivos de larguras diferentes -> tamanhos de chunk diferentes
+    arquivo_estreito = 'temp_estreito.csv'
+    df_grande.head(50000)[['id', 'valor']].to_csv(arquivo_estreito, index=False)
+    try:
+        for nome, arquivo in [('largo (9 colunas)', arquivo_temp), ('estreito (2 colunas)', arquivo_estreito)]:
+            leitor = LeitorChunksAdaptativo(arquivo, orcamento_memoria_mb=4, chunk_inicial=2000)
+            linhas = sum(len(chunk) for chunk in leitor)
+            resumo = leitor.resumo()
+            print(f"{nome}: {linhas:,} linhas em {resumo['chunks']} chunks, "
+                  f"{resumo['bytes_por_linha']:.0f} bytes/linha, maior chunk com "
+                  f"{resumo['maior_chunk_linhas']:,} linhas ({resumo['maior_chunk_mb']:.2f} MB)")
+    finally:
+        os.remove(arquivo_estreito)
+    
+    resultado_orcamento = processar_em_chunks(arquivo_temp, chunk_size=2000, orcamento_memoria_mb=4)
+    print(resultado_orcamento)
 finally:
     # Limpando arquivo temporário
     if os.path.exists(arquivo_temp):
@@ -285,6 +783,233 @@ print(f"Sem índice: {tempo_sem_index:.6f}s")
 print(f"Com índice: {tempo_com_index:.6f}s")
 print(f"Melhoria: {tempo_sem_index/tempo_com_index:.1f}x mais rápido")
 
+# 7.1 Índice persistente (sidecar) para arquivos
+print("\n7.1 Índice persistente ao lado do arquivo (CSV/Parquet):")
+
+import io
+import json
+import shutil
+
+class IndiceSidecar:
+    """Índice persistido em disco para buscas por chave sem reler o arquivo inteiro
+
+    Estrutura: diretório '<arquivo>.<coluna>.idx' com arrays .npy (abertos com
+    memory map) e meta.json.
+    - Chaves numéricas/datas: array de chaves ordenado (busca exata e intervalo)
+    - Demais chaves: índice hash (uint64 ordenado, apenas busca exata)
+    - CSV: offset e tamanho em bytes de cada linha (lê só as linhas pedidas)
+    - Parquet: row group e posição de cada linha (lê só os row groups pedidos)
+    Assume CSV sem quebras de linha dentro de campos entre aspas.
+    """
+    
+    def __init__(self, arquivo, coluna):
+        self.arquivo = arquivo
+        self.coluna = coluna
+        self.diretorio = f"{arquivo}.{coluna}.idx"
+        self._arrays = {}
+        self._meta = None
+    
+    @staticmethod
+    def _formato(arquivo):
+        return 'parquet' if str(arquivo).endswith('.parquet') else 'csv'
+    
+    @staticmethod
+    def _normalizar(valores):
+        """Converter chaves para o array usado no índice (ordenável ou hash)"""
+        serie = pd.Series(valores)
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return 'ordenado', serie.to_numpy('datetime64[ns]').astype('int64')
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            return 'ordenado', serie.to_numpy()
+        return 'hash', pd.util.hash_array(serie.astype(str).to_numpy(dtype=object))
+    
+    def _chave_consulta(self, valor):
+        if self.meta['tipo'] == 'hash':
+            return pd.util.hash_array(np.array([str(valor)], dtype=object))[0]
+        if self.meta['chave_datetime']:
+            return pd.Timestamp(valor).value
+        return valor
+    
+    @staticmethod
+    def _offsets_linhas(arquivo, tamanho_bloco=64 * 1024 * 1024):
+        """Início (em bytes) de cada linha de dados, varrendo o arquivo em blocos"""
+        inicios = []
+        with open(arquivo, 'rb') as f:
+            cabecalho = f.readline()
+            posicao = len(cabecalho)
+            inicios.append(np.array([posicao], dtype='int64'))
+            while True:
+                bloco = f.read(tamanho_bloco)
+                if not bloco:
+                    break
+                quebras = np.flatnonzero(np.frombuffer(bloco, dtype=np.uint8) == 10)
+                inicios.append(posicao + quebras.astype('int64') + 1)
+                posicao += len(bloco)
+        inicios = np.concatenate(inicios)
+        return cabecalho, inicios[inicios < posicao], posicao
+    
+    def construir(self, chunk_size=1_000_000):
+        """Construir o índice (uma vez) e salvar ao lado do arquivo"""
+        formato = self._formato(self.arquivo)
+        
+        if formato == 'csv':
+            cabecalho, inicios, tamanho = self._offsets_linhas(self.arquivo)
+            comprimentos = np.diff(np.append(inicios, tamanho))
+            partes = [chunk[self.coluna] for chunk in
+                      pd.read_csv(self.arquivo, usecols=[self.coluna], chunksize=chunk_size)]
+            chaves = pd.concat(partes, ignore_index=True)
+            if len(chaves) != len(inicios):
+                raise ValueError(f"CSV com {len(inicios)} linhas físicas e {len(chaves)} registros: "
+                                 "quebras de linha dentro de campos não são suportadas")
+            valores = {'offsets': inicios, 'comprimentos': comprimentos.astype('int32')}
+            extra = {'cabecalho': cabecalho.decode('utf-8')}
+        else:
+            import pyarrow.parquet as pq
+            arquivo_pq = pq.ParquetFile(self.arquivo)
+            partes, row_groups, linhas = [], [], []
+            for rg in range(arquivo_pq.num_row_groups):
+                coluna = arquivo_pq.read_row_group(rg, columns=[self.coluna]).column(0).to_pandas()
+                partes.append(coluna)
+                row_groups.append(np.full(len(coluna), rg, dtype='int32'))
+                linhas.append(np.arange(len(coluna), dtype='int32'))
+            chaves = pd.concat(partes, ignore_index=True)
+            valores = {'row_groups': np.concatenate(row_groups), 'linhas': np.concatenate(linhas)}
+            extra = {}
+        
+        tipo, chaves_norm = self._normalizar(chaves)
+        ordem = np.argsort(chaves_norm, kind='stable')
+        
+        if os.path.exists(self.diretorio):
+            shutil.rmtree(self.diretorio)
+        os.makedirs(self.diretorio)
+        np.save(os.path.join(self.diretorio, 'chaves.npy'), chaves_norm[ordem])
+        for nome, array in valores.items():
+            np.save(os.path.join(self.diretorio, f'{nome}.npy'), array[ordem])
+        
+        stat = os.stat(self.arquivo)
+        meta = {
+            'formato': formato, 'coluna': self.coluna, 'tipo': tipo,
+            'chave_datetime': bool(pd.api.types.is_datetime64_any_dtype(chaves)),
+            'n_linhas': int(len(chaves)), 'tamanho_arquivo': stat.st_size, 'mtime': stat.st_mtime,
+            **extra
+        }
+        with open(os.path.join(self.diretorio, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        
+        self._arrays, self._meta = {}, None
+        return self
+    
+    @property
+    def meta(self):
+        if self._meta is None:
+            with open(os.path.join(self.diretorio, 'meta.json'), encoding='utf-8') as f:
+                self._meta = json.load(f)
+            stat = os.stat(self.arquivo)
+            if stat.st_size != self._meta['tamanho_arquivo'] or stat.st_mtime != self._meta['mtime']:
+                raise RuntimeError(f"Índice desatualizado para {self.arquivo}: reconstrua com construir()")
+        return self._meta
+    
+    def _array(self, nome):
+        if nome not in self._arrays:
+            # mmap: só as páginas tocadas pela busca binária são lidas do disco
+            self._arrays[nome] = np.load(os.path.join(self.diretorio, f'{nome}.npy'), mmap_mode='r')
+        return self._arrays[nome]
+    
+    def _ler_posicoes(self, posicoes, **kwargs_leitura):
+        """Ler apenas as linhas/row groups apontados pelas posições do índice"""
+        if len(posicoes) == 0:
+            return pd.DataFrame()
+        
+        if self.meta['formato'] == 'csv':
+            offsets = np.asarray(self._array('offsets')[posicoes])
+            comprimentos = np.asarray(self._array('comprimentos')[posicoes])
+            ordem = np.argsort(offsets)
+            offsets, comprimentos = offsets[ordem], comprimentos[ordem]
+            
+            # Linhas vizinhas no arquivo viram uma única leitura
+            novo_trecho = np.r_[True, offsets[1:] != offsets[:-1] + comprimentos[:-1]]
+            inicios_trecho = np.flatnonzero(novo_trecho)
+            fins_trecho = np.r_[inicios_trecho[1:], len(offsets)] - 1
+            
+            partes = [self.meta['cabecalho'].encode('utf-8')]
+            with open(self.arquivo, 'rb') as f:
+                for i, j in zip(inicios_trecho, fins_trecho):
+                    f.seek(offsets[i])
+                    conteudo = f.read(offsets[j] + comprimentos[j] - offsets[i])
+                    partes.append(conteudo if conteudo.endswith(b'\n') else conteudo + b'\n')
+            return pd.read_csv(io.BytesIO(b''.join(partes)), **kwargs_leitura)
+        
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        arquivo_pq = pq.ParquetFile(self.arquivo)
+        row_groups = np.asarray(self._array('row_groups')[posicoes])
+        linhas = np.asarray(self._array('linhas')[posicoes])
+        tabelas = []
+        for rg in np.unique(row_groups):
+            tabela = arquivo_pq.read_row_group(int(rg), columns=kwargs_leitura.get('columns'))
+            tabelas.append(tabela.take(pa.array(np.sort(linhas[row_groups == rg]))))
+        return pa.concat_tables(tabelas).to_pandas()
+    
+    def buscar(self, valor, **kwargs_leitura):
+        """Registros com coluna == valor"""
+        chaves = self._array('chaves')
+        chave = self._chave_consulta(valor)
+        inicio, fim = np.searchsorted(chaves, chave, 'left'), np.searchsorted(chaves, chave, 'right')
+        resultado = self._ler_posicoes(np.arange(inicio, fim), **kwargs_leitura)
+        if self.meta['tipo'] == 'hash' and not resultado.empty:
+            resultado = resultado[resultado[self.coluna].astype(str) == str(valor)]  # Colisões de hash
+        return resultado.reset_index(drop=True)
+    
+    def buscar_intervalo(self, minimo, maximo, **kwargs_leitura):
+        """Registros com minimo <= coluna <= maximo (equivalente a BETWEEN)"""
+        if self.meta['tipo'] == 'hash':
+            raise ValueError("Índice hash não suporta busca por intervalo (chave não numérica)")
+        chaves = self._array('chaves')
+        inicio = np.searchsorted(chaves, self._chave_consulta(minimo), 'left')
+        fim = np.searchsorted(chaves, self._chave_consulta(maximo), 'right')
+        return self._ler_posicoes(np.arange(inicio, fim), **kwargs_leitura)
+
+# Arquivos de teste (ordem aleatória de ids: o índice não depende de ordenação)
+df_arquivo = df_index_test.sample(frac=1, random_state=42)
+df_arquivo.to_csv('temp_indice.csv', index=False)
+df_arquivo.to_parquet('temp_indice.parquet', index=False, row_group_size=5000)
+
+try:
+    for arquivo in ['temp_indice.csv', 'temp_indice.parquet']:
+        start = time.perf_counter()
+        indice = IndiceSidecar(arquivo, 'id').construir()
+        tempo_construcao = time.perf_counter() - start
+        
+        # Sem índice: reler e filtrar o arquivo inteiro a cada busca
+        leitor = pd.read_csv if arquivo.endswith('.csv') else pd.read_parquet
+        start = time.perf_counter()
+        df_scan = leitor(arquivo)
+        resultado_scan = df_scan[df_scan['id'] == 25000]
+        tempo_scan = time.perf_counter() - start
+        
+        # Com índice: abrir de novo (como outro processo faria) e buscar
+        start = time.perf_counter()
+        resultado_indice = IndiceSidecar(arquivo, 'id').buscar(25000)
+        tempo_indice = time.perf_counter() - start
+        
+        intervalo = IndiceSidecar(arquivo, 'id').buscar_intervalo(1000, 1099)
+        
+        print(f"{arquivo}: construção {tempo_construcao:.3f}s | scan {tempo_scan:.4f}s | "
+              f"índice {tempo_indice:.4f}s ({tempo_scan/tempo_indice:.0f}x)")
+        print(f"  id == 25000: {len(resultado_indice)} registro(s), igual ao scan: "
+              f"{resultado_indice['valor'].tolist() == resultado_scan['valor'].tolist()}")
+        print(f"  id BETWEEN 1000 AND 1099: {len(intervalo)} registros")
+    
+    indice_categoria = IndiceSidecar('temp_indice.csv', 'categoria').construir()
+    print(f"Índice hash (categoria == 'B'): {len(indice_categoria.buscar('B'))} registros")
+finally:
+    for arquivo in ['temp_indice.csv', 'temp_indice.parquet']:
+        for caminho in [arquivo, f"{arquivo}.id.idx", f"{arquivo}.categoria.idx"]:
+            if os.path.isdir(caminho):
+                shutil.rmtree(caminho)
+            elif os.path.exists(caminho):
+                os.remove(caminho)
+
 # 8. OPERAÇÕES EFICIENTES COM STRINGS
 print("\n8. OPERAÇÕES EFICIENTES COM STRINGS")
 print("-" * 40)
@@ -344,38 +1069,416 @@ else:
 print("\n10. PROCESSAMENTO PARALELO")
 print("-" * 35)
 
-# Exemplo com multiprocessing (conceitual)
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
 def processar_chunk_paralelo(chunk):
     """Função para processar chunk em paralelo"""
     return chunk.groupby('categoria')['valor'].sum()
 
-print("Exemplo de processamento paralelo:")
-print("- Dividir dataset em chunks")
+# Reducers: recebem a lista de resultados parciais (na ordem dos chunks)
+def reduzir_soma(parciais):
+    """Somar resultados parciais indexados pela mesma chave"""
+    return pd.concat(parciais).groupby(level=0).sum()
+
+def reduzir_min(parciais):
+    """Mínimo entre resultados parciais"""
+    return pd.concat(parciais).groupby(level=0).min()
+
+def reduzir_max(parciais):
+    """Máximo entre resultados parciais"""
+    return pd.concat(parciais).groupby(level=0).max()
+
+def reduzir_concat(parciais):
+    """Empilhar resultados parciais (ex: filtros, transformações linha a linha)"""
+    return pd.concat(parciais, ignore_index=True)
+
+REDUCERS = {
+    'soma': reduzir_soma,
+    'min': reduzir_min,
+    'max': reduzir_max,
+    'concat': reduzir_concat,
+}
+
+def dividir_csv_em_faixas(arquivo_csv, n_faixas):
+    """Dividir CSV em faixas de bytes alinhadas ao início de linha
+
+    Assume que não há quebras de linha dentro de campos entre aspas.
+    Retorna o cabeçalho e uma lista de (inicio, fim) em bytes.
+    """
+    tamanho = os.path.getsize(arquivo_csv)
+    with open(arquivo_csv, 'rb') as f:
+        cabecalho = f.readline()
+        inicio_dados = f.tell()
+        passo = max(1, (tamanho - inicio_dados) // n_faixas)
+        
+        limites = [inicio_dados]
+        for i in range(1, n_faixas):
+            f.seek(max(inicio_dados + i * passo, limites[-1]))
+            f.readline()  # Avançar até o fim da linha atual
+            posicao = f.tell()
+            if posicao >= tamanho:
+                break
+            if posicao > limites[-1]:
+                limites.append(posicao)
+        limites.append(tamanho)
+    
+    faixas = [(inicio, fim) for inicio, fim in zip(limites[:-1], limites[1:]) if fim > inicio]
+    return cabecalho, faixas
+
+# Estado de cada worker (definido uma vez pelo initializer do pool)
+_func_chunk_worker = None
+
+def _inicializar_worker(func_chunk):
+    global _func_chunk_worker
+    _func_chunk_worker = func_chunk
+
+def _executar_tarefa(tarefa):
+    """Carregar o chunk descrito pela tarefa (dentro do worker) e aplicar a função"""
+    tipo = tarefa[0]
+    
+    if tipo == 'dataframe':
+        chunk = tarefa[1]
+    elif tipo == 'csv':
+        _, arquivo, cabecalho, inicio, fim, kwargs_leitura = tarefa
+        with open(arquivo, 'rb') as f:
+            f.seek(inicio)
+            conteudo = f.read(fim - inicio)
+        chunk = pd.read_csv(io.BytesIO(cabecalho + conteudo), **kwargs_leitura)
+    elif tipo == 'parquet':
+        import pyarrow.parquet as pq
+        _, arquivo, row_group, colunas = tarefa
+        chunk = pq.ParquetFile(arquivo).read_row_group(row_group, columns=colunas).to_pandas()
+    else:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+    
+    return _func_chunk_worker(chunk)
+
+class ExecutorMapReduce:
+    """Executar uma função por chunk em um pool de processos e combinar os resultados
+
+    - fonte: DataFrame, caminho de CSV ou caminho de Parquet
+    - func_chunk: função aplicada a cada chunk (ex: processar_chunk_paralelo)
+    - reducer: nome em REDUCERS ou função que recebe a lista de parciais
+    """
+    
+    def __init__(self, func_chunk, reducer='soma', n_workers=None, usar_processos=True):
+        self.func_chunk = func_chunk
+        self.reducer = REDUCERS[reducer] if isinstance(reducer, str) else reducer
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.usar_processos = usar_processos
+        self.estatisticas = {}
+    
+    def _criar_pool(self):
+        """Criar pool de processos (fork) ou de threads como fallback"""
+        # Com 'fork' os workers herdam as funções definidas no script, inclusive
+        # lambdas; com 'spawn' o script inteiro seria reexecutado em cada worker.
+        if self.usar_processos and 'fork' in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_inicializar_worker,
+                initargs=(self.func_chunk,)
+            )
+        
+        _inicializar_worker(self.func_chunk)
+        return ThreadPoolExecutor(max_workers=self.n_workers)
+    
+    def gerar_tarefas(self, fonte, chunk_size=None, **kwargs_leitura):
+        """Descrever os chunks da fonte sem carregá-los no processo principal"""
+        if isinstance(fonte, pd.DataFrame):
+            tamanho = chunk_size or -(-len(fonte) // self.n_workers)
+            for inicio in range(0, len(fonte), max(1, tamanho)):
+                yield ('dataframe', fonte.iloc[inicio:inicio + tamanho])
+        
+        elif str(fonte).endswith('.parquet'):
+            import pyarrow.parquet as pq
+            n_row_groups = pq.ParquetFile(fonte).num_row_groups
+            colunas = kwargs_leitura.get('columns')
+            for row_group in range(n_row_groups):
+                yield ('parquet', fonte, row_group, colunas)
+        
+        else:
+            # Faixas de ~chunk_size linhas estimadas pelo tamanho médio da linha
+            if chunk_size:
+                with open(fonte, 'rb') as f:
+                    amostra = f.read(1024 * 1024)
+                bytes_por_linha = max(1, len(amostra) / max(1, amostra.count(b'\n')))
+                n_faixas = max(1, int(os.path.getsize(fonte) / bytes_por_linha // chunk_size))
+            else:
+                n_faixas = self.n_workers * 4
+            
+            cabecalho, faixas = dividir_csv_em_faixas(fonte, n_faixas)
+            for inicio, fim in faixas:
+                yield ('csv', fonte, cabecalho, inicio, fim, kwargs_leitura)
+    
+    def executar(self, fonte, chunk_size=None, **kwargs_leitura):
+        """Map em paralelo + reduce no processo principal"""
+        start = time.time()
+        parciais = {}
+        max_pendentes = self.n_workers * 2  # Limita chunks em memória ao mesmo tempo
+        
+        with self._criar_pool() as pool:
+            pendentes = {}
+            for i, tarefa in enumerate(self.gerar_tarefas(fonte, chunk_size, **kwargs_leitura)):
+                if len(pendentes) >= max_pendentes:
+                    concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        parciais[pendentes.pop(futuro)] = futuro.result()
+                pendentes[pool.submit(_executar_tarefa, tarefa)] = i
+            
+            for futuro in list(pendentes):
+                parciais[pendentes.pop(futuro)] = futuro.result()
+        
+        tempo_map = time.time() - start
+        resultado = self.reducer([parciais[i] for i in sorted(parciais)])
+        
+        self.estatisticas = {
+            'chunks': len(parciais),
+            'workers': self.n_workers,
+            'tempo_map': tempo_map,
+            'tempo_total': time.time() - start
+        }
+        return resultado
+
+print("Processamento paralelo map-reduce:")
+print("- Dividir a fonte em chunks (fatias, faixas de bytes do CSV ou row groups)")
 print("- Processar cada chunk em processo separado")
-print("- Combinar resultados")
-print("- Usar multiprocessing.Pool ou joblib")
+print("- Combinar resultados com um reducer plugável")
+
+n_workers = 4
+executor = ExecutorMapReduce(processar_chunk_paralelo, reducer='soma', n_workers=n_workers)
 
-# Simulação de divisão em chunks
-num_chunks = 4
-chunk_size = len(df_grande) // num_chunks
+# DataFrame em memória
+resultado_paralelo = executor.executar(df_grande)
+print(f"\n10.1 DataFrame ({len(df_grande):,} registros) em {executor.estatisticas['chunks']} chunks, "
+      f"{executor.estatisticas['workers']} workers: {executor.estatisticas['tempo_total']:.4f}s")
 
-print(f"\nDividindo {len(df_grande):,} registros em {num_chunks} chunks de ~{chunk_size:,}")
+resultado_serial = processar_chunk_paralelo(df_grande)
+print(f"Resultado igual ao serial: {np.allclose(resultado_paralelo.sort_index(), resultado_serial.sort_index())}")
 
-chunks = []
-for i in range(num_chunks):
-    start_idx = i * chunk_size
-    end_idx = start_idx + chunk_size if i < num_chunks - 1 else len(df_grande)
-    chunk = df_grande.iloc[start_idx:end_idx]
-    chunks.append(chunk)
+# Arquivo CSV: cada worker lê e faz o parse da própria faixa de bytes
+arquivo_paralelo = 'temp_paralelo.csv'
+df_grande[['categoria', 'valor', 'quantidade']].to_csv(arquivo_paralelo, index=False)
 
-print(f"Chunks criados: {[len(c) for c in chunks]}")
+try:
+    resultado_csv = executor.executar(arquivo_paralelo, chunk_size=20000)
+    print(f"\n10.2 CSV em {executor.estatisticas['chunks']} faixas: {executor.estatisticas['tempo_total']:.4f}s")
+    print(resultado_csv.round(2))
+    
+    # Reducer customizado: qualquer função que receba a lista de parciais
+    contar_linhas = ExecutorMapReduce(len, reducer=sum, n_workers=n_workers)
+    print(f"Total de linhas (reducer customizado): {contar_linhas.executar(arquivo_paralelo):,}")
+finally:
+    if os.path.exists(arquivo_paralelo):
+        os.remove(arquivo_paralelo)
 
 # 11. PROFILING E DEBUGGING
 print("\n11. PROFILING E DEBUGGING")
 print("-" * 30)
 
-def profile_funcao(func, *args, **kwargs):
-    """Fazer profiling de uma função"""
+import sys
+import signal
+import threading
+from collections import Counter
+
+# Rotuladores: reconhecem frames de pipelines pela estrutura (sem alterar as classes)
+def rotular_pipeline_avancado(frame):
+    """Frame de PipelineAvancado.execute: rótulo com o nome do step em execução"""
+    if frame.f_code.co_name != 'execute':
+        return None
+    locais = frame.f_locals
+    step, pipeline = locais.get('step'), locais.get('self')
+    if isinstance(step, dict) and 'nome' in step and hasattr(pipeline, 'steps'):
+        return f"[{getattr(pipeline, 'nome', type(pipeline).__name__)}] {step['nome']}"
+    return None
+
+def rotular_pipeline_etl(frame):
+    """Frames extract_*/transform_*/load_* de PipelineETL: rótulo com método e dataset
+
+    No modo lazy os nós rodam em _executar_no (nas threads do pool, fora do
+    frame do método); o nó guarda pipeline, método e datasets para o rótulo.
+    """
+    nome = frame.f_code.co_name
+    locais = frame.f_locals
+    if nome == '_executar_no':
+        no = locais.get('no')
+        if not isinstance(no, dict) or 'metodo' not in no:
+            return None
+        # Modo imediato: o frame do método, mais acima na pilha, já tem o rótulo
+        chamador = frame.f_back and frame.f_back.f_back
+        if chamador is not None and chamador.f_code.co_name == no['metodo']:
+            return None
+        dataset = no['saida'] or (no['entradas'][0] if no['entradas'] else None)
+        return f"[{no['pipeline']}] {no['metodo']}:{dataset}"
+    if not nome.startswith(('extract_', 'transform_', 'load_')):
+        return None
+    pipeline = locais.get('self')
+    if not hasattr(pipeline, 'dados'):
+        return None
+    dataset = locais.get('nome_dataset') or locais.get('nome_resultado') or locais.get('dataset')
+    return f"[{getattr(pipeline, 'nome', type(pipeline).__name__)}] {nome}:{dataset}"
+
+class _Etapa:
+    """Marca explícita de etapa: o rótulo entra na pilha logo abaixo do frame que abriu o with"""
+    
+    def __init__(self, profiler, nome):
+        self.profiler = profiler
+        self.nome = nome
+    
+    def __enter__(self):
+        self.frame = sys._getframe(1)
+        self.profiler._etapas.setdefault(id(self.frame), []).append(f"[{self.nome}]")
+        return self
+    
+    def __exit__(self, *exc):
+        rotulos = self.profiler._etapas[id(self.frame)]
+        rotulos.pop()
+        if not rotulos:
+            del self.profiler._etapas[id(self.frame)]
+        self.frame = None
+        return False
+
+class ProfilerAmostragem:
+    """Profiler por amostragem de pilhas (baixo overhead, saída para flame graph)
+
+    - modo='thread': uma thread lê sys._current_frames() a cada intervalo
+    - modo='sinal': SIGPROF via setitimer (só Unix, thread principal; conta tempo de CPU)
+    Gera pilhas no formato collapsed (flamegraph.pl / speedscope).
+    """
+    
+    def __init__(self, intervalo=0.005, modo='thread', todas_threads=False, rotuladores=None):
+        self.intervalo = intervalo
+        self.modo = modo
+        self.todas_threads = todas_threads
+        self.rotuladores = rotuladores if rotuladores is not None else [rotular_pipeline_avancado, rotular_pipeline_etl]
+        self.amostras = Counter()
+        self._etapas = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self.duracao = 0.0
+    
+    def etapa(self, nome):
+        """Context manager para atribuir o tempo de um trecho do seu código a um nome"""
+        return _Etapa(self, nome)
+    
+    def _descrever(self, frame):
+        codigo = frame.f_code
+        return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+    
+    def _registrar(self, frame, prefixo=None):
+        pilha = []
+        while frame is not None:
+            rotulos = list(self._etapas.get(id(frame), []))
+            for rotulador in self.rotuladores:
+                rotulo = rotulador(frame)
+                if rotulo:
+                    rotulos.append(rotulo)
+            # Pilha é montada da folha para a raiz: rótulos ficam abaixo do frame que os gerou
+            pilha.extend(reversed(rotulos))
+            pilha.append(self._descrever(frame))
+            frame = frame.f_back
+        if prefixo:
+            pilha.append(prefixo)
+        self.amostras[';'.join(reversed(pilha))] += 1
+    
+    def _amostrar_thread(self, id_alvo):
+        id_proprio = threading.get_ident()
+        nomes = {}
+        while not self._parar.wait(self.intervalo):
+            frames = sys._current_frames()
+            if self.todas_threads:
+                if len(nomes) != threading.active_count():
+                    nomes = {t.ident: t.name for t in threading.enumerate()}
+                for id_thread, frame in frames.items():
+                    if id_thread != id_proprio:
+                        self._registrar(frame, f"thread:{nomes.get(id_thread, id_thread)}")
+            elif id_alvo in frames:
+                self._registrar(frames[id_alvo])
+    
+    def _tratar_sinal(self, signum, frame):
+        self._registrar(frame)
+    
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        if self.modo == 'sinal':
+            self._handler_anterior = signal.signal(signal.SIGPROF, self._tratar_sinal)
+            signal.setitimer(signal.ITIMER_PROF, self.intervalo, self.intervalo)
+        else:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._amostrar_thread,
+                                            args=(threading.get_ident(),), daemon=True)
+            self._thread.start()
+        return self
+    
+    def parar(self):
+        if self.modo == 'sinal':
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._handler_anterior)
+        elif self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+        self.duracao += time.perf_counter() - self._inicio
+        return self
+    
+    def __enter__(self):
+        return self.iniciar()
+    
+    def __exit__(self, *exc):
+        self.parar()
+        return False
+    
+    def salvar_collapsed(self, arquivo):
+        """Salvar pilhas no formato collapsed ('frame;frame;frame contagem')"""
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            for pilha, contagem in self.amostras.most_common():
+                f.write(f"{pilha} {contagem}\n")
+        return arquivo
+    
+    def tempo_por_rotulo(self):
+        """Tempo estimado por etapa/step (pelo rótulo mais interno de cada amostra)"""
+        total = sum(self.amostras.values()) or 1
+        por_rotulo = Counter()
+        for pilha, contagem in self.amostras.items():
+            rotulos = [f for f in pilha.split(';') if f.startswith('[')]
+            por_rotulo[rotulos[-1] if rotulos else '(sem etapa)'] += contagem
+        return pd.Series({k: v / total * self.duracao for k, v in por_rotulo.most_common()}, name='segundos')
+    
+    def relatorio(self, n=10):
+        total = sum(self.amostras.values())
+        print(f"SAMPLING PROFILE: {total} amostras em {self.duracao:.3f}s "
+              f"(intervalo {self.intervalo * 1000:.1f}ms, modo {self.modo})")
+        
+        # Self time: frame no topo de cada pilha
+        topo = Counter()
+        for pilha, contagem in self.amostras.items():
+            topo[pilha.rsplit(';', 1)[-1]] += contagem
+        print("\nTop funções (self time):")
+        for funcao, contagem in topo.most_common(n):
+            print(f"  {contagem / max(total, 1):6.1%}  {funcao}")
+        
+        print("\nTempo por etapa:")
+        for rotulo, segundos in self.tempo_por_rotulo().items():
+            print(f"  {segundos:.3f}s  {rotulo}")
+
+def profile_funcao(func, *args, modo='cprofile', arquivo_flamegraph=None, **kwargs):
+    """Fazer profiling de uma função
+
+    - modo='cprofile': determinístico, top 10 por tempo cumulativo (overhead alto)
+    - modo='amostragem' (ou 'sinal'): ProfilerAmostragem, opcionalmente salvando
+      pilhas collapsed em arquivo_flamegraph
+    """
+    if modo in ('amostragem', 'sinal'):
+        profiler = ProfilerAmostragem(modo='sinal' if modo == 'sinal' else 'thread')
+        with profiler:
+            resultado = func(*args, **kwargs)
+        profiler.relatorio()
+        if arquivo_flamegraph:
+            profiler.salvar_collapsed(arquivo_flamegraph)
+            print(f"\n✓ Pilhas salvas em {arquivo_flamegraph} (flamegraph.pl / speedscope)")
+        return resultado
+    
     import cProfile
     import io
     import pstats
@@ -411,6 +1514,29 @@ def operacao_complexa(df):
 print("Fazendo profiling de operação complexa:")
 # resultado_profile = profile_funcao(operacao_complexa, df_grande.head(10000))
 
+print("\n11.1 Profiling por amostragem com etapas nomeadas:")
+profiler = ProfilerAmostragem(intervalo=0.002)
+
+def job_categorias(df):
+    with profiler.etapa('agregar'):
+        for _ in range(20):
+            operacao_complexa(df)
+    with profiler.etapa('pivot'):
+        for _ in range(20):
+            df.pivot_table(index='subcategoria', columns='categoria', values='valor', aggfunc='mean')
+
+with profiler:
+    job_categorias(df_grande)
+
+profiler.relatorio(n=5)
+arquivo_flamegraph = profiler.salvar_collapsed('temp_perfil.collapsed')
+print(f"\nPilhas collapsed: {len(profiler.amostras)} distintas em {arquivo_flamegraph}")
+print("Visualizar: flamegraph.pl temp_perfil.collapsed > perfil.svg (ou importar no speedscope.app)")
+print("Pipelines (PipelineAvancado.execute, PipelineETL.extract_*/transform_*/load_* e os nós")
+print("do modo lazy) são rotulados automaticamente: basta envolver a execução em")
+print("'with ProfilerAmostragem(todas_threads=True):' (o run() lazy executa em threads)")
+os.remove(arquivo_flamegraph)
+
 # 12. MELHORES PRÁTICAS
 print("\n12. MELHORES PRÁTICAS DE PERFORMANCE")
 print("-" * 45)
@@ -437,42 +1563,136 @@ for pratica in melhores_praticas:
 print("\n13. CLASSE PARA MONITORAMENTO")
 print("-" * 35)
 
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
 class MonitorPerformance:
-    """Classe para monitorar performance de operações pandas"""
+    """Classe para monitorar performance de operações pandas
+
+    - Spans aninhados (job > pipeline > step) via decorator ou context manager
+    - Pico de memória alocada por span com tracemalloc (inclui arrays NumPy)
+    - Amostragem opcional do RSS em thread de fundo (pega memória fora do Python)
+    - Exportação em JSON lines ou formato texto do Prometheus
+    """
     
-    def __init__(self):
+    def __init__(self, usar_tracemalloc=True, amostrar_rss=False, intervalo_amostragem=0.01):
         self.historico = []
         self.memoria_inicial = self.get_memoria()
+        self.usar_tracemalloc = usar_tracemalloc
+        self.amostrar_rss = amostrar_rss
+        self.intervalo_amostragem = intervalo_amostragem
+        self._pilha = []
+        self._lock = threading.Lock()
+        self._thread_rss = None
+        self._parar_rss = threading.Event()
+        self._tracemalloc_proprio = False
     
     def get_memoria(self):
         """Obter uso atual de memória"""
         process = psutil.Process(os.getpid())
         return process.memory_info().rss / 1024 / 1024
     
+    def _amostrador_rss(self):
+        """Thread de fundo: atualiza o pico de RSS de todos os spans abertos"""
+        process = psutil.Process(os.getpid())
+        while not self._parar_rss.wait(self.intervalo_amostragem):
+            rss = process.memory_info().rss / 1024 / 1024
+            with self._lock:
+                for frame in self._pilha:
+                    frame['pico_rss'] = max(frame['pico_rss'], rss)
+    
+    def _iniciar_rastreamento(self):
+        if self.usar_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_proprio = True
+        if self.amostrar_rss:
+            self._parar_rss.clear()
+            self._thread_rss = threading.Thread(target=self._amostrador_rss, daemon=True)
+            self._thread_rss.start()
+    
+    def _parar_rastreamento(self):
+        if self._thread_rss is not None:
+            self._parar_rss.set()
+            self._thread_rss.join()
+            self._thread_rss = None
+        if self._tracemalloc_proprio:
+            tracemalloc.stop()
+            self._tracemalloc_proprio = False
+    
+    @contextmanager
+    def span(self, nome_operacao, **atributos):
+        """Context manager para cronometrar um trecho (pode ser aninhado)"""
+        if not self._pilha:
+            self._iniciar_rastreamento()
+        
+        rastreando = tracemalloc.is_tracing()
+        alocado_inicio = 0
+        if rastreando:
+            # reset_peak é global: repassa o pico atual aos spans abertos antes de zerar
+            alocado_inicio, pico = tracemalloc.get_traced_memory()
+            for frame in self._pilha:
+                frame['pico_alocado'] = max(frame['pico_alocado'], pico)
+            tracemalloc.reset_peak()
+        
+        memoria_antes = self.get_memoria()
+        frame = {
+            'operacao': nome_operacao,
+            'caminho': '/'.join([f['operacao'] for f in self._pilha] + [nome_operacao]),
+            'nivel': len(self._pilha),
+            'alocado_inicio': alocado_inicio,
+            'pico_alocado': alocado_inicio,
+            'pico_rss': memoria_antes,
+            'inicio': datetime.now()
+        }
+        with self._lock:
+            self._pilha.append(frame)
+        start_time = time.perf_counter()
+        
+        try:
+            yield frame
+        finally:
+            end_time = time.perf_counter()
+            memoria_depois = self.get_memoria()
+            
+            if rastreando:
+                _, pico = tracemalloc.get_traced_memory()
+                frame['pico_alocado'] = max(frame['pico_alocado'], pico)
+            
+            with self._lock:
+                self._pilha.pop()
+                if self._pilha:
+                    pai = self._pilha[-1]
+                    pai['pico_alocado'] = max(pai['pico_alocado'], frame['pico_alocado'])
+                    pai['pico_rss'] = max(pai['pico_rss'], frame['pico_rss'])
+            
+            self.historico.append({
+                'operacao': nome_operacao,
+                'caminho': frame['caminho'],
+                'nivel': frame['nivel'],
+                'tempo': end_time - start_time,
+                'memoria_antes': memoria_antes,
+                'memoria_depois': memoria_depois,
+                'memoria_delta': memoria_depois - memoria_antes,
+                'pico_alocado_mb': (frame['pico_alocado'] - frame['alocado_inicio']) / 1024 / 1024,
+                'pico_rss_mb': max(frame['pico_rss'], memoria_depois),
+                'inicio': frame['inicio'],
+                'timestamp': datetime.now(),
+                **atributos
+            })
+            
+            print(f"{'  ' * frame['nivel']}✓ {nome_operacao}: {end_time - start_time:.4f}s")
+            
+            if not self._pilha:
+                self._parar_rastreamento()
+    
     def cronometrar(self, nome_operacao):
         """Decorator para cronometrar operações"""
         def decorator(func):
+            @wraps(func)
             def wrapper(*args, **kwargs):
-                memoria_antes = self.get_memoria()
-                start_time = time.time()
-                
-                resultado = func(*args, **kwargs)
-                
-                end_time = time.time()
-                memoria_depois = self.get_memoria()
-                
-                self.historico.append({
-                    'operacao': nome_operacao,
-                    'tempo': end_time - start_time,
-                    'memoria_antes': memoria_antes,
-                    'memoria_depois': memoria_depois,
-                    'memoria_delta': memoria_depois - memoria_antes,
-                    'timestamp': datetime.now()
-                })
-                
-                print(f"✓ {nome_operacao}: {end_time - start_time:.4f}s")
-                
-                return resultado
+                with self.span(nome_operacao):
+                    return func(*args, **kwargs)
             return wrapper
         return decorator
     
@@ -485,17 +1705,59 @@ class MonitorPerformance:
         print("\nRELATÓRIO DE PERFORMANCE")
         print("=" * 30)
         
-        df_historico = pd.DataFrame(self.historico)
+        # Spans são registrados ao terminar; reordenando pelo início (pai antes dos filhos)
+        df_historico = pd.DataFrame(self.historico).sort_values(['inicio', 'nivel'], kind='stable')
+        raizes = df_historico[df_historico['nivel'] == 0]
         
         print("Resumo das operações:")
         print(f"Total de operações: {len(df_historico)}")
-        print(f"Tempo total: {df_historico['tempo'].sum():.4f}s")
+        print(f"Tempo total: {raizes['tempo'].sum():.4f}s")
         print(f"Tempo médio: {df_historico['tempo'].mean():.4f}s")
         print(f"Operação mais lenta: {df_historico.loc[df_historico['tempo'].idxmax(), 'operacao']}")
+        print(f"Maior pico alocado: {df_historico.loc[df_historico['pico_alocado_mb'].idxmax(), 'caminho']} "
+              f"({df_historico['pico_alocado_mb'].max():.2f}MB)")
         
         print("\nDetalhes por operação:")
         for _, row in df_historico.iterrows():
-            print(f"{row['operacao']}: {row['tempo']:.4f}s (Δ mem: {row['memoria_delta']:+.2f}MB)")
+            print(f"{'  ' * row['nivel']}{row['operacao']}: {row['tempo']:.4f}s "
+                  f"(Δ mem: {row['memoria_delta']:+.2f}MB, pico: {row['pico_alocado_mb']:.2f}MB)")
+    
+    def exportar_jsonl(self, arquivo):
+        """Exportar histórico em JSON lines (um span por linha)"""
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            for registro in self.historico:
+                f.write(json.dumps(registro, default=str, ensure_ascii=False) + '\n')
+        return arquivo
+    
+    def exportar_prometheus(self, arquivo=None, prefixo='pandas_operacao'):
+        """Exportar métricas agregadas por caminho no formato texto do Prometheus"""
+        def escapar(valor):
+            return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        
+        df_historico = pd.DataFrame(self.historico)
+        metricas = [
+            ('execucoes_total', 'counter', 'Número de execuções', lambda g: len(g)),
+            ('duracao_segundos_total', 'counter', 'Tempo total de execução', lambda g: g['tempo'].sum()),
+            ('pico_alocado_bytes', 'gauge', 'Maior pico de memória alocada (tracemalloc)',
+             lambda g: g['pico_alocado_mb'].max() * 1024 * 1024),
+            ('pico_rss_bytes', 'gauge', 'Maior RSS observado', lambda g: g['pico_rss_mb'].max() * 1024 * 1024),
+        ]
+        
+        linhas = []
+        grupos = list(df_historico.groupby('caminho', sort=False)) if not df_historico.empty else []
+        for nome, tipo, ajuda, func in metricas:
+            linhas.append(f"# HELP {prefixo}_{nome} {ajuda}")
+            linhas.append(f"# TYPE {prefixo}_{nome} {tipo}")
+            for caminho, grupo in grupos:
+                operacao = grupo['operacao'].iloc[0]
+                rotulos = f'operacao="{escapar(operacao)}",caminho="{escapar(caminho)}"'
+                linhas.append(f"{prefixo}_{nome}{{{rotulos}}} {float(func(grupo))}")
+        
+        texto = '\n'.join(linhas) + '\n'
+        if arquivo:
+            with open(arquivo, 'w', encoding='utf-8') as f:
+                f.write(texto)
+        return texto
 
 # Exemplo de uso
 monitor = MonitorPerformance()
@@ -512,9 +1774,35 @@ def calcular_stats(df):
 resultado1 = agrupar_dados(df_grande.head(10000))
 resultado2 = calcular_stats(df_grande.head(10000))
 
+# Spans aninhados: job > pipeline > steps (decorators dentro de spans também aninham)
+with monitor.span("Job noturno"):
+    with monitor.span("Pipeline categorias"):
+        with monitor.span("Pivot temporário"):
+            pivot = df_grande.pivot_table(index='subcategoria', columns='categoria',
+                                          values='valor', aggfunc='sum')
+            del pivot
+        resultado3 = agrupar_dados(df_grande)
+
 # Relatório final
 monitor.relatorio()
 
+# Sem tracemalloc (overhead menor): pico de RSS via thread de amostragem
+monitor_rss = MonitorPerformance(usar_tracemalloc=False, amostrar_rss=True)
+with monitor_rss.span("Concat temporário"):
+    temporario = pd.concat([df_grande] * 3)
+    del temporario
+registro = monitor_rss.historico[-1]
+print(f"Pico de RSS: {registro['pico_rss_mb']:.2f}MB (antes: {registro['memoria_antes']:.2f}MB, "
+      f"depois: {registro['memoria_depois']:.2f}MB)")
+
+print("\nExportação para Prometheus:")
+print(monitor.exportar_prometheus())
+
+arquivo_metricas = monitor.exportar_jsonl('temp_metricas.jsonl')
+with open(arquivo_metricas, encoding='utf-8') as f:
+    print(f"\nJSON lines ({sum(1 for _ in f)} spans): {arquivo_metricas}")
+os.remove(arquivo_metricas)
+
 print("\n" + "=" * 60)
 print("FIM DA AULA 10")
 print("Próxima aula: Técnicas avançadas")
@@ -482,14 +482,24 @@ print(df_transformado.groupby('decil_score')['score_composto'].agg(['mean', 'std
 print("\n10. PIPELINE COMPLETO AVANÇADO")
 print("-" * 35)
 
+import os
+# governador_memoria.py e cache_etapas.py ficam ao lado das aulas (compartilhados com a aula 12)
+from governador_memoria import GovernadorMemoria, rss_mb
+from cache_etapas import CacheEtapas, impressao_dataframe
+
 class PipelineAvancado:
     """Pipeline avançado com logging e validação"""
     
-    def __init__(self, nome="Pipeline"):
+    def __init__(self, nome="Pipeline", governador=None, cache=None):
         self.nome = nome
         self.steps = []
         self.logs = []
-        self.data_history = []
+        # Com um GovernadorMemoria, a saída de cada step fica guardada (para
+        # inspeção) e pode ir para disco quando o RSS passar do limite
+        self.governador = governador
+        self.data_history = governador.registrar(nome) if governador else []
+        # Com um CacheEtapas, steps cuja entrada e código não mudaram são pulados
+        self.cache = cache
     
     def add_step(self, func, nome=None, validacao=None):
         """Adicionar step com validação opcional"""
@@ -504,6 +514,8 @@ class PipelineAvancado:
     def execute(self, df):
         """Executar pipeline completo"""
         resultado = df.copy()
+        # Impressão da entrada; depois, a de cada step encadeia a do anterior
+        impressao = impressao_dataframe(resultado) if self.cache else None
         
         print(f"Executando {self.nome}:")
         print("-" * (len(self.nome) + 11))
@@ -512,13 +524,27 @@ class PipelineAvancado:
             try:
                 print(f"Step {i}: {step['nome']}...")
                 
-                # Executar função
-                resultado = step['func'](resultado)
+                em_cache = None
+                if self.cache:
+                    impressao = self.cache.chave(step['func'], entradas=[impressao])
+                    em_cache = self.cache.obter(impressao)
+                
+                if em_cache is not None:
+                    resultado = em_cache
+                    print("  ↺ Reaproveitado do cache")
+                else:
+                    # Executar função
+                    resultado = step['func'](resultado)
+                    if self.cache:
+                        self.cache.guardar(impressao, resultado)
                 
                 # Validação opcional
                 if step['validacao']:
                     step['validacao'](resultado)
                 
+                if self.governador:
+                    self.data_history[f"{i:02d}_{step['nome']}"] = resultado
+                
                 # Log
                 self.logs.append({
                     'step': step['nome'],
@@ -572,6 +598,49 @@ print(f"\nResultado final: {resultado_pipeline.shape}")
 print("Primeiras linhas:")
 print(resultado_pipeline[['nome', 'salario_normalizado', 'score_composto', 'decil_score']].head())
 
+print("\n10.1 Pipeline com governador de memória:")
+# Limite abaixo do RSS atual: toda saída intermediária ociosa vai para disco
+with GovernadorMemoria(limite_rss_mb=rss_mb() - 1) as governador:
+    pipeline_governado = PipelineAvancado("Clientes (governado)", governador)
+    for step in pipeline.steps:
+        pipeline_governado.add_step(step['func'], step['nome'], step['validacao'])
+    
+    resultado_governado = pipeline_governado.execute(df)
+    historico = pipeline_governado.data_history
+    for nome in historico:
+        local = "disco" if historico.em_disco(nome) else "memória"
+        print(f"  {nome}: {historico.forma(nome)} em {local}")
+    
+    # Recarga preguiçosa: o step é lido do Parquet só quando acessado
+    primeiro_step = next(iter(historico))
+    print(f"Recarregado '{primeiro_step}': {historico[primeiro_step].shape}")
+    print(f"Estatísticas: {governador.estatisticas()}")
+
+print("\n10.2 Pipeline com cache de steps:")
+cache_steps = CacheEtapas('cache_etapas_aula11', limite_mb=20)
+
+def montar_pipeline_cacheado(ultimo_step):
+    pipeline_cache = PipelineAvancado("Clientes (cache)", cache=cache_steps)
+    for step in pipeline.steps[:-1]:
+        pipeline_cache.add_step(step['func'], step['nome'])
+    return pipeline_cache.add_step(ultimo_step)
+
+def adicionar_quintis(df):
+    df = df.copy()
+    df['decil_score'] = pd.qcut(df['score_composto'], q=5, labels=False) + 1
+    return df
+
+montar_pipeline_cacheado(adicionar_decis).execute(df)
+print()
+# Mesma entrada e mesmo código: todos os steps vêm do cache
+montar_pipeline_cacheado(adicionar_decis).execute(df)
+print()
+# Só o último step mudou: os anteriores vêm do cache
+montar_pipeline_cacheado(adicionar_quintis).execute(df)
+print(f"Cache: {cache_steps.estatisticas()}")
+cache_steps.limpar()
+os.rmdir('cache_etapas_aula11')
+
 print("\n" + "=" * 60)
 print("FIM DA AULA 11")
 print("Próxima aula: Integração com outras ferramentas")
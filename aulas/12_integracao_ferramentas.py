@@ -30,6 +30,73 @@ print("=" * 60)
 print("\n1. INTEGRAÇÃO COM SQL DATABASES")
 print("-" * 35)
 
+# Carga em massa no SQLite: executemany com tuplas montadas coluna a coluna,
+# uma transação por lote e índices criados só depois dos dados
+def _ident(nome):
+    """Identificador SQL entre aspas"""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+def _linhas_sql(df):
+    """Linhas como tuplas Python, montadas coluna a coluna (NaN -> NULL)"""
+    colunas = []
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.ArrowDtype) and serie.dtype.kind == 'M':
+            serie = serie.astype(serie.dtype.numpy_dtype)  # timestamp Arrow -> datetime64
+        # Datas no mesmo formato do to_sql (datetime.isoformat(' ')): frações
+        # de segundo em microssegundos, omitidas quando são zero
+        if pd.api.types.is_datetime64_dtype(serie):
+            # datetime_as_string formata o array inteiro em C, bem mais rápido que dt.strftime
+            texto = np.char.replace(np.datetime_as_string(serie.values, unit='us'), 'T', ' ')
+            valores = pd.Series(np.char.replace(texto, '.000000', ''), index=serie.index, dtype=object)
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            # Com fuso horário: o offset entra no texto, como no to_sql
+            valores = serie.astype(object).map(
+                lambda valor: None if valor is pd.NaT else valor.to_pydatetime().isoformat(' '))
+        else:
+            valores = serie.astype(object)
+        ausentes = serie.isna()
+        if ausentes.any():
+            valores = valores.where(~ausentes, None)
+        colunas.append(valores.tolist())
+    return list(zip(*colunas))
+
+def carga_em_massa_sql(df, conn, tabela, if_exists='replace', batch_size=50_000, indices=(), staging=False):
+    """Alternativa ao to_sql para cargas grandes no SQLite
+    
+    - tabela criada com o mesmo esquema do to_sql (df.head(0).to_sql)
+    - INSERT via executemany, uma transação por lote de batch_size linhas
+    - indices: colunas (ou tuplas de colunas) indexadas após a carga
+    - staging=True: journal_mode=WAL e synchronous=OFF durante a carga,
+      ambos restaurados no fim (sem fsync: uma queda de energia pode
+      corromper o banco; use só em tabelas de staging que podem ser recarregadas)
+    """
+    df.head(0).to_sql(tabela, conn, if_exists=if_exists, index=False)
+    sql = (f"INSERT INTO {_ident(tabela)} ({', '.join(map(_ident, df.columns))}) "
+           f"VALUES ({', '.join('?' * len(df.columns))})")
+    
+    if staging:
+        synchronous_anterior = conn.execute("PRAGMA synchronous").fetchone()[0]
+        journal_anterior = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+    try:
+        for inicio in range(0, len(df), batch_size):
+            with conn:  # commit por lote (rollback se o lote falhar)
+                conn.executemany(sql, _linhas_sql(df.iloc[inicio:inicio + batch_size]))
+        
+        # Um índice construído de uma vez é bem mais barato que mantido a cada INSERT
+        for indice in indices:
+            cols_indice = [indice] if isinstance(indice, str) else list(indice)
+            with conn:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {_ident('idx_' + tabela + '_' + '_'.join(cols_indice))} "
+                             f"ON {_ident(tabela)} ({', '.join(map(_ident, cols_indice))})")
+    finally:
+        if staging:
+            conn.execute(f"PRAGMA synchronous={synchronous_anterior}")
+            conn.execute(f"PRAGMA journal_mode={journal_anterior}")
+    return len(df)
+
 # Criando database SQLite para demonstração
 def criar_database_exemplo():
     """Criar database SQLite com dados de exemplo"""
@@ -57,8 +124,8 @@ def criar_database_exemplo():
     })
     
     # Salvando no SQLite
-    clientes.to_sql('clientes', conn, if_exists='replace', index=False)
-    pedidos.to_sql('pedidos', conn, if_exists='replace', index=False)
+    carga_em_massa_sql(clientes, conn, 'clientes')
+    carga_em_massa_sql(pedidos, conn, 'pedidos', indices=['cliente_id'])
     
     conn.close()
     print("✓ Database SQLite criado com sucesso")
@@ -104,11 +171,49 @@ df_resumo['categoria_cliente'] = pd.cut(
 )
 
 # Salvando nova tabela
-df_resumo.to_sql('analise_clientes', conn, if_exists='replace', index=False)
+carga_em_massa_sql(df_resumo, conn, 'analise_clientes')
 print("✓ Análise salva na tabela 'analise_clientes'")
 
 conn.close()
 
+print("\n1.3 Carga em massa vs to_sql:")
+import time
+import os
+
+n_staging = 300_000
+df_staging = pd.DataFrame({
+    'pedido_id': np.arange(n_staging),
+    'cliente_id': np.random.randint(1, 10_000, n_staging),
+    'valor': np.random.uniform(50, 1000, n_staging).round(2),
+    'status': np.random.choice(['Pendente', 'Enviado', 'Entregue'], n_staging),
+    'data_pedido': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n_staging), unit='s')
+})
+
+def carga_to_sql(conn):
+    # Tabela já indexada, como numa carga recorrente com to_sql
+    df_staging.head(0).to_sql('staging_pedidos', conn, if_exists='replace', index=False)
+    conn.execute('CREATE INDEX idx_staging_cliente ON staging_pedidos (cliente_id)')
+    df_staging.to_sql('staging_pedidos', conn, if_exists='append', index=False, chunksize=50_000)
+
+variantes_carga = {
+    'to_sql (índice existente)': carga_to_sql,
+    'em massa (índice adiado)': lambda conn: carga_em_massa_sql(
+        df_staging, conn, 'staging_pedidos', indices=['cliente_id']),
+    'em massa + WAL/synchronous=OFF': lambda conn: carga_em_massa_sql(
+        df_staging, conn, 'staging_pedidos', indices=['cliente_id'], staging=True),
+}
+for rotulo, carga in variantes_carga.items():
+    conn = sqlite3.connect('staging.db')
+    inicio = time.time()
+    carga(conn)
+    duracao = time.time() - inicio
+    total = conn.execute('SELECT COUNT(*) FROM staging_pedidos').fetchone()[0]
+    conn.close()
+    for sufixo in ['', '-wal', '-shm']:
+        if os.path.exists('staging.db' + sufixo):
+            os.remove('staging.db' + sufixo)
+    print(f"{rotulo:32s}: {duracao:.2f}s ({total / duracao:,.0f} linhas/s)")
+
 # 2. TRABALHANDO COM PARQUET
 print("\n2. TRABALHANDO COM PARQUET")
 print("-" * 30)
@@ -128,9 +233,6 @@ print(f"Dataset criado: {df_grande.shape}")
 # Salvando em diferentes formatos para comparar
 print("\n2.1 Comparando formatos de arquivo:")
 
-import time
-import os
-
 # CSV
 start = time.time()
 df_grande.to_csv('dados_teste.csv', index=False)
@@ -161,6 +263,8 @@ tempo_parquet_read = time.time() - start
 print(f"Leitura CSV: {tempo_csv_read:.2f}s")
 print(f"Leitura Parquet: {tempo_parquet_read:.2f}s")
 print(f"Parquet é {tempo_csv_read/tempo_parquet_read:.1f}x mais rápido")
+# Codecs, Feather/Arrow IPC, JSON lines, leitura de colunas e vários tamanhos:
+# python benchmarks/benchmark_formatos.py
 
 # Limpando arquivos
 os.remove('dados_teste.csv')
@@ -214,6 +318,175 @@ if response_vendas['status'] == 'success':
     print("Dados combinados da API:")
     print(df_api_completo[['nome', 'valor', 'ativo']].head())
 
+print("\n3.2 Extração paginada e assíncrona:")
+import asyncio
+import math
+import random
+
+class SimuladorAPIPaginada(SimuladorAPI):
+    """SimuladorAPI com paginação, latência de rede e falhas transitórias
+    
+    Servidor local de teste: cada página demora `latencia` segundos e, com
+    probabilidade `taxa_falha`, responde 503 (como uma API sobrecarregada).
+    """
+    
+    def __init__(self, n_vendas=5000, latencia=0.02, taxa_falha=0.0, semente=42):
+        super().__init__()
+        gerador = np.random.default_rng(semente)
+        self.dados['vendas'] = [
+            {'id': i, 'usuario_id': int(usuario), 'valor': float(valor)}
+            for i, usuario, valor in zip(
+                range(1, n_vendas + 1),
+                gerador.integers(1, 11, n_vendas),
+                gerador.uniform(100, 1000, n_vendas).round(2)
+            )
+        ]
+        self.latencia = latencia
+        self.taxa_falha = taxa_falha
+        self._aleatorio = random.Random(semente)
+        self.requisicoes = 0
+    
+    async def get_pagina(self, endpoint, pagina=1, por_pagina=100):
+        """Simular GET /endpoint?page=N&per_page=M"""
+        await asyncio.sleep(self.latencia)
+        self.requisicoes += 1
+        if endpoint not in self.dados:
+            return {'status': 'error', 'codigo': 404, 'message': 'Endpoint não encontrado'}
+        if self._aleatorio.random() < self.taxa_falha:
+            return {'status': 'error', 'codigo': 503, 'message': 'Serviço indisponível'}
+        
+        registros = self.dados[endpoint]
+        inicio = (pagina - 1) * por_pagina
+        return {
+            'status': 'success',
+            'data': registros[inicio:inicio + por_pagina],
+            'pagina': pagina,
+            'total_paginas': max(1, math.ceil(len(registros) / por_pagina)),
+            'total_registros': len(registros)
+        }
+
+class AcumuladorColunar:
+    """Montar um DataFrame página a página, direto em arrays por coluna
+    
+    Com o total de registros conhecido, cada coluna é um array NumPy
+    pré-alocado e cada página preenche a sua fatia assim que chega, em
+    qualquer ordem. Não existe uma lista com todos os dicts da extração.
+    """
+    
+    def __init__(self, total_registros):
+        self.total = total_registros
+        self.colunas = {}
+        self.paginas = 0
+    
+    def adicionar(self, posicao, registros):
+        """Copiar os registros de uma página para as linhas posicao..posicao+len"""
+        fim = posicao + len(registros)
+        if fim > self.total:
+            # Registros inseridos na fonte depois da primeira página deslocam as páginas seguintes
+            raise ErroAPI(f"Página com linhas {posicao}..{fim} além do total informado ({self.total}); "
+                          f"a coleção mudou durante a extração")
+        nomes = dict.fromkeys(nome for registro in registros for nome in registro)
+        for nome in nomes:
+            lista = [registro.get(nome) for registro in registros]
+            if all(isinstance(valor, (bool, int, float)) for valor in lista):
+                valores = np.array(lista)
+            else:
+                # Textos, None e campos com listas/dicts: um objeto Python por célula
+                # (np.array transformaria listas em uma dimensão a mais)
+                valores = np.fromiter(lista, dtype=object, count=len(lista))
+            
+            coluna = self.colunas.get(nome)
+            if coluna is None:
+                if self.paginas == 0:
+                    coluna = np.empty(self.total, dtype=valores.dtype)
+                else:
+                    # Coluna que só aparece em páginas posteriores: o resto fica None
+                    coluna = np.full(self.total, None, dtype=object)
+            elif not np.can_cast(valores.dtype, coluna.dtype):
+                coluna = coluna.astype(np.result_type(coluna.dtype, valores.dtype))
+            coluna[posicao:fim] = valores
+            self.colunas[nome] = coluna
+        
+        # Colunas ausentes nesta página
+        for nome, coluna in self.colunas.items():
+            if nome not in nomes:
+                if coluna.dtype != object:
+                    coluna = self.colunas[nome] = coluna.astype(object)
+                coluna[posicao:fim] = None
+        self.paginas += 1
+    
+    def para_dataframe(self):
+        return pd.DataFrame(self.colunas).infer_objects()
+
+class ErroAPI(Exception):
+    """Resposta de erro definitiva (ou transitória que esgotou as tentativas)"""
+
+class ExtratorAPIAssincrono:
+    """Extrair um endpoint paginado com requisições concorrentes
+    
+    - max_concorrencia: páginas em voo ao mesmo tempo (asyncio.Semaphore)
+    - tentativas: repetições para erros transitórios (429/5xx), com backoff
+      exponencial e jitter: backoff_inicial × 2^tentativa × [0.5, 1.5)
+    """
+    
+    CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+    
+    def __init__(self, api, por_pagina=100, max_concorrencia=8, tentativas=4, backoff_inicial=0.05):
+        self.api = api
+        self.por_pagina = por_pagina
+        self.max_concorrencia = max_concorrencia
+        self.tentativas = tentativas
+        self.backoff_inicial = backoff_inicial
+        self.repeticoes = 0
+    
+    async def _buscar(self, semaforo, endpoint, pagina):
+        for tentativa in range(self.tentativas + 1):
+            async with semaforo:
+                resposta = await self.api.get_pagina(endpoint, pagina, self.por_pagina)
+            if resposta['status'] == 'success':
+                return resposta
+            if resposta.get('codigo') not in self.CODIGOS_TRANSITORIOS or tentativa == self.tentativas:
+                raise ErroAPI(f"{endpoint} página {pagina}: {resposta.get('codigo')} {resposta['message']}")
+            # Espera fora do semáforo: a vaga fica livre para outra página
+            self.repeticoes += 1
+            await asyncio.sleep(self.backoff_inicial * 2 ** tentativa * random.uniform(0.5, 1.5))
+    
+    async def extrair(self, endpoint):
+        """DataFrame com todas as páginas do endpoint"""
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        # A primeira página informa o total; as demais saem em paralelo
+        primeira = await self._buscar(semaforo, endpoint, 1)
+        acumulador = AcumuladorColunar(primeira['total_registros'])
+        if primeira['data']:
+            acumulador.adicionar(0, primeira['data'])
+        
+        tarefas = [
+            asyncio.create_task(self._buscar(semaforo, endpoint, pagina))
+            for pagina in range(2, primeira['total_paginas'] + 1)
+        ]
+        try:
+            for tarefa in asyncio.as_completed(tarefas):
+                resposta = await tarefa
+                posicao = (resposta['pagina'] - 1) * self.por_pagina
+                acumulador.adicionar(posicao, resposta['data'])
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+        return acumulador.para_dataframe()
+
+api_paginada = SimuladorAPIPaginada(n_vendas=5000, latencia=0.02, taxa_falha=0.1)
+for concorrencia in [1, 16]:
+    extrator = ExtratorAPIAssincrono(api_paginada, por_pagina=100, max_concorrencia=concorrencia)
+    inicio = time.time()
+    df_vendas_paginado = asyncio.run(extrator.extrair('vendas'))
+    print(f"Concorrência {concorrencia:2d}: {len(df_vendas_paginado)} vendas em "
+          f"{time.time() - inicio:.2f}s ({extrator.repeticoes} repetições após 503)")
+
+# Mesmo conteúdo e ordem que a lista completa de dicts do simulador
+df_vendas_referencia = pd.DataFrame(api_paginada.dados['vendas'])
+print(f"Igual à extração em lista de dicts: {df_vendas_paginado.equals(df_vendas_referencia)}")
+print(df_vendas_paginado.dtypes.to_dict())
+
 # 4. PANDAS COM DASK (Big Data)
 print("\n4. PANDAS COM DASK (Big Data)")
 print("-" * 35)
@@ -241,6 +514,268 @@ resultado_final = resultado.compute()
 print("\n4.2 Exemplo de código Dask:")
 print(exemplo_dask)
 
+print("\n4.3 Motor particionado local (a mesma ideia, sem Dask):")
+import functools
+import glob
+import io
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Agregações decomponíveis: cada partição calcula parciais por grupo, que
+# depois são combinadas (a média vira soma + contagem)
+PARCIAIS_AGG = {'sum': ['sum'], 'count': ['count'], 'mean': ['sum', 'count'], 'min': ['min'], 'max': ['max']}
+COMBINAR_AGG = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+def _planejar_agregacao(agg_dict):
+    """Parciais por coluna e como combiná-las, para um dicionário de agg()"""
+    funcoes = {col: [f] if isinstance(f, str) else list(f) for col, f in agg_dict.items()}
+    for col, lista in funcoes.items():
+        nao_suportadas = [f for f in lista if f not in PARCIAIS_AGG]
+        if nao_suportadas:
+            raise ValueError(f"Agregação não decomponível em partes: {col} -> {nao_suportadas}")
+    parciais = {col: sorted({p for f in lista for p in PARCIAIS_AGG[f]}) for col, lista in funcoes.items()}
+    combinar = {(col, p): COMBINAR_AGG[p] for col, lista in parciais.items() for p in lista}
+    return parciais, combinar
+
+def _combinar_parciais(partes, group_by, combinar):
+    niveis = list(range(len(group_by) if isinstance(group_by, list) else 1))
+    return pd.concat(partes).groupby(level=niveis).agg(combinar)
+
+def _finalizar_agregacao(estado, agg_dict):
+    """Resultado final (colunas como no agg() do pandas) a partir das parciais combinadas"""
+    resultado = {}
+    for col, funcoes in agg_dict.items():
+        for f in [funcoes] if isinstance(funcoes, str) else funcoes:
+            valor = estado[(col, 'sum')] / estado[(col, 'count')] if f == 'mean' else estado[(col, f)]
+            resultado[col if isinstance(funcoes, str) else (col, f)] = valor
+    return pd.DataFrame(resultado).reset_index()
+
+def _ler_faixa_csv(caminho, inicio, fim, colunas, kwargs_leitura):
+    """Uma partição de um CSV: as linhas entre dois offsets em bytes"""
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    return pd.read_csv(io.BytesIO(dados), header=None, names=colunas, **kwargs_leitura)
+
+def _ler_arquivo(caminho, kwargs_leitura):
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho, **kwargs_leitura)
+    return pd.read_csv(caminho, **kwargs_leitura)
+
+# Planos em execução, por id. Com fork, os processos do pool herdam este
+# dicionário e recebem só (id, partição): lambdas do plano não são serializadas
+_PLANOS_PARTICIONADOS = {}
+_IDS_PLANOS = itertools.count()
+
+def _executar_particao(id_plano, indice):
+    """Ler uma partição e aplicar as operações registradas (e a agregação parcial)"""
+    plano = _PLANOS_PARTICIONADOS[id_plano]
+    df = plano['fontes'][indice]()
+    for operacao, argumento in plano['operacoes']:
+        if operacao == 'filter':
+            df = df.query(argumento) if isinstance(argumento, str) else df[argumento(df)]
+        elif operacao == 'assign':
+            df = df.assign(**argumento)
+        elif operacao == 'merge':
+            df_pequeno, kwargs_merge = argumento
+            df = df.merge(df_pequeno, **kwargs_merge)
+    if plano['agregacao'] is not None:
+        group_by, parciais = plano['agregacao']
+        df = df.groupby(group_by).agg(parciais)
+    return df
+
+class DataFrameParticionado:
+    """DataFrame dividido em partições, com operações registradas de forma lazy
+    
+    Nada é lido nem calculado até compute(): cada partição é carregada e passa
+    por filter/assign/merge (e pela agregação parcial) num pool de threads ou
+    processos; os resultados são combinados no final. merge aceita apenas
+    DataFrames pequenos, copiados para todas as partições.
+    """
+    
+    def __init__(self, fontes, operacoes=()):
+        # fontes: funções sem argumentos que carregam cada partição
+        self.fontes = list(fontes)
+        self.operacoes = list(operacoes)
+        if not self.fontes:
+            raise ValueError("DataFrameParticionado precisa de pelo menos uma partição")
+    
+    @classmethod
+    def ler_csv(cls, caminho, n_particoes=4, **kwargs_leitura):
+        """Dividir um CSV em faixas de bytes alinhadas a quebras de linha
+        
+        (campos entre aspas com quebra de linha não são suportados)
+        """
+        # As faixas supõem uma linha de cabeçalho e leem o resto até o fim
+        nao_suportados = {'header', 'names', 'skiprows', 'nrows', 'skipfooter'} & set(kwargs_leitura)
+        if nao_suportados:
+            raise ValueError(f"ler_csv não suporta {sorted(nao_suportados)}")
+        # Partições não têm cabeçalho: names recebe todas as colunas e o
+        # usecols é aplicado depois, pelo nome, em cada partição
+        kwargs_cabecalho = {k: v for k, v in kwargs_leitura.items() if k != 'usecols'}
+        colunas = list(pd.read_csv(caminho, nrows=0, **kwargs_cabecalho).columns)
+        tamanho = os.path.getsize(caminho)
+        with open(caminho, 'rb') as f:
+            f.readline()  # cabeçalho
+            offsets = [f.tell()]
+            inicio_dados = offsets[0]
+            for k in range(1, n_particoes):
+                f.seek(inicio_dados + k * (tamanho - inicio_dados) // n_particoes)
+                f.readline()  # avançar até o fim da linha corrente
+                if offsets[-1] < f.tell() < tamanho:
+                    offsets.append(f.tell())
+        offsets.append(tamanho)
+        fontes = [functools.partial(_ler_faixa_csv, caminho, inicio, fim, colunas, kwargs_leitura)
+                  for inicio, fim in zip(offsets, offsets[1:]) if fim > inicio]
+        if not fontes:
+            # Só o cabeçalho: uma partição vazia, com as colunas e operações de sempre
+            fontes = [functools.partial(pd.read_csv, caminho, **kwargs_leitura)]
+        return cls(fontes)
+    
+    @classmethod
+    def ler_diretorio(cls, padrao, **kwargs_leitura):
+        """Uma partição por arquivo (CSV ou Parquet) que casa com o padrão glob"""
+        arquivos = sorted(glob.glob(padrao))
+        if not arquivos:
+            raise FileNotFoundError(f"Nenhum arquivo para {padrao}")
+        return cls(functools.partial(_ler_arquivo, arquivo, kwargs_leitura) for arquivo in arquivos)
+    
+    @classmethod
+    def de_pandas(cls, df, n_particoes=4):
+        # DataFrame vazio vira uma partição vazia
+        tamanho = max(1, -(-len(df) // n_particoes))
+        return cls(functools.partial(df.iloc.__getitem__, slice(inicio, inicio + tamanho))
+                   for inicio in range(0, max(len(df), 1), tamanho))
+    
+    @property
+    def n_particoes(self):
+        return len(self.fontes)
+    
+    def _com(self, operacao, argumento):
+        return DataFrameParticionado(self.fontes, self.operacoes + [(operacao, argumento)])
+    
+    def filter(self, condicao):
+        """condicao: função df -> máscara booleana, ou expressão de df.query"""
+        return self._com('filter', condicao)
+    
+    def assign(self, **colunas):
+        return self._com('assign', colunas)
+    
+    def merge(self, df_pequeno, how='inner', **kwargs_merge):
+        # Cada partição faz o merge sozinha: só vale com a partição à esquerda
+        if how not in ('inner', 'left'):
+            raise ValueError(f"merge particionado suporta how='inner' ou 'left', não {how!r}")
+        return self._com('merge', (df_pequeno, dict(kwargs_merge, how=how)))
+    
+    def groupby(self, group_by):
+        return GroupByParticionado(self, group_by)
+    
+    def _executar(self, agregacao, n_workers, usar_processos):
+        """Resultados por partição, na ordem das partições"""
+        id_plano = next(_IDS_PLANOS)
+        _PLANOS_PARTICIONADOS[id_plano] = {
+            'fontes': self.fontes, 'operacoes': self.operacoes, 'agregacao': agregacao
+        }
+        try:
+            if usar_processos and 'fork' in multiprocessing.get_all_start_methods():
+                pool = ProcessPoolExecutor(max_workers=n_workers,
+                                           mp_context=multiprocessing.get_context('fork'))
+            else:
+                pool = ThreadPoolExecutor(max_workers=n_workers)
+            with pool:
+                return list(pool.map(_executar_particao, [id_plano] * self.n_particoes,
+                                     range(self.n_particoes)))
+        finally:
+            del _PLANOS_PARTICIONADOS[id_plano]
+    
+    def compute(self, n_workers=4, usar_processos=False):
+        partes = self._executar(None, n_workers, usar_processos)
+        return pd.concat(partes, ignore_index=True)
+    
+    def __repr__(self):
+        etapas = " -> ".join(operacao for operacao, _ in self.operacoes) or "leitura"
+        return f"DataFrameParticionado({self.n_particoes} partições: {etapas})"
+
+class GroupByParticionado:
+    """groupby() lazy: agg() registra a agregação, que roda em duas fases"""
+    
+    def __init__(self, dados, group_by):
+        self.dados = dados
+        self.group_by = group_by
+    
+    def agg(self, agg_dict):
+        parciais, combinar = _planejar_agregacao(agg_dict)
+        return AgregacaoParticionada(self.dados, self.group_by, agg_dict, parciais, combinar)
+
+class AgregacaoParticionada:
+    def __init__(self, dados, group_by, agg_dict, parciais, combinar):
+        self.dados = dados
+        self.group_by = group_by
+        self.agg_dict = agg_dict
+        self.parciais = parciais
+        self.combinar = combinar
+    
+    def compute(self, n_workers=4, usar_processos=False):
+        # Fase 1 nas partições (parciais por grupo); fase 2 combina as parciais
+        partes = self.dados._executar((self.group_by, self.parciais), n_workers, usar_processos)
+        estado = _combinar_parciais(partes, self.group_by, self.combinar)
+        return _finalizar_agregacao(estado, self.agg_dict)
+    
+    def __repr__(self):
+        return f"{self.dados!r} -> groupby({self.group_by!r}).agg({self.agg_dict})"
+
+# Arquivo "grande" de vendas e uma dimensão pequena de regiões
+n_vendas_grandes = 400_000
+rng_vendas = np.random.default_rng(7)
+pd.DataFrame({
+    'venda_id': np.arange(n_vendas_grandes),
+    'regiao_id': rng_vendas.integers(1, 6, n_vendas_grandes),
+    'categoria': rng_vendas.choice(['Eletrônicos', 'Casa', 'Esporte', 'Livros'], n_vendas_grandes),
+    'valor': rng_vendas.uniform(10, 1000, n_vendas_grandes).round(2)
+}).to_csv('vendas_grandes.csv', index=False)
+df_regioes = pd.DataFrame({
+    'regiao_id': [1, 2, 3, 4, 5],
+    'regiao': ['Norte', 'Nordeste', 'Centro-Oeste', 'Sudeste', 'Sul']
+})
+
+vendas_particionadas = DataFrameParticionado.ler_csv('vendas_grandes.csv', n_particoes=8)
+consulta = (vendas_particionadas
+            .filter(lambda df: df['valor'] > 100)
+            .assign(valor_com_imposto=lambda df: df['valor'] * 1.1)
+            .merge(df_regioes, on='regiao_id', how='left')
+            .groupby(['regiao', 'categoria'])
+            .agg({'valor_com_imposto': 'sum', 'valor': ['mean', 'count']}))
+print(f"Plano (nada executado ainda): {consulta}")
+
+print(f"CPUs disponíveis: {os.cpu_count()}")
+for rotulo, usar_processos in [('threads', False), ('processos', True)]:
+    inicio = time.time()
+    resultado_particionado = consulta.compute(n_workers=4, usar_processos=usar_processos)
+    print(f"compute() com {rotulo}: {time.time() - inicio:.2f}s, {len(resultado_particionado)} grupos")
+
+# Referência: o mesmo cálculo em pandas, com o arquivo inteiro em memória
+df_vendas_grandes = pd.read_csv('vendas_grandes.csv')
+df_vendas_grandes = df_vendas_grandes[df_vendas_grandes['valor'] > 100].assign(
+    valor_com_imposto=lambda df: df['valor'] * 1.1).merge(df_regioes, on='regiao_id', how='left')
+referencia = df_vendas_grandes.groupby(['regiao', 'categoria']).agg(
+    {'valor_com_imposto': 'sum', 'valor': ['mean', 'count']}).reset_index()
+print(f"Igual ao pandas: {np.allclose(resultado_particionado.iloc[:, 2:], referencia.iloc[:, 2:])}")
+print(resultado_particionado.head())
+
+# Diretório com um arquivo por partição
+os.makedirs('vendas_particionadas', exist_ok=True)
+for i, parte in enumerate(np.array_split(df_vendas_grandes, 4)):
+    parte.to_parquet(f'vendas_particionadas/parte_{i}.parquet', index=False)
+grandes_sul = (DataFrameParticionado.ler_diretorio('vendas_particionadas/*.parquet')
+               .filter("regiao == 'Sul' and valor > 900")
+               .compute())
+print(f"Vendas > 900 no Sul (4 arquivos Parquet): {len(grandes_sul)}")
+
+for arquivo in glob.glob('vendas_particionadas/*.parquet'):
+    os.remove(arquivo)
+os.rmdir('vendas_particionadas')
+
 # 5. INTEGRAÇÃO COM FERRAMENTAS DE VISUALIZAÇÃO
 print("\n5. INTEGRAÇÃO COM VISUALIZAÇÃO")
 print("-" * 40)
@@ -283,21 +818,59 @@ df_export = pd.DataFrame({
     'categoria': ['Eletrônicos', 'Casa', 'Esporte']
 })
 
+import numbers
+from datetime import date, time as horario
+
 class ExportadorMultiplo:
-    """Classe para exportar dados em múltiplos formatos"""
+    """Classe para exportar dados em múltiplos formatos
+    
+    Os formatos de texto são gravados em blocos de chunk_size linhas, anexados
+    ao arquivo: o relatório inteiro nunca existe como uma única string em RAM.
+    """
     
-    def __init__(self, df, nome_base='dados'):
+    def __init__(self, df, nome_base='dados', chunk_size=50_000):
         self.df = df
         self.nome_base = nome_base
+        self.chunk_size = chunk_size
         self.formatos_exportados = []
     
+    def _blocos(self, df=None):
+        """Fatias consecutivas de chunk_size linhas (views, sem cópia)"""
+        df = self.df if df is None else df
+        for inicio in range(0, len(df), self.chunk_size):
+            yield df.iloc[inicio:inicio + self.chunk_size]
+    
     def para_csv(self, separador=','):
         """Exportar para CSV"""
         arquivo = f"{self.nome_base}.csv"
-        self.df.to_csv(arquivo, sep=separador, index=False)
+        # chunksize: o pandas formata e grava um bloco de linhas por vez
+        self.df.to_csv(arquivo, sep=separador, index=False, chunksize=self.chunk_size)
         self.formatos_exportados.append(('CSV', arquivo))
         return self
     
+    @staticmethod
+    def _valor_excel(valor):
+        """Tipos que o xlsxwriter não grava (Interval, Period, listas...) vão como texto, como no to_excel"""
+        if valor is None or isinstance(valor, (str, numbers.Number, date, horario, timedelta)):
+            return valor
+        return str(valor)
+    
+    def _escrever_aba(self, workbook, nome_aba, df):
+        """Gravar linha a linha (exigência do modo constant_memory do xlsxwriter)"""
+        aba = workbook.add_worksheet(nome_aba)
+        aba.write_row(0, 0, [str(coluna) for coluna in df.columns])
+        linha = 1
+        for bloco in self._blocos(df):
+            # NaN/NaT viram células vazias
+            bloco = bloco.astype(object).where(bloco.notna(), None)
+            for posicao, dtype in enumerate(df.dtypes):
+                if not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+                        or pd.api.types.is_timedelta64_dtype(dtype)):
+                    bloco.isetitem(posicao, bloco.iloc[:, posicao].map(self._valor_excel))
+            for valores in bloco.itertuples(index=False, name=None):
+                aba.write_row(linha, 0, valores)
+                linha += 1
+    
     def para_excel(self, multiplas_abas=False):
         """Exportar para Excel"""
         arquivo = f"{self.nome_base}.xlsx"
@@ -305,13 +878,29 @@ class ExportadorMultiplo:
         if multiplas_abas and len(self.df.select_dtypes(include=['object']).columns) > 0:
             # Criar abas por categoria se possível
             col_categoria = self.df.select_dtypes(include=['object']).columns[0]
-            
-            with pd.ExcelWriter(arquivo) as writer:
-                for categoria in self.df[col_categoria].unique():
-                    df_categoria = self.df[self.df[col_categoria] == categoria]
-                    df_categoria.to_excel(writer, sheet_name=str(categoria)[:31], index=False)
+            # groupby separa todas as categorias numa única passada (um filtro
+            # booleano por categoria percorreria o DataFrame k vezes)
+            abas = [
+                (str(categoria)[:31], df_categoria)
+                for categoria, df_categoria in self.df.groupby(col_categoria, sort=False, dropna=False)
+            ]
         else:
-            self.df.to_excel(arquivo, index=False)
+            abas = [('Sheet1', self.df)]
+        
+        try:
+            import xlsxwriter
+            # constant_memory: cada linha vai para o disco assim que a próxima começa
+            with xlsxwriter.Workbook(arquivo, {
+                'constant_memory': True,
+                'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+                'remove_timezone': True
+            }) as workbook:
+                for nome_aba, df_aba in abas:
+                    self._escrever_aba(workbook, nome_aba, df_aba)
+        except ImportError:
+            with pd.ExcelWriter(arquivo) as writer:
+                for nome_aba, df_aba in abas:
+                    df_aba.to_excel(writer, sheet_name=nome_aba, index=False)
         
         self.formatos_exportados.append(('Excel', arquivo))
         return self
@@ -319,29 +908,92 @@ class ExportadorMultiplo:
     def para_json(self, formato='records'):
         """Exportar para JSON"""
         arquivo = f"{self.nome_base}.json"
-        self.df.to_json(arquivo, orient=formato, indent=2)
+        
+        if formato == 'records' and len(self.df):
+            # Cada bloco vira '[{...}, ...]'; os colchetes são retirados e os
+            # blocos emendados, formando um único array
+            with open(arquivo, 'w', encoding='utf-8') as f:
+                f.write('[')
+                for i, bloco in enumerate(self._blocos()):
+                    texto = bloco.to_json(orient='records', indent=2)
+                    f.write((',' if i else '') + texto[1:-1].rstrip())
+                f.write('\n]')
+        else:
+            # Demais orientações (columns, index...) não são divisíveis por linhas,
+            # e um DataFrame vazio sai direto do to_json
+            self.df.to_json(arquivo, orient=formato, indent=2)
+        
         self.formatos_exportados.append(('JSON', arquivo))
         return self
     
+    def _formatos_html(self):
+        """Formato de cada coluna de float e de data, decidido sobre o DataFrame inteiro
+        
+        O to_html escolhe casas decimais, notação científica e precisão das
+        datas olhando os valores que recebe: bloco a bloco, uma mesma coluna
+        sairia formatada de jeitos diferentes. Aqui as regras do pandas são
+        aplicadas uma vez à coluna toda.
+        """
+        digitos = pd.get_option('display.precision')
+        formatadores, unidades_datas = {}, {}
+        for coluna, dtype in self.df.dtypes.items():
+            serie = self.df[coluna]
+            if dtype.kind == 'f':
+                # Zeros finais são cortados enquanto todos os valores terminam em zero (fica pelo menos 1 casa)
+                casas = 1
+                for bloco in self._blocos(serie):
+                    for valor in bloco[np.isfinite(bloco)]:
+                        texto = f"{valor:.{digitos}f}"
+                        casas = max(casas, digitos - (len(texto) - len(texto.rstrip('0'))))
+                # Notação científica se há valores que arredondariam para zero, ou
+                # valores grandes com texto longo demais já com as casas cortadas
+                absolutos = np.abs(serie.to_numpy())
+                finitos = absolutos[np.isfinite(absolutos)]
+                pequenos = ((absolutos < 10 ** -digitos) & (absolutos > 0)).any()
+                longos = len(finitos) > 0 and len(f"{finitos.max(): .{casas}f}") > digitos + 6
+                if pequenos or (longos and (absolutos > 1e6).any()):
+                    formatadores[coluna] = lambda valor: f"{valor: .{digitos}e}"
+                else:
+                    formatadores[coluna] = lambda valor, casas=casas: f"{valor: .{casas}f}"
+            elif pd.api.types.is_datetime64_dtype(dtype):
+                ns = serie.to_numpy().astype('datetime64[ns]').view('i8')
+                ns = ns[~serie.isna().to_numpy()]
+                if (ns % (86_400 * 10**9) == 0).all():
+                    unidades_datas[coluna] = 'D'  # só datas, sem horário
+                else:
+                    unidades_datas[coluna] = ('ns' if (ns % 10**3).any() else 'us' if (ns % 10**6).any()
+                                              else 'ms' if (ns % 10**9).any() else 's')
+        return formatadores, unidades_datas
+    
     def para_html(self, incluir_css=True):
         """Exportar para HTML"""
         arquivo = f"{self.nome_base}.html"
+        formatadores, unidades_datas = self._formatos_html()
         
-        if incluir_css:
-            css = """
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            if incluir_css:
+                f.write("""
             <style>
             table { border-collapse: collapse; width: 100%; }
             th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
             th { background-color: #f2f2f2; }
             tr:nth-child(even) { background-color: #f9f9f9; }
             </style>
-            """
-            html_content = css + self.df.to_html(index=False)
-        else:
-            html_content = self.df.to_html(index=False)
-        
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            """)
+            # Cabeçalho da tabela vem de um DataFrame vazio; cada bloco
+            # contribui apenas com as suas linhas <tr> do <tbody>
+            cabecalho = self.df.head(0).to_html(index=False)
+            f.write(cabecalho[:cabecalho.index('<tbody>') + len('<tbody>')])
+            for bloco in self._blocos():
+                if unidades_datas:
+                    bloco = bloco.copy()
+                    for coluna, unidade in unidades_datas.items():
+                        texto = np.datetime_as_string(bloco[coluna].to_numpy(), unit=unidade)
+                        bloco[coluna] = np.where(texto == 'NaT', texto, np.char.replace(texto, 'T', ' '))
+                html_bloco = bloco.to_html(index=False, header=False, formatters=formatadores)
+                inicio = html_bloco.index('<tbody>') + len('<tbody>')
+                f.write(html_bloco[inicio:html_bloco.rindex('\n  </tbody>')])
+            f.write('\n  </tbody>\n</table>')
         
         self.formatos_exportados.append(('HTML', arquivo))
         return self
@@ -359,17 +1011,639 @@ exportador = ExportadorMultiplo(df_export, 'relatorio_vendas')
 exportador.para_csv().para_excel().para_json().para_html()
 exportador.relatorio_exportacao()
 
+print("\n6.2 Exportação em blocos de um relatório grande:")
+import tracemalloc
+
+n_relatorio = 60_000
+df_relatorio = pd.DataFrame({
+    'pedido': np.arange(n_relatorio),
+    'categoria': np.random.choice(['Eletrônicos', 'Casa', 'Esporte', 'Livros'], n_relatorio),
+    'valor': np.random.uniform(10, 1000, n_relatorio).round(2),
+    'data': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n_relatorio), unit='min')
+})
+
+def pico_memoria_mb(func):
+    """Pico de memória alocada (tracemalloc) durante a exportação"""
+    tracemalloc.start()
+    func()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024 / 1024
+
+def html_inteiro():
+    with open('relatorio_grande_inteiro.html', 'w', encoding='utf-8') as f:
+        f.write(df_relatorio.to_html(index=False))
+
+def json_inteiro():
+    with open('relatorio_grande_inteiro.json', 'w', encoding='utf-8') as f:
+        f.write(df_relatorio.to_json(orient='records', indent=2))
+
+exportador_grande = ExportadorMultiplo(df_relatorio, 'relatorio_grande', chunk_size=10_000)
+comparacoes = [
+    ('HTML', html_inteiro, lambda: exportador_grande.para_html(incluir_css=False)),
+    ('JSON', json_inteiro, lambda: exportador_grande.para_json()),
+]
+for formato, inteiro, em_blocos in comparacoes:
+    print(f"{formato}: string inteira {pico_memoria_mb(inteiro):.1f} MB de pico | "
+          f"em blocos {pico_memoria_mb(em_blocos):.1f} MB de pico")
+
+# Uma aba por categoria, separadas numa única passada pelo groupby
+inicio = time.time()
+exportador_grande.para_excel(multiplas_abas=True)
+print(f"Excel com {df_relatorio['categoria'].nunique()} abas (constant_memory): {time.time() - inicio:.2f}s")
+
 # 7. PIPELINE DE ETL COMPLETO
 print("\n7. PIPELINE DE ETL COMPLETO")
 print("-" * 30)
 
+import contextlib
+import multiprocessing
+import operator
+import shutil
+import sys
+import threading
+from collections.abc import MutableMapping
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+# cache_etapas.py fica ao lado das aulas e é compartilhado com a aula 11
+from cache_etapas import CacheEtapas, impressao_dataframe
+
+class PoolConexoes:
+    """Conexões SQLite reutilizadas entre extracts, uma fila por banco
+
+    A chave inclui o PID: processos filhos (fork) não reaproveitam conexões
+    herdadas do pai, criam as suas.
+    """
+    
+    def __init__(self, max_por_banco=4):
+        self.max_por_banco = max_por_banco
+        self._livres = {}
+        self._lock = threading.Lock()
+        self.criadas = 0
+        self.reutilizadas = 0
+    
+    @contextlib.contextmanager
+    def conexao(self, db_path):
+        """Emprestar uma conexão do pool (devolvida ao sair do bloco)"""
+        chave = (os.getpid(), os.path.abspath(db_path))
+        with self._lock:
+            livres = self._livres.setdefault(chave, [])
+            conn = livres.pop() if livres else None
+            if conn is None:
+                self.criadas += 1
+            else:
+                self.reutilizadas += 1
+        if conn is None:
+            # Uma thread por vez usa cada conexão; o pool garante isso
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+        
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                livres = self._livres.setdefault(chave, [])
+                if len(livres) < self.max_por_banco:
+                    livres.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+    
+    def fechar(self):
+        """Fechar todas as conexões ociosas"""
+        with self._lock:
+            for livres in self._livres.values():
+                for conn in livres:
+                    conn.close()
+            self._livres.clear()
+
+POOL_SQL = PoolConexoes()
+
+class EstadoIncremental:
+    """Marcas d'água (high-water marks) persistidas por pipeline e dataset
+
+    Um JSON pequeno: {pipeline: {dataset: {'coluna', 'valor', 'fonte', 'atualizado_em'}}}.
+    Gravado em arquivo temporário + rename, para nunca ficar pela metade.
+    """
+    
+    def __init__(self, arquivo='etl_estado.json'):
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+    
+    def _ler(self):
+        if not os.path.exists(self.arquivo):
+            return {}
+        with open(self.arquivo, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def marca(self, pipeline, dataset):
+        """Última marca confirmada (None se o dataset nunca foi extraído)"""
+        return self._ler().get(pipeline, {}).get(dataset)
+    
+    def salvar(self, pipeline, dataset, coluna, valor, fonte=None):
+        with self._lock:
+            estado = self._ler()
+            estado.setdefault(pipeline, {})[dataset] = {
+                'coluna': coluna,
+                'valor': valor,
+                'fonte': fonte,
+                'atualizado_em': datetime.now().isoformat(timespec='seconds')
+            }
+            temporario = f"{self.arquivo}.tmp-{os.getpid()}"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(estado, f, indent=2, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+
+class DadosArrowIPC(MutableMapping):
+    """Datasets do pipeline como arquivos Arrow IPC sem compressão, lidos via memory map
+
+    Cada DataFrame atribuído vira {diretorio}/{nome}.arrow (temporário +
+    rename). A leitura mapeia o arquivo em memória e embrulha os buffers sem
+    cópia num DataFrame com dtypes Arrow (pd.ArrowDtype): abrir custa
+    milissegundos, e processos que abrem o mesmo arquivo compartilham o page
+    cache do SO em vez de cada um decodificar a sua cópia. Um pipeline em
+    outro processo, apontado para o mesmo diretório, enxerga os datasets já
+    gravados. Objetos que não são DataFrame (fluxos) ficam em memória.
+    """
+    
+    def __init__(self, diretorio, tipos_arrow=True):
+        self.diretorio = diretorio
+        # tipos_arrow=False converte para dtypes NumPy (uma cópia) na leitura
+        self.tipos_arrow = tipos_arrow
+        self._outros = {}
+        os.makedirs(diretorio, exist_ok=True)
+    
+    def _arquivo(self, nome):
+        return os.path.join(self.diretorio, f"{nome}.arrow")
+    
+    def __setitem__(self, nome, df):
+        arquivo = self._arquivo(nome)
+        if not isinstance(df, pd.DataFrame):
+            self._outros[nome] = df
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+            return
+        self._outros.pop(nome, None)
+        tabela = pa.Table.from_pandas(df)
+        temporario = f"{arquivo}.tmp-{os.getpid()}-{threading.get_ident()}"
+        # Formato de arquivo IPC sem compressão: é o que permite mapear sem decodificar
+        with pa.OSFile(temporario, 'wb') as destino, pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        # Leitores com o arquivo antigo mapeado continuam com a versão antiga
+        os.replace(temporario, arquivo)
+    
+    def __getitem__(self, nome):
+        if nome in self._outros:
+            return self._outros[nome]
+        arquivo = self._arquivo(nome)
+        if not os.path.exists(arquivo):
+            raise KeyError(nome)
+        # Os buffers da tabela mantêm o mapeamento vivo depois do with
+        with pa.memory_map(arquivo, 'r') as origem:
+            tabela = pa.ipc.open_file(origem).read_all()
+        if self.tipos_arrow:
+            return tabela.to_pandas(types_mapper=pd.ArrowDtype)
+        return tabela.to_pandas()
+    
+    def __delitem__(self, nome):
+        if nome in self._outros:
+            del self._outros[nome]
+        elif os.path.exists(self._arquivo(nome)):
+            os.remove(self._arquivo(nome))
+        else:
+            raise KeyError(nome)
+    
+    def __iter__(self):
+        nomes = [arquivo[:-len('.arrow')] for arquivo in sorted(os.listdir(self.diretorio))
+                 if arquivo.endswith('.arrow')]
+        return iter(nomes + [nome for nome in self._outros if nome not in nomes])
+    
+    def __len__(self):
+        return len(list(iter(self)))
+    
+    def __contains__(self, nome):
+        return nome in self._outros or os.path.exists(self._arquivo(nome))
+
+class FluxoFrames:
+    """Dataset em streaming: iterável de DataFrames gerado sob demanda
+
+    Guarda a função geradora e seus argumentos (não um gerador já aberto),
+    então pode ser percorrido mais de uma vez e enviado a outros processos.
+    Os chunks não ficam guardados: cada consumidor que percorre o fluxo
+    refaz a extração (a query SQL roda de novo a cada iteração).
+    """
+    
+    def __init__(self, gerar, *args):
+        self.gerar = gerar
+        self.args = args
+    
+    def __iter__(self):
+        return self.gerar(*self.args)
+    
+    def __repr__(self):
+        return f"FluxoFrames({self.gerar.__name__})"
+
+def _gerar_chunks_sql(db_path, query, chunk_size, params=None):
+    """fetchmany em lotes, convertidos direto em colunas (sem DataFrame por linha)"""
+    with POOL_SQL.conexao(db_path) as conn:
+        cursor = conn.execute(query, params or [])
+        colunas = [descricao[0] for descricao in cursor.description]
+        try:
+            vazio = True
+            while True:
+                linhas = cursor.fetchmany(chunk_size)
+                if not linhas:
+                    break
+                vazio = False
+                yield pd.DataFrame(dict(zip(colunas, zip(*linhas))), columns=colunas)
+            if vazio:
+                # Consulta sem linhas: um chunk vazio, para os consumidores conhecerem as colunas
+                yield pd.DataFrame(columns=colunas)
+        finally:
+            cursor.close()
+
+def _gerar_join_fluxo(fluxo, df_materializado, chave, tipo, fluxo_a_esquerda):
+    for chunk in fluxo:
+        if fluxo_a_esquerda:
+            yield pd.merge(chunk, df_materializado, on=chave, how=tipo)
+        else:
+            yield pd.merge(df_materializado, chunk, on=chave, how=tipo)
+
+# Agregações decomponíveis: estado parcial por chunk e como combinar estados
+def _agregar_fluxo(fluxo, group_by, agg_dict):
+    """groupby().agg() sobre um fluxo, guardando só o estado parcial por grupo"""
+    # Mesmo esquema de parciais do motor particionado da seção 4
+    parciais, combinar = _planejar_agregacao(agg_dict)
+    
+    estado = None
+    for chunk in fluxo:
+        parcial = chunk.groupby(group_by).agg(parciais)
+        estado = parcial if estado is None else _combinar_parciais([estado, parcial], group_by, combinar)
+    if estado is None:
+        # Fluxo sem nenhum chunk: resultado vazio, com as colunas de sempre
+        chaves = group_by if isinstance(group_by, list) else [group_by]
+        estado = pd.DataFrame(index=pd.MultiIndex.from_arrays([[]] * len(chaves), names=chaves),
+                              columns=pd.MultiIndex.from_tuples(list(combinar)), dtype=float)
+    return _finalizar_agregacao(estado, agg_dict)
+
+# Pushdown: filtros, joins e agregações traduzidos para SQL quando a
+# entrada vem de uma fonte SQL, para o banco fazer o trabalho onde os dados estão
+COMPARADORES = {
+    '==': operator.eq, '!=': operator.ne, '>': operator.gt,
+    '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    'in': lambda serie, valores: serie.isin(valores)
+}
+FUNCOES_SQL = {
+    'sum': 'COALESCE(SUM({c}), 0)', 'mean': 'AVG({c})', 'count': 'COUNT({c})',
+    'min': 'MIN({c})', 'max': 'MAX({c})', 'nunique': 'COUNT(DISTINCT {c})'
+}
+
+def _valor_sql(valor):
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+def _where_sql(condicoes):
+    """Condições (coluna, operador, valor) como cláusula WHERE parametrizada"""
+    clausulas, params = [], []
+    for coluna, operador, valor in condicoes:
+        c = _ident(coluna)
+        if operador == 'in':
+            clausulas.append(f"{c} IN ({', '.join('?' * len(valor))})")
+            params.extend(_valor_sql(v) for v in valor)
+        elif operador == '!=':
+            # Em pandas NaN != valor é True; em SQL NULL != valor é NULL
+            clausulas.append(f"({c} != ? OR {c} IS NULL)")
+            params.append(_valor_sql(valor))
+        else:
+            clausulas.append(f"{c} {'=' if operador == '==' else operador} ?")
+            params.append(_valor_sql(valor))
+    return " AND ".join(clausulas), params
+
+def _colunas_sql(db_path, query, params=None):
+    """Colunas do resultado de uma query, sem trazer linhas"""
+    with POOL_SQL.conexao(db_path) as conn:
+        cursor = conn.execute(f"SELECT * FROM ({query}) LIMIT 0", params or [])
+        colunas = [descricao[0] for descricao in cursor.description]
+        cursor.close()
+    return colunas
+
+def _mascara_filtro(df, condicoes):
+    mascara = pd.Series(True, index=df.index)
+    for coluna, operador, valor in condicoes:
+        mascara &= COMPARADORES[operador](df[coluna], valor)
+    return mascara
+
+def _gerar_filtro_fluxo(fluxo, condicoes):
+    for chunk in fluxo:
+        yield chunk[_mascara_filtro(chunk, condicoes)]
+
+def _impressao_arquivo(caminho):
+    """Versão de uma fonte externa (arquivo/banco): tamanho e mtime, inclusive do WAL"""
+    partes = []
+    for arquivo in (caminho, caminho + '-wal'):
+        if os.path.exists(arquivo):
+            info = os.stat(arquivo)
+            partes.append((arquivo, info.st_size, info.st_mtime_ns))
+    return repr(partes)
+
+# Funções puras de cada etapa: recebem DataFrames e devolvem DataFrames, sem
+# tocar no estado do pipeline, para poderem rodar em threads ou processos
+def _etapa_extract_sql(db_path, query, chunk_size=None, params=None, colunas=None):
+    if chunk_size:
+        return FluxoFrames(_gerar_chunks_sql, db_path, query, chunk_size, params)
+    with POOL_SQL.conexao(db_path) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    if colunas is not None:
+        # Rótulos finais de uma agregação empurrada para o SQL (podem ser MultiIndex)
+        df.columns = pd.MultiIndex.from_tuples(colunas) if isinstance(colunas[0], tuple) else colunas
+    return df
+
+def _etapa_extract_csv(arquivo, **kwargs):
+    return pd.read_csv(arquivo, **kwargs)
+
+def _etapa_join(df1, df2, chave, tipo):
+    # O lado em streaming passa chunk a chunk pelo lado materializado; só vale
+    # quando linhas sem par do lado materializado não precisam ser preservadas
+    if isinstance(df1, FluxoFrames) and not isinstance(df2, FluxoFrames) and tipo in ('inner', 'left'):
+        return FluxoFrames(_gerar_join_fluxo, df1, df2, chave, tipo, True)
+    if isinstance(df2, FluxoFrames) and not isinstance(df1, FluxoFrames) and tipo in ('inner', 'right'):
+        return FluxoFrames(_gerar_join_fluxo, df2, df1, chave, tipo, False)
+    
+    if isinstance(df1, FluxoFrames):
+        df1 = pd.concat(df1, ignore_index=True)
+    if isinstance(df2, FluxoFrames):
+        df2 = pd.concat(df2, ignore_index=True)
+    return pd.merge(df1, df2, on=chave, how=tipo)
+
+def _etapa_filter(df, condicoes):
+    if isinstance(df, FluxoFrames):
+        return FluxoFrames(_gerar_filtro_fluxo, df, condicoes)
+    return df[_mascara_filtro(df, condicoes)]
+
+def _etapa_aggregate(df, group_by, agg_dict):
+    if isinstance(df, FluxoFrames):
+        return _agregar_fluxo(df, group_by, agg_dict)
+    return df.groupby(group_by).agg(agg_dict).reset_index()
+
+@contextlib.contextmanager
+def _destino_atomico(destino, atomico):
+    """Gravar em um caminho temporário e renomear para o destino só no fim
+
+    Leitores nunca veem arquivos pela metade: ou a versão anterior, ou a nova.
+    Para diretórios (Parquet particionado) há um instante entre as duas
+    renomeações em que o destino não existe.
+    """
+    if not atomico:
+        if os.path.isdir(destino):
+            shutil.rmtree(destino)  # partições antigas não podem se misturar às novas
+        yield destino
+        return
+    
+    pasta, nome = os.path.split(os.path.abspath(destino))
+    temporario = os.path.join(pasta, f".{nome}.tmp-{os.getpid()}-{threading.get_ident()}")
+    try:
+        yield temporario
+        if os.path.isdir(destino):
+            antigo = temporario + '.antigo'
+            os.rename(destino, antigo)
+            os.rename(temporario, destino)
+            shutil.rmtree(antigo)
+        else:
+            if os.path.isdir(temporario) and os.path.exists(destino):
+                os.remove(destino)
+            os.replace(temporario, destino)
+    except BaseException:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario)
+        elif os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+def _tabela_arrow(df, ordenar_por=None):
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    if ordenar_por:
+        colunas = [ordenar_por] if isinstance(ordenar_por, str) else list(ordenar_por)
+        tabela = tabela.sort_by([(c, 'ascending') for c in colunas])
+    return tabela
+
+def _escrever_parquet(tabela, destino, opcoes, parte=0):
+    """Parquet simples ou particionado em layout hive (coluna=valor/part-N.parquet)"""
+    if opcoes.get('partition_by'):
+        particoes = opcoes['partition_by']
+        ds.write_dataset(
+            tabela, destino, format='parquet',
+            partitioning=[particoes] if isinstance(particoes, str) else list(particoes),
+            partitioning_flavor='hive',
+            basename_template=f"part-{parte if isinstance(parte, str) else f'{parte:05d}'}-{{i}}.parquet",
+            file_options=ds.ParquetFileFormat().make_write_options(compression=opcoes['compressao']),
+            # min = max: row groups com o tamanho pedido, não o dos lotes de entrada
+            min_rows_per_group=opcoes.get('row_group_size') or 0,
+            max_rows_per_group=opcoes.get('row_group_size') or 1024 * 1024,
+            existing_data_behavior='overwrite_or_ignore'
+        )
+    else:
+        pq.write_table(tabela, destino, row_group_size=opcoes.get('row_group_size'),
+                       compression=opcoes['compressao'])
+
+def _salvar_formato(df, destino, formato, opcoes_parquet):
+    if formato == 'csv':
+        df.to_csv(destino, index=False)
+    elif formato == 'parquet':
+        _escrever_parquet(_tabela_arrow(df, opcoes_parquet.get('ordenar_por')), destino, opcoes_parquet)
+    elif formato == 'json':
+        df.to_json(destino, orient='records', indent=2)
+
+def _schema_fluxo(schema):
+    """Schema Arrow fixo para todos os chunks de um fluxo, a partir do primeiro
+
+    Colunas só com NULL no primeiro chunk têm tipo nulo, que não aceita os
+    valores dos chunks seguintes: viram texto.
+    """
+    return pa.schema([campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo
+                      for campo in schema], metadata=schema.metadata)
+
+def _salvar_fluxo(fluxo, destinos, opcoes_parquet):
+    """Gravar um fluxo chunk a chunk em todos os formatos numa única passada"""
+    with contextlib.ExitStack() as pilha:
+        textos = {formato: pilha.enter_context(open(destino, 'w', encoding='utf-8'))
+                  for formato, destino in destinos.items() if formato in ('csv', 'json')}
+        if 'json' in textos:
+            textos['json'].write('[')
+        escritor = None
+        schema = None
+        escreveu_json = False
+        
+        for i, chunk in enumerate(fluxo):
+            if 'csv' in textos:
+                chunk.to_csv(textos['csv'], index=False, header=(i == 0))
+            if 'json' in textos:
+                registros = chunk.to_json(orient='records')[1:-1]
+                if registros:
+                    # Chunks vazios (filtro, join sem pares) não contam para a vírgula
+                    textos['json'].write((',' if escreveu_json else '') + registros)
+                    escreveu_json = True
+            if 'parquet' in destinos:
+                # Em streaming a ordenação vale dentro de cada chunk/row group
+                tabela = _tabela_arrow(chunk, opcoes_parquet.get('ordenar_por'))
+                # Os tipos são inferidos chunk a chunk: uma coluna inteira com
+                # NULL só num chunk posterior chega como float64
+                schema = schema or _schema_fluxo(tabela.schema)
+                if not tabela.schema.equals(schema):
+                    tabela = tabela.cast(schema)
+                if opcoes_parquet.get('partition_by'):
+                    _escrever_parquet(tabela, destinos['parquet'], opcoes_parquet, parte=i)
+                else:
+                    if escritor is None:
+                        escritor = pilha.enter_context(pq.ParquetWriter(
+                            destinos['parquet'], tabela.schema, compression=opcoes_parquet['compressao']))
+                    escritor.write_table(tabela, row_group_size=opcoes_parquet.get('row_group_size'))
+        
+        if 'json' in textos:
+            textos['json'].write(']')
+        if 'parquet' in destinos and opcoes_parquet.get('partition_by'):
+            os.makedirs(destinos['parquet'], exist_ok=True)
+        elif 'parquet' in destinos and escritor is None:
+            # Fluxo sem chunks: arquivo vazio, para o caminho devolvido existir
+            pq.write_table((schema or pa.schema([])).empty_table(), destinos['parquet'])
+
+def _ler_formato(arquivo, formato):
+    if formato == 'csv':
+        return pd.read_csv(arquivo)
+    if formato == 'parquet':
+        return pd.read_parquet(arquivo)
+    return pd.read_json(arquivo, orient='records')
+
+def _mesclar_saidas(delta, arquivos, modo, chave, atomico, opcoes_parquet):
+    """append/upsert de um delta em saídas já materializadas por execuções anteriores"""
+    if isinstance(delta, FluxoFrames):
+        # Deltas incrementais são pequenos: materializar é barato
+        chunks = list(delta)
+        delta = pd.concat(chunks, ignore_index=True) if chunks else None
+    
+    for formato, arquivo in arquivos.items():
+        existe = os.path.exists(arquivo)
+        if delta is None or (existe and delta.empty):
+            continue
+        particionado = formato == 'parquet' and opcoes_parquet.get('partition_by')
+        
+        if not existe:
+            with _destino_atomico(arquivo, atomico) as destino:
+                _salvar_formato(delta, destino, formato, opcoes_parquet)
+        elif modo == 'append' and formato == 'csv':
+            delta.to_csv(arquivo, mode='a', header=False, index=False)
+        elif modo == 'append' and particionado:
+            # Arquivos novos ao lado dos antigos, com nome único por execução
+            _escrever_parquet(_tabela_arrow(delta, opcoes_parquet.get('ordenar_por')), arquivo, opcoes_parquet,
+                              parte=datetime.now().strftime('%Y%m%d%H%M%S%f'))
+        else:
+            antigo = _ler_formato(arquivo, formato)
+            if set(antigo.columns) == set(delta.columns):
+                antigo = antigo[list(delta.columns)]  # partições voltam como últimas colunas
+            for coluna in delta.columns:
+                # CSV/JSON não guardam tipo de data: texto ou epoch em ms (padrão do to_json)
+                if pd.api.types.is_datetime64_any_dtype(delta[coluna]) and coluna in antigo \
+                        and not pd.api.types.is_datetime64_any_dtype(antigo[coluna]):
+                    numerico = pd.api.types.is_numeric_dtype(antigo[coluna])
+                    antigo[coluna] = pd.to_datetime(antigo[coluna], unit='ms' if numerico else None)
+            combinado = pd.concat([antigo, delta], ignore_index=True)
+            if modo == 'upsert':
+                combinado = combinado.drop_duplicates(subset=chave, keep='last')
+            with _destino_atomico(arquivo, atomico) as destino:
+                _salvar_formato(combinado, destino, formato, opcoes_parquet)
+    
+    return list(arquivos.values())
+
+def _etapa_load_sql(df, db_path, tabela, chave=None, batch_size=5000):
+    """Upsert em lotes: INSERT ... ON CONFLICT DO UPDATE, uma transação por lote"""
+    chaves = [chave] if isinstance(chave, str) else list(chave or [])
+    preparada = False
+    with POOL_SQL.conexao(db_path) as conn:
+        for chunk in (df if isinstance(df, FluxoFrames) else [df]):
+            if not preparada:
+                # Cria a tabela se não existir; o índice único é o alvo do ON CONFLICT
+                chunk.head(0).to_sql(tabela, conn, if_exists='append', index=False)
+                if chaves:
+                    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_ident('ux_' + tabela + '_' + '_'.join(chaves))} "
+                                 f"ON {_ident(tabela)} ({', '.join(map(_ident, chaves))})")
+                colunas = list(chunk.columns)
+                sql = (f"INSERT INTO {_ident(tabela)} ({', '.join(map(_ident, colunas))}) "
+                       f"VALUES ({', '.join('?' * len(colunas))})")
+                if chaves:
+                    atualizar = [c for c in colunas if c not in chaves]
+                    sql += f" ON CONFLICT ({', '.join(map(_ident, chaves))}) DO " + (
+                        "UPDATE SET " + ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in atualizar)
+                        if atualizar else "NOTHING")
+                preparada = True
+            
+            for inicio in range(0, len(chunk), batch_size):
+                with conn:  # commit por lote (rollback se o lote falhar)
+                    conn.executemany(sql, _linhas_sql(chunk.iloc[inicio:inicio + batch_size]))
+    return [f"{db_path}:{tabela}"]
+
+def _etapa_load(df, dataset, formatos, prefixo, paralelo=True, atomico=False, modo='substituir', chave=None,
+                **opcoes_parquet):
+    opcoes_parquet.setdefault('compressao', 'snappy')
+    arquivos = {formato: f"{prefixo}_{dataset}.{formato}" for formato in formatos}
+    if modo != 'substituir':
+        return _mesclar_saidas(df, arquivos, modo, chave, atomico, opcoes_parquet)
+    
+    with contextlib.ExitStack() as pilha:
+        destinos = {formato: pilha.enter_context(_destino_atomico(arquivo, atomico))
+                    for formato, arquivo in arquivos.items()}
+        
+        if isinstance(df, FluxoFrames):
+            # Uma passada só: percorrer o fluxo por formato repetiria a extração
+            _salvar_fluxo(df, destinos, opcoes_parquet)
+        elif paralelo and len(formatos) > 1:
+            # Escritores Arrow (Parquet) liberam o GIL; CSV/JSON rodam em paralelo a eles
+            with ThreadPoolExecutor(max_workers=len(formatos)) as pool:
+                futuros = [pool.submit(_salvar_formato, df, destinos[f], f, opcoes_parquet) for f in formatos]
+                for futuro in futuros:
+                    futuro.result()
+        else:
+            for formato in formatos:
+                _salvar_formato(df, destinos[formato], formato, opcoes_parquet)
+    
+    return list(arquivos.values())
+
 class PipelineETL:
-    """Pipeline completo de ETL integrando múltiplas fontes"""
+    """Pipeline completo de ETL integrando múltiplas fontes
+
+    Cada chamada encadeada vira um nó (dataset de saída + datasets de entrada).
+    No modo padrão o nó executa na hora; com lazy=True as chamadas só montam o
+    grafo de dependências e run() executa em paralelo os nós independentes,
+    pulando datasets que nenhum load precisa. Com pushdown (padrão no modo
+    lazy), filtros, joins e agregações sobre um mesmo banco SQL viram uma
+    única query, e cada extract traz só as colunas usadas adiante.
+    Com diretorio_ipc, as saídas ficam em Arrow IPC mapeado em memória e
+    podem ser abertas por estágios rodando em outros processos.
+    """
     
-    def __init__(self, nome="ETL Pipeline"):
+    def __init__(self, nome="ETL Pipeline", governador=None, lazy=False, n_workers=4, usar_processos=False,
+                 pushdown=True, estado=None, cache=None, diretorio_ipc=None):
         self.nome = nome
-        self.dados = {}
+        # Com um GovernadorMemoria, datasets ociosos podem ir para disco sob pressão de memória
+        self.governador = governador
+        if governador and diretorio_ipc:
+            raise ValueError("Use governador ou diretorio_ipc, não os dois")
+        if diretorio_ipc:
+            # Saídas das etapas em Arrow IPC, compartilháveis com estágios em outros processos
+            self.dados = DadosArrowIPC(diretorio_ipc)
+        else:
+            self.dados = governador.registrar(nome) if governador else {}
         self.logs = []
+        self.lazy = lazy
+        self.n_workers = n_workers
+        self.usar_processos = usar_processos
+        self.pushdown = pushdown
+        # EstadoIncremental: marcas d'água dos extracts incrementais
+        self.estado = estado
+        self.marcas_pendentes = {}
+        # CacheEtapas: saídas reaproveitadas entre execuções, por impressão digital
+        self.cache = cache
+        self.impressoes = {}
+        self.nos = []
+        self.nos_pulados = []
     
     def log(self, mensagem):
         """Adicionar log"""
@@ -378,60 +1652,461 @@ class PipelineETL:
         self.logs.append(log_msg)
         print(log_msg)
     
-    def extract_sql(self, db_path, query, nome_dataset):
-        """Extrair dados do SQL"""
-        self.log(f"Extraindo dados SQL: {nome_dataset}")
-        conn = sqlite3.connect(db_path)
-        self.dados[nome_dataset] = pd.read_sql_query(query, conn)
-        conn.close()
-        self.log(f"✓ {len(self.dados[nome_dataset])} registros extraídos")
+    def _usando(self, *datasets):
+        """Proteger datasets de spill durante uma etapa (no-op sem governador)"""
+        if self.governador:
+            return self.dados.em_uso(*datasets)
+        return contextlib.nullcontext()
+    
+    def _adicionar_no(self, func, saida, entradas, inicio, fim, **parametros):
+        """Registrar um nó do grafo; fora do modo lazy ele executa imediatamente"""
+        no = {
+            'func': func,
+            'pipeline': self.nome,
+            'metodo': sys._getframe(1).f_code.co_name,  # extract_sql, transform_join...
+            'saida': saida,          # None para loads
+            'entradas': list(entradas),
+            'parametros': parametros,
+            'inicio': inicio,        # mensagem de log ao começar
+            'fim': fim,              # mensagem de log ao terminar ({n} = registros)
+            'status': 'pendente'
+        }
+        self.nos.append(no)
+        if not self.lazy:
+            chave, resultado = self._consultar_cache(no)
+            if resultado is None:
+                with self._usando(*no['entradas']):
+                    resultado = self._executar_no(no, self._entradas_no(no))
+            self._concluir_no(no, resultado, chave)
+        return self
+    
+    def _impressao_dataset(self, nome):
+        """Impressão de um dataset: a da etapa que o gerou ou um hash do conteúdo"""
+        df = self.dados[nome]
+        if not isinstance(df, pd.DataFrame):
+            return None
+        impressao, identidade = self.impressoes.get(nome, (None, None))
+        if impressao is not None and identidade == id(df):
+            return impressao
+        # Dataset atribuído de fora do pipeline (ou recarregado do disco)
+        return impressao_dataframe(df)
+    
+    def _consultar_cache(self, no):
+        """(chave, saída em cache ou None); loads e fluxos não são cacheáveis"""
+        if self.cache is None or no['saida'] is None or no['parametros'].get('chunk_size'):
+            return None, None
+        entradas = [self._impressao_dataset(nome) for nome in no['entradas']]
+        if None in entradas:
+            return None, None
+        parametros = dict(no['parametros'])
+        fonte = parametros.get('db_path') or parametros.get('arquivo')
+        if fonte:
+            parametros['_versao_fonte'] = _impressao_arquivo(fonte)
+        chave = self.cache.chave(no['func'], parametros, entradas)
+        if chave is None:
+            return None, None
+        resultado = self.cache.obter(chave)
+        if resultado is not None:
+            self.log(f"{no['inicio']} [cache]")
+            no['do_cache'] = True
+        return chave, resultado
+    
+    def _entradas_no(self, no):
+        self.log(no['inicio'])
+        return [self.dados[nome] for nome in no['entradas']]
+    
+    @staticmethod
+    def _executar_no(no, dfs):
+        return no['func'](*dfs, **no['parametros'])
+    
+    def _concluir_no(self, no, resultado, chave=None):
+        if chave is not None:
+            if not no.get('do_cache'):
+                self.cache.guardar(chave, resultado)
+            self.impressoes[no['saida']] = (chave, id(resultado))
+        if no['saida'] is None:
+            for arquivo in resultado:
+                self.log(no['fim'].format(arquivo=arquivo))
+        else:
+            self.dados[no['saida']] = resultado
+            if isinstance(resultado, FluxoFrames):
+                self.log(f"✓ Fluxo pronto (lido sob demanda): {no['saida']}")
+            else:
+                self.log(no['fim'].format(n=len(resultado)))
+        no['status'] = 'concluido'
+    
+    def extract_sql(self, db_path, query, nome_dataset, chunk_size=None, incremental=None):
+        """Extrair dados do SQL (com chunk_size, como fluxo de DataFrames)
+
+        Com incremental='coluna', só vêm as linhas acima da última marca
+        d'água confirmada: a janela (marca, MAX(coluna)] é fixada agora, e
+        linhas que chegarem durante a execução ficam para a próxima.
+        """
+        params = None
+        inicio = f"Extraindo dados SQL: {nome_dataset}"
+        if incremental:
+            if self.estado is None:
+                raise ValueError("extract incremental exige PipelineETL(estado=EstadoIncremental(...))")
+            anterior = self.estado.marca(self.nome, nome_dataset)
+            baixo = anterior['valor'] if anterior else None
+            with POOL_SQL.conexao(db_path) as conn:
+                alto = conn.execute(f"SELECT MAX({_ident(incremental)}) FROM ({query})").fetchone()[0]
+            
+            coluna = _ident(incremental)
+            if baixo is None:
+                query = f"SELECT * FROM ({query}) WHERE {coluna} <= ?"
+                params = [alto]
+            else:
+                query = f"SELECT * FROM ({query}) WHERE {coluna} > ? AND {coluna} <= ?"
+                params = [baixo, alto]
+            if alto is not None and alto != baixo:
+                self.marcas_pendentes[nome_dataset] = (incremental, alto, db_path)
+            inicio += f" [incremental: {incremental} em ({baixo}, {alto}]]"
+        
+        self._adicionar_no(
+            _etapa_extract_sql, nome_dataset, [],
+            inicio, "✓ {n} registros extraídos",
+            db_path=db_path, query=query, chunk_size=chunk_size, params=params
+        )
+        if incremental:
+            # Marcas que este nó carrega (herdadas por nós que o absorverem no pushdown)
+            self.nos[-1]['marcas'] = {nome_dataset}
+        return self
+    
+    def confirmar_marcas(self):
+        """Persistir as marcas d'água depois que as cargas terminaram com sucesso
+
+        No modo lazy run() confirma sozinho; no modo eager, chame após os loads.
+        """
+        # Só avança a marca de datasets cujo nó (ou quem o absorveu) executou;
+        # um extract pulado não pode perder sua janela
+        executadas = set().union(*(no.get('marcas', set()) for no in self.nos if no['status'] == 'concluido'))
+        for dataset, (coluna, valor, fonte) in list(self.marcas_pendentes.items()):
+            if dataset in executadas:
+                self.estado.salvar(self.nome, dataset, coluna, _valor_sql(valor), fonte)
+                self.log(f"✓ Marca d'água de {dataset}: {coluna} = {valor}")
+                del self.marcas_pendentes[dataset]
         return self
     
     def extract_csv(self, arquivo, nome_dataset, **kwargs):
         """Extrair dados do CSV"""
-        self.log(f"Extraindo dados CSV: {nome_dataset}")
-        self.dados[nome_dataset] = pd.read_csv(arquivo, **kwargs)
-        self.log(f"✓ {len(self.dados[nome_dataset])} registros extraídos")
-        return self
+        return self._adicionar_no(
+            _etapa_extract_csv, nome_dataset, [],
+            f"Extraindo dados CSV: {nome_dataset}", "✓ {n} registros extraídos",
+            arquivo=arquivo, **kwargs
+        )
     
     def transform_join(self, dataset1, dataset2, chave, tipo='inner', nome_resultado='joined'):
         """Transformar: fazer join entre datasets"""
-        self.log(f"Fazendo join: {dataset1} + {dataset2}")
-        df1 = self.dados[dataset1]
-        df2 = self.dados[dataset2]
-        
-        resultado = pd.merge(df1, df2, on=chave, how=tipo)
-        self.dados[nome_resultado] = resultado
-        self.log(f"✓ Join concluído: {len(resultado)} registros")
-        return self
+        return self._adicionar_no(
+            _etapa_join, nome_resultado, [dataset1, dataset2],
+            f"Fazendo join: {dataset1} + {dataset2}", "✓ Join concluído: {n} registros",
+            chave=chave, tipo=tipo
+        )
     
     def transform_aggregate(self, dataset, group_by, agg_dict, nome_resultado='aggregated'):
         """Transformar: agregar dados"""
-        self.log(f"Agregando dados: {dataset}")
-        df = self.dados[dataset]
+        return self._adicionar_no(
+            _etapa_aggregate, nome_resultado, [dataset],
+            f"Agregando dados: {dataset}", "✓ Agregação concluída: {n} registros",
+            group_by=group_by, agg_dict=agg_dict
+        )
+    
+    def load_multiple(self, dataset, formatos=['csv', 'parquet'], prefixo='output', paralelo=True,
+                      atomico=False, partition_by=None, row_group_size=None, compressao='snappy',
+                      ordenar_por=None, modo='substituir', chave=None):
+        """Carregar dados em múltiplos formatos
+
+        Os formatos são gravados em paralelo. Para Parquet, partition_by gera um
+        diretório em layout hive, com row_group_size, compressao e ordenar_por
+        configuráveis. Com atomico=True cada saída é gravada em um caminho
+        temporário e renomeada no fim. modo='append' ou 'upsert' (por chave)
+        mescla o dataset, tipicamente um delta incremental, às saídas anteriores.
+        """
+        if modo not in ('substituir', 'append', 'upsert'):
+            raise ValueError(f"Modo inválido: {modo}")
+        if modo == 'upsert' and not chave:
+            raise ValueError("modo='upsert' exige chave")
+        return self._adicionar_no(
+            _etapa_load, None, [dataset],
+            f"Carregando dados: {dataset}", "✓ Salvo: {arquivo}",
+            dataset=dataset, formatos=formatos, prefixo=prefixo, paralelo=paralelo, atomico=atomico,
+            partition_by=partition_by, row_group_size=row_group_size, compressao=compressao,
+            ordenar_por=ordenar_por, modo=modo, chave=chave
+        )
+    
+    def load_sql(self, dataset, db_path, tabela, chave=None, batch_size=5000):
+        """Carregar em uma tabela SQLite; com chave, faz upsert (INSERT ... ON CONFLICT)"""
+        return self._adicionar_no(
+            _etapa_load_sql, None, [dataset],
+            f"Carregando dados em SQL: {dataset} -> {tabela}", "✓ Salvo: {arquivo}",
+            db_path=db_path, tabela=tabela, chave=chave, batch_size=batch_size
+        )
+    
+    def transform_filter(self, dataset, condicoes, nome_resultado='filtered'):
+        """Transformar: filtrar por condições (coluna, operador, valor)"""
+        for coluna, operador, valor in condicoes:
+            if operador not in COMPARADORES:
+                raise ValueError(f"Operador não suportado: {operador} (use {list(COMPARADORES)})")
+        return self._adicionar_no(
+            _etapa_filter, nome_resultado, [dataset],
+            f"Filtrando dados: {dataset}", "✓ Filtro concluído: {n} registros",
+            condicoes=list(condicoes)
+        )
+    
+    def _nos_necessarios(self):
+        """Nós pendentes dos quais algum load depende (todos, se não houver load)"""
+        pendentes = [no for no in self.nos if no['status'] == 'pendente']
+        loads = [no for no in pendentes if no['saida'] is None]
+        if not loads:
+            return pendentes
+        
+        produtor = {no['saida']: no for no in pendentes if no['saida'] is not None}
+        necessarios, pilha = set(), list(loads)
+        while pilha:
+            no = pilha.pop()
+            if id(no) in necessarios:
+                continue
+            necessarios.add(id(no))
+            pilha.extend(produtor[nome] for nome in no['entradas'] if nome in produtor)
+        return [no for no in pendentes if id(no) in necessarios]
+    
+    def _fonte_sql(self, dataset, produtores):
+        """Nó extract_sql que produz o dataset sem transformação local, se houver"""
+        no = produtores.get(dataset)
+        if no is not None and no['func'] is _etapa_extract_sql and no['parametros'].get('colunas') is None:
+            return no
+        return None
+    
+    def _substituir_por_sql(self, no, fontes, query, params, origem, chunk_size=None, colunas=None):
+        """Transformar o nó em um extract_sql com a query reescrita"""
+        no.update(
+            func=_etapa_extract_sql,
+            entradas=[],
+            marcas=set().union(*(fonte.get('marcas', set()) for fonte in fontes)),
+            parametros={'db_path': fontes[0]['parametros']['db_path'], 'query': query,
+                        'chunk_size': chunk_size, 'params': params or None, 'colunas': colunas},
+            inicio=f"Extraindo dados SQL (pushdown de {origem}): {no['saida']}",
+            fim="✓ {n} registros extraídos"
+        )
+    
+    def _pushdown_filter(self, no, produtores):
+        fonte = self._fonte_sql(no['entradas'][0], produtores)
+        if fonte is None:
+            return False
+        where, params = _where_sql(no['parametros']['condicoes'])
+        query = f"SELECT * FROM ({fonte['parametros']['query']}) WHERE {where}"
+        params = list(fonte['parametros'].get('params') or []) + params
+        self._substituir_por_sql(no, [fonte], query, params, 'filtro', fonte['parametros'].get('chunk_size'))
+        return True
+    
+    def _pushdown_join(self, no, produtores):
+        fonte_a, fonte_b = (self._fonte_sql(nome, produtores) for nome in no['entradas'])
+        tipo = no['parametros']['tipo']
+        if fonte_a is None or fonte_b is None or tipo not in ('inner', 'left') \
+                or fonte_a['parametros']['db_path'] != fonte_b['parametros']['db_path']:
+            return False
+        
+        params_a, params_b = fonte_a['parametros'], fonte_b['parametros']
+        colunas_a = _colunas_sql(params_a['db_path'], params_a['query'], params_a.get('params'))
+        colunas_b = _colunas_sql(params_b['db_path'], params_b['query'], params_b.get('params'))
+        chave = no['parametros']['chave']
+        chaves = [chave] if isinstance(chave, str) else list(chave)
+        if not all(k in colunas_a and k in colunas_b for k in chaves):
+            return False
+        
+        # Mesmas colunas e sufixos que pd.merge produziria
+        comuns = (set(colunas_a) & set(colunas_b)) - set(chaves)
+        selecao = [f"a.{_ident(c)} AS {_ident(c + '_x' if c in comuns else c)}" for c in colunas_a]
+        selecao += [f"b.{_ident(c)} AS {_ident(c + '_y' if c in comuns else c)}" for c in colunas_b if c not in chaves]
+        condicao = " AND ".join(f"a.{_ident(k)} = b.{_ident(k)}" for k in chaves)
+        query = (f"SELECT {', '.join(selecao)} FROM ({params_a['query']}) AS a "
+                 f"{'LEFT ' if tipo == 'left' else ''}JOIN ({params_b['query']}) AS b ON {condicao}")
+        params = list(params_a.get('params') or []) + list(params_b.get('params') or [])
+        self._substituir_por_sql(no, [fonte_a, fonte_b], query, params, 'join',
+                                 params_a.get('chunk_size') or params_b.get('chunk_size'))
+        return True
+    
+    def _pushdown_aggregate(self, no, produtores):
+        fonte = self._fonte_sql(no['entradas'][0], produtores)
+        if fonte is None:
+            return False
+        group_by, agg_dict = no['parametros']['group_by'], no['parametros']['agg_dict']
+        grupos = [group_by] if isinstance(group_by, str) else list(group_by)
+        funcoes = [(col, f) for col, fs in agg_dict.items() for f in ([fs] if isinstance(fs, str) else fs)]
+        if not all(isinstance(f, str) and f in FUNCOES_SQL for _, f in funcoes):
+            return False
         
-        resultado = df.groupby(group_by).agg(agg_dict).reset_index()
-        self.dados[nome_resultado] = resultado
-        self.log(f"✓ Agregação concluída: {len(resultado)} registros")
+        selecao = [_ident(g) for g in grupos]
+        selecao += [FUNCOES_SQL[f].format(c=_ident(col)) for col, f in funcoes]
+        # groupby do pandas descarta chaves nulas e ordena pelas chaves
+        query = (f"SELECT {', '.join(selecao)} FROM ({fonte['parametros']['query']}) "
+                 f"WHERE {' AND '.join(f'{_ident(g)} IS NOT NULL' for g in grupos)} "
+                 f"GROUP BY {', '.join(map(_ident, grupos))} ORDER BY {', '.join(map(_ident, grupos))}")
+        
+        if any(not isinstance(fs, str) for fs in agg_dict.values()):
+            colunas = [(g, '') for g in grupos] + funcoes
+        else:
+            colunas = grupos + [col for col, _ in funcoes]
+        self._substituir_por_sql(no, [fonte], query, fonte['parametros'].get('params'), 'agregação', colunas=colunas)
+        return True
+    
+    def _colunas_usadas(self, dataset, consumidores, memo):
+        """Colunas de um dataset que algum consumidor lê (None = todas)"""
+        if dataset in memo:
+            return memo[dataset]
+        usadas = set()
+        if not consumidores.get(dataset):
+            usadas = None  # dataset final: fica inteiro
+        for no in consumidores.get(dataset, []):
+            p = no['parametros']
+            if no['func'] is _etapa_aggregate:
+                grupos = [p['group_by']] if isinstance(p['group_by'], str) else list(p['group_by'])
+                usadas |= set(grupos) | set(p['agg_dict'])
+                continue
+            saida = self._colunas_usadas(no['saida'], consumidores, memo) if no['saida'] else None
+            if no['func'] is _etapa_filter and saida is not None:
+                usadas |= saida | {coluna for coluna, _, _ in p['condicoes']}
+            elif no['func'] is _etapa_join and saida is not None:
+                chave = p['chave']
+                # Colunas com sufixo de colisão vêm da coluna original
+                usadas |= saida | {c[:-2] for c in saida if c[-2:] in ('_x', '_y')}
+                usadas |= {chave} if isinstance(chave, str) else set(chave)
+            else:
+                usadas = None
+            if usadas is None:
+                break
+        memo[dataset] = usadas
+        return usadas
+    
+    def _otimizar_plano(self):
+        """Empurrar filtros, joins, agregações e projeções para as fontes SQL"""
+        pendentes = [no for no in self.nos if no['status'] == 'pendente']
+        regras = {_etapa_filter: self._pushdown_filter, _etapa_join: self._pushdown_join,
+                  _etapa_aggregate: self._pushdown_aggregate}
+        mudou = True
+        while mudou:
+            mudou = False
+            produtores = {no['saida']: no for no in pendentes if no['saida'] is not None}
+            for no in pendentes:
+                regra = regras.get(no['func'])
+                if regra is not None and regra(no, produtores):
+                    mudou = True
+        
+        # Projeção: cada extract SQL restante traz só as colunas que alguém usa
+        necessarios = self._nos_necessarios()
+        consumidores = {}
+        for no in necessarios:
+            for nome in no['entradas']:
+                consumidores.setdefault(nome, []).append(no)
+        memo = {}
+        for no in necessarios:
+            p = no['parametros']
+            if no['func'] is not _etapa_extract_sql or p.get('colunas') is not None or no.get('projetado'):
+                continue
+            usadas = self._colunas_usadas(no['saida'], consumidores, memo)
+            if usadas is None:
+                continue
+            colunas = _colunas_sql(p['db_path'], p['query'], p.get('params'))
+            manter = [c for c in colunas if c in usadas]
+            if manter and len(manter) < len(colunas):
+                p['query'] = f"SELECT {', '.join(map(_ident, manter))} FROM ({p['query']})"
+                no['projetado'] = True
+                no['inicio'] += f" [{len(manter)}/{len(colunas)} colunas]"
+    
+    def _criar_pool(self):
+        """Pool de processos (fork) ou de threads para executar os nós"""
+        if self.usar_processos and 'fork' in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(max_workers=self.n_workers,
+                                       mp_context=multiprocessing.get_context('fork'))
+        return ThreadPoolExecutor(max_workers=self.n_workers)
+    
+    def explicar(self):
+        """Mostrar o plano: nós pendentes em ondas de execução paralela"""
+        if self.pushdown:
+            self._otimizar_plano()
+        nos = self._nos_necessarios()
+        prontos = set(self.dados)
+        onda = 1
+        while nos:
+            # Mesma regra do run(): a entrada não pode ter outro produtor pendente
+            atual = [no for no in nos
+                     if all(nome in prontos and not any(n is not no and n['saida'] == nome for n in nos)
+                            for nome in no['entradas'])]
+            if not atual:
+                raise ValueError(f"Dependências não resolvidas: {[no['entradas'] for no in nos]}")
+            print(f"  Onda {onda}: " + " | ".join(no['inicio'] for no in atual))
+            for no in atual:
+                if 'pushdown' in no['inicio']:
+                    print(f"    SQL: {no['parametros']['query']}")
+            prontos.update(no['saida'] for no in atual if no['saida'] is not None)
+            nos = [no for no in nos if no not in atual]
+            onda += 1
         return self
     
-    def load_multiple(self, dataset, formatos=['csv', 'parquet'], prefixo='output'):
-        """Carregar dados em múltiplos formatos"""
-        self.log(f"Carregando dados: {dataset}")
-        df = self.dados[dataset]
+    def run(self):
+        """Executar o grafo: cada nó dispara assim que suas entradas ficam prontas"""
+        if self.pushdown:
+            self._otimizar_plano()
+        necessarios = self._nos_necessarios()
+        for no in self.nos:
+            if no['status'] == 'pendente' and all(no is not n for n in necessarios):
+                no['status'] = 'pulado'
+                self.nos_pulados.append(no)
+                self.log(f"Pulado (nenhum load usa): {no['saida']}")
         
-        for formato in formatos:
-            arquivo = f"{prefixo}_{dataset}.{formato}"
-            
-            if formato == 'csv':
-                df.to_csv(arquivo, index=False)
-            elif formato == 'parquet':
-                df.to_parquet(arquivo, index=False)
-            elif formato == 'json':
-                df.to_json(arquivo, orient='records', indent=2)
-            
-            self.log(f"✓ Salvo: {arquivo}")
+        aguardando = list(necessarios)
+        em_execucao = {}
         
+        try:
+            with self._criar_pool() as pool:
+                while aguardando or em_execucao:
+                    # Com diretorio_ipc, self.dados enxerga arquivos de execuções anteriores:
+                    # uma entrada só está pronta quando nenhum nó ainda vai (re)escrevê-la
+                    produtores = aguardando + [n for n, _, _ in em_execucao.values()]
+                    prontos = [no for no in aguardando
+                               if all(nome in self.dados and not any(n is not no and n['saida'] == nome
+                                                                     for n in produtores)
+                                      for nome in no['entradas'])]
+                    if not prontos and not em_execucao:
+                        raise ValueError(f"Dependências não resolvidas: {[no['entradas'] for no in aguardando]}")
+                    
+                    for no in prontos:
+                        aguardando.remove(no)
+                        chave, resultado = self._consultar_cache(no)
+                        if resultado is not None:
+                            self._concluir_no(no, resultado, chave)
+                            continue
+                        # Entradas protegidas de spill só enquanto o nó executa
+                        protecao = self._usando(*no['entradas'])
+                        protecao.__enter__()
+                        try:
+                            futuro = pool.submit(PipelineETL._executar_no, no, self._entradas_no(no))
+                        except BaseException:
+                            protecao.__exit__(None, None, None)
+                            raise
+                        em_execucao[futuro] = (no, protecao, chave)
+                    
+                    concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        no, protecao, chave = em_execucao.pop(futuro)
+                        protecao.__exit__(None, None, None)
+                        try:
+                            self._concluir_no(no, futuro.result(), chave)
+                        except Exception as e:
+                            no['status'] = 'erro'
+                            self.log(f"❌ Erro em '{no['inicio']}': {e}")
+                            for pendente in em_execucao:
+                                pendente.cancel()
+                            raise
+        finally:
+            # Depois de um erro, os nós que estavam em execução (o pool já esperou
+            # por eles) não podem deixar suas entradas presas fora do spill
+            for _, protecao, _ in em_execucao.values():
+                protecao.__exit__(None, None, None)
+        
+        if self.estado is not None:
+            self.confirmar_marcas()
         return self
     
     def relatorio_pipeline(self):
@@ -440,8 +2115,17 @@ class PipelineETL:
         print("=" * (len(self.nome) + 11))
         
         print("Datasets disponíveis:")
-        for nome, df in self.dados.items():
-            print(f"  {nome}: {df.shape}")
+        for nome in self.dados:
+            if self.governador and self.dados.em_disco(nome):
+                # Sem recarregar datasets que foram para disco
+                print(f"  {nome}: {self.dados.forma(nome)} (em disco)")
+            elif isinstance(self.dados[nome], FluxoFrames):
+                print(f"  {nome}: fluxo em chunks")
+            else:
+                print(f"  {nome}: {self.dados[nome].shape}")
+        
+        if self.nos_pulados:
+            print(f"Datasets não computados (nenhum load usa): {[no['saida'] for no in self.nos_pulados]}")
         
         print(f"\nLogs de execução ({len(self.logs)} entradas):")
         for log in self.logs[-10:]:  # Últimos 10 logs
@@ -478,6 +2162,274 @@ pipeline.load_multiple('vendas_por_cidade', ['csv', 'json'])
 # Relatório
 pipeline.relatorio_pipeline()
 
+print("\n7.2 Pipeline lazy (grafo de dependências + extracts paralelos):")
+# Consulta propositalmente lenta, simulando uma fonte remota: o SQLite libera
+# o GIL enquanto executa, então extracts independentes rodam de fato em paralelo
+query_lenta = """
+WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < 500000)
+SELECT p.status, COUNT(*) AS pedidos, SUM(p.valor) AS total
+FROM pedidos p JOIN (SELECT COUNT(*) AS n FROM seq) s
+GROUP BY p.status
+"""
+
+def montar_pipeline(lazy):
+    etl = PipelineETL(f"Pipeline {'lazy' if lazy else 'eager'}", lazy=lazy, n_workers=4)
+    for regiao in ['norte', 'sul', 'leste', 'oeste']:
+        etl.extract_sql('exemplo.db', query_lenta, f'status_{regiao}')
+    etl.extract_sql('exemplo.db', 'SELECT * FROM clientes', 'clientes')
+    etl.extract_sql('exemplo.db', 'SELECT * FROM analise_clientes', 'analise_clientes')  # ninguém usa
+    etl.transform_join('status_norte', 'status_sul', 'status', 'inner', 'status_comparado')
+    etl.load_multiple('status_comparado', ['csv'], prefixo='output_lazy')
+    etl.load_multiple('status_leste', ['csv'], prefixo='output_lazy')
+    etl.load_multiple('status_oeste', ['csv'], prefixo='output_lazy')
+    return etl
+
+start = time.time()
+montar_pipeline(lazy=False)
+tempo_eager = time.time() - start
+
+pipeline_lazy = montar_pipeline(lazy=True)
+print("\nPlano (cada onda roda em paralelo):")
+pipeline_lazy.explicar()
+start = time.time()
+pipeline_lazy.run()
+tempo_lazy = time.time() - start
+
+# O ganho depende dos núcleos disponíveis (ou da latência, em fontes remotas)
+print(f"\nEager: {tempo_eager:.2f}s | Lazy paralelo: {tempo_lazy:.2f}s "
+      f"({tempo_eager / tempo_lazy:.1f}x com {os.cpu_count()} núcleo(s))")
+print(f"Datasets pulados: {[no['saida'] for no in pipeline_lazy.nos_pulados]}")
+for arquivo in ['output_lazy_status_comparado.csv', 'output_lazy_status_leste.csv', 'output_lazy_status_oeste.csv']:
+    os.remove(arquivo)
+
+print("\n7.3 Extract em streaming com pool de conexões:")
+# pedidos chega em chunks de 100 linhas (fetchmany) e atravessa join,
+# agregação e load sem nunca existir inteiro em memória
+conexoes_antes = POOL_SQL.criadas
+pipeline_stream = PipelineETL("Pipeline Streaming")
+pipeline_stream.extract_sql(
+    'exemplo.db', 'SELECT * FROM clientes', 'clientes'
+).extract_sql(
+    'exemplo.db', 'SELECT * FROM pedidos', 'pedidos', chunk_size=100
+).transform_join(
+    'clientes', 'pedidos', 'cliente_id', 'inner', 'vendas_completas'
+).transform_aggregate(
+    'vendas_completas', ['cidade'], {'valor': ['sum', 'mean', 'count']}, 'vendas_por_cidade'
+).load_multiple('vendas_completas', ['csv', 'parquet', 'json'], prefixo='output_stream')
+
+# Mesmo resultado do pipeline 7.1, que materializou tudo
+print("\nAgregação em streaming igual à materializada:",
+      np.allclose(pipeline_stream.dados['vendas_por_cidade'].iloc[:, 1:].values,
+                  pipeline.dados['vendas_por_cidade'].iloc[:, 1:].values))
+print(f"Arquivo CSV gravado em chunks: {len(pd.read_csv('output_stream_vendas_completas.csv'))} linhas")
+print(f"Conexões SQLite: {POOL_SQL.criadas - conexoes_antes} criadas, {POOL_SQL.reutilizadas} reutilizações")
+for formato in ['csv', 'parquet', 'json']:
+    os.remove(f'output_stream_vendas_completas.{formato}')
+
+print("\n7.4 Pushdown de filtro, join e agregação para o SQL:")
+# O mesmo pipeline do 7.1 (mais um filtro), em modo lazy: o planejador
+# percebe que tudo acontece sobre exemplo.db e gera uma única query
+pipeline_pushdown = PipelineETL("Pipeline Pushdown", lazy=True)
+pipeline_pushdown.extract_sql(
+    'exemplo.db', 'SELECT * FROM clientes', 'clientes'
+).extract_sql(
+    'exemplo.db', 'SELECT * FROM pedidos', 'pedidos'
+).transform_filter(
+    'pedidos', [('status', 'in', ['Enviado', 'Entregue']), ('valor', '>=', 100)], 'pedidos_validos'
+).transform_join(
+    'clientes', 'pedidos_validos', 'cliente_id', 'inner', 'vendas_completas'
+).transform_aggregate(
+    'vendas_completas', ['cidade'], {'valor': ['sum', 'mean', 'count']}, 'vendas_por_cidade'
+).load_multiple('vendas_por_cidade', ['csv'], prefixo='output_pushdown')
+
+print("Plano otimizado:")
+pipeline_pushdown.explicar()
+pipeline_pushdown.run()
+
+# Conferindo com o mesmo cálculo feito inteiramente em pandas
+pedidos_validos = pipeline.dados['pedidos'][
+    pipeline.dados['pedidos']['status'].isin(['Enviado', 'Entregue']) & (pipeline.dados['pedidos']['valor'] >= 100)
+]
+esperado = (pd.merge(pipeline.dados['clientes'], pedidos_validos, on='cliente_id')
+            .groupby(['cidade']).agg({'valor': ['sum', 'mean', 'count']}).reset_index())
+obtido = pipeline_pushdown.dados['vendas_por_cidade']
+print("\nResultado igual ao do pandas:", list(obtido.columns) == list(esperado.columns)
+      and np.allclose(obtido.iloc[:, 1:].values, esperado.iloc[:, 1:].values))
+print(f"Registros trafegados: {len(obtido)} (pushdown) vs "
+      f"{len(pipeline.dados['clientes']) + len(pipeline.dados['pedidos'])} (SELECT * + pandas)")
+os.remove('output_pushdown_vendas_por_cidade.csv')
+
+print("\n7.5 Carga paralela e Parquet particionado:")
+pipeline_carga = PipelineETL("Pipeline Carga")
+pipeline_carga.dados['eventos'] = df_grande  # 100 mil linhas da seção 2
+
+for paralelo in [False, True]:
+    start = time.time()
+    pipeline_carga.load_multiple('eventos', ['csv', 'parquet', 'json'], prefixo='output_carga', paralelo=paralelo)
+    print(f"Formatos {'em paralelo' if paralelo else 'em sequência'}: {time.time() - start:.2f}s")
+
+# Layout hive por categoria, ordenado por timestamp, row groups de 10 mil linhas,
+# zstd e commit atômico (temporário + rename)
+pipeline_carga.load_multiple(
+    'eventos', ['parquet'], prefixo='output_particionado', atomico=True,
+    partition_by='categoria', row_group_size=10_000, compressao='zstd', ordenar_por='timestamp'
+)
+raiz = 'output_particionado_eventos.parquet'
+for pasta in sorted(os.listdir(raiz)):
+    arquivos = os.listdir(os.path.join(raiz, pasta))
+    metadados = pq.ParquetFile(os.path.join(raiz, pasta, arquivos[0])).metadata
+    print(f"  {raiz}/{pasta}/: {len(arquivos)} arquivo(s), {metadados.num_rows:,} linhas, "
+          f"{metadados.num_row_groups} row groups")
+
+# Leitores podem podar partições inteiras pelo filtro
+df_categoria_a = pd.read_parquet(raiz, filters=[('categoria', '==', 'A')])
+print(f"Lendo só categoria=A: {len(df_categoria_a):,} linhas")
+shutil.rmtree(raiz)
+for formato in ['csv', 'parquet', 'json']:
+    os.remove(f'output_carga_eventos.{formato}')
+
+print("\n7.6 Extração incremental (marcas d'água) e upsert:")
+estado_etl = EstadoIncremental('etl_estado.json')
+
+def rodar_incremental():
+    etl = PipelineETL("Pipeline Incremental", estado=estado_etl)
+    etl.extract_sql('exemplo.db', 'SELECT * FROM pedidos', 'pedidos', incremental='pedido_id')
+    etl.load_multiple('pedidos', ['parquet'], prefixo='output_incremental', modo='upsert',
+                      chave='pedido_id', atomico=True)
+    etl.load_sql('pedidos', 'exemplo_dw.db', 'pedidos_dw', chave='pedido_id')
+    etl.confirmar_marcas()  # só depois que as cargas deram certo
+    return len(etl.dados['pedidos'])
+
+print(f"Rodada 1 (carga completa): {rodar_incremental()} registros")
+
+# Novos pedidos chegam na origem (pedido_id e data_pedido crescentes)
+conn = sqlite3.connect('exemplo.db')
+novos = pd.DataFrame({
+    'pedido_id': range(501, 551),
+    'cliente_id': np.random.randint(1, 101, 50),
+    'valor': np.random.uniform(50, 1000, 50).round(2),
+    'data_pedido': pd.date_range('2024-01-21 20:00', periods=50, freq='H').astype(str),
+    'status': 'Pendente'
+})
+novos.to_sql('pedidos', conn, if_exists='append', index=False)
+conn.close()
+
+print(f"Rodada 2 (só o delta): {rodar_incremental()} registros")
+print(f"Rodada 3 (nada novo): {rodar_incremental()} registros")
+
+conn = sqlite3.connect('exemplo_dw.db')
+total_dw = conn.execute("SELECT COUNT(*) FROM pedidos_dw").fetchone()[0]
+conn.close()
+print(f"Destino Parquet: {len(pd.read_parquet('output_incremental_pedidos.parquet'))} linhas | "
+      f"Destino SQL: {total_dw} linhas")
+print(f"Estado salvo: {estado_etl.marca('Pipeline Incremental', 'pedidos')}")
+os.remove('output_incremental_pedidos.parquet')
+
+print("\n7.7 Cache de resultados das etapas:")
+cache_etl = CacheEtapas('cache_etapas_aula12', limite_mb=50)
+
+def rodar_com_cache(agg_final):
+    etl = PipelineETL("Pipeline Cache", cache=cache_etl)
+    etl.extract_sql('exemplo.db', 'SELECT * FROM clientes', 'clientes')
+    etl.extract_sql('exemplo.db', 'SELECT * FROM pedidos', 'pedidos')
+    etl.transform_join('clientes', 'pedidos', 'cliente_id', 'inner', 'vendas_completas')
+    etl.transform_aggregate('vendas_completas', ['cidade'], agg_final, 'vendas_por_cidade')
+    return etl
+
+print("Primeira execução (cache vazio):")
+rodar_com_cache({'valor': ['sum', 'mean']})
+print("\nSegunda execução (nada mudou):")
+rodar_com_cache({'valor': ['sum', 'mean']})
+print("\nSó a agregação final mudou:")
+etl_cache = rodar_com_cache({'valor': ['sum', 'max'], 'pedido_id': 'count'})
+print(f"\nCache: {cache_etl.estatisticas()}")
+cache_etl.limpar()
+os.rmdir('cache_etapas_aula12')
+
+print("\n7.8 Pipeline sob limite de memória (spill para disco):")
+# governador_memoria.py fica ao lado das aulas e é compartilhado com a aula 11
+from governador_memoria import GovernadorMemoria, rss_mb
+
+# Limite apertado de propósito: ~25 MB acima do RSS atual
+with GovernadorMemoria(limite_rss_mb=rss_mb() + 25) as governador:
+    print(f"Limite de RSS: {governador.limite_rss_mb:.0f} MB")
+    pipeline_governado = PipelineETL("Pipeline Governado", governador)
+    pipeline_governado.extract_sql('exemplo.db', 'SELECT * FROM clientes', 'clientes')
+    pipeline_governado.extract_sql('exemplo.db', 'SELECT * FROM pedidos', 'pedidos')
+    
+    # Intermediários grandes (histórico simulado) que ficam ociosos até o fim
+    n_hist = 400_000
+    for ano in [2021, 2022, 2023]:
+        pipeline_governado.dados[f'historico_{ano}'] = pd.DataFrame({
+            'cliente_id': np.random.randint(1, 101, n_hist),
+            'valor': np.random.uniform(50, 1000, n_hist),
+            'descricao': np.array([f'Pedido {i}' for i in range(1000)], dtype=object)[np.random.randint(0, 1000, n_hist)]
+        })
+        print(f"historico_{ano} criado, RSS: {rss_mb():.1f} MB")
+    
+    pipeline_governado.transform_join(
+        'clientes', 'pedidos', 'cliente_id', 'inner', 'vendas_completas'
+    ).transform_aggregate(
+        'historico_2021', ['cliente_id'], {'valor': 'sum'}, 'historico_por_cliente'
+    )
+    pipeline_governado.relatorio_pipeline()
+    
+    estatisticas = governador.estatisticas()
+    print(f"\nSpills: {estatisticas['spills']} ({estatisticas['mb_despejados']:.1f} MB), "
+          f"recargas: {estatisticas['recargas']}, I/O: {estatisticas['tempo_io']:.2f}s")
+    print(f"Em memória: {estatisticas['em_memoria']}, em disco: {estatisticas['em_disco']}")
+
+print("\n7.9 Hand-off entre estágios via Arrow IPC (memory map):")
+diretorio_ipc = 'etapas_ipc'
+
+# Estágio 1: extrai e junta; as saídas vão para arquivos .arrow
+estagio_1 = PipelineETL("Estágio 1", diretorio_ipc=diretorio_ipc)
+estagio_1.extract_sql('exemplo.db', 'SELECT * FROM clientes', 'clientes') \
+         .extract_sql('exemplo.db', 'SELECT * FROM pedidos', 'pedidos') \
+         .transform_join('clientes', 'pedidos', 'cliente_id', 'inner', 'vendas_completas')
+estagio_1.dados['eventos'] = df_grande
+print(f"Arquivos do estágio 1: {sorted(os.listdir(diretorio_ipc))}")
+
+# Abrir o dataset grande: memory map + ArrowDtype vs decodificar um Parquet
+df_grande.to_parquet('eventos_handoff.parquet')
+inicio = time.perf_counter()
+eventos_parquet = pd.read_parquet('eventos_handoff.parquet')
+tempo_parquet = time.perf_counter() - inicio
+inicio = time.perf_counter()
+eventos_ipc = estagio_1.dados['eventos']
+tempo_ipc = time.perf_counter() - inicio
+print(f"Abrir 'eventos' ({len(eventos_ipc):,} linhas): Parquet {tempo_parquet * 1000:.1f} ms | "
+      f"Arrow IPC mapeado {tempo_ipc * 1000:.2f} ms")
+print(f"dtypes: {eventos_ipc.dtypes.astype(str).to_dict()}")
+
+def _abrir_em_outro_processo(diretorio, nome):
+    """Estágio em outro processo: abre o dataset do estágio anterior pelo diretório"""
+    inicio = time.perf_counter()
+    df = DadosArrowIPC(diretorio)[nome]
+    tempo_abertura = time.perf_counter() - inicio
+    total = float(df.groupby('categoria')['valor'].sum().sum())
+    return os.getpid(), tempo_abertura, total
+
+# Dois leitores em processos separados mapeiam o mesmo arquivo (page cache compartilhado)
+if 'fork' in multiprocessing.get_all_start_methods():
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('fork')) as pool:
+        futuros = [pool.submit(_abrir_em_outro_processo, diretorio_ipc, 'eventos') for _ in range(2)]
+        for futuro in futuros:
+            pid, tempo_abertura, total = futuro.result()
+            print(f"  Processo {pid}: aberto em {tempo_abertura * 1000:.2f} ms, soma por categoria {total:,.0f}")
+
+# Estágio 2: outro pipeline no mesmo diretório continua de onde o 1 parou
+estagio_2 = PipelineETL("Estágio 2", diretorio_ipc=diretorio_ipc)
+estagio_2.transform_aggregate(
+    'vendas_completas', ['cidade'], {'valor': 'sum', 'pedido_id': 'count'}, 'vendas_por_cidade'
+).load_multiple('vendas_por_cidade', ['csv', 'parquet'], prefixo='output_estagio2')
+print(pd.read_csv('output_estagio2_vendas_por_cidade.csv'))
+
+shutil.rmtree(diretorio_ipc)
+for arquivo in ['eventos_handoff.parquet', 'output_estagio2_vendas_por_cidade.csv',
+                'output_estagio2_vendas_por_cidade.parquet']:
+    os.remove(arquivo)
+
 # 8. BOAS PRÁTICAS DE INTEGRAÇÃO
 print("\n8. BOAS PRÁTICAS DE INTEGRAÇÃO")
 print("-" * 40)
@@ -510,10 +2462,19 @@ arquivos_temp = [
     'relatorio_vendas.xlsx', 
     'relatorio_vendas.json',
     'relatorio_vendas.html',
+    'vendas_grandes.csv',
+    'relatorio_grande.json',
+    'relatorio_grande.html',
+    'relatorio_grande.xlsx',
+    'relatorio_grande_inteiro.json',
+    'relatorio_grande_inteiro.html',
     'output_vendas_por_cidade.csv',
-    'output_vendas_por_cidade.json'
+    'output_vendas_por_cidade.json',
+    'exemplo_dw.db',
+    'etl_estado.json'
 ]
 
+POOL_SQL.fechar()
 arquivos_removidos = 0
 for arquivo in arquivos_temp:
     try:
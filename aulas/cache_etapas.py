@@ -0,0 +1,266 @@
+"""
+Cache de resultados de etapas de pipeline
+=========================================
+
+Reexecutar PipelineETL (aula 12) ou PipelineAvancado (aula 11) depois de
+mudar só a última etapa recalcula tudo o que vem antes. Com um CacheEtapas,
+cada etapa é identificada por uma impressão digital (fingerprint) de:
+
+- as impressões dos datasets de entrada (encadeadas de etapa em etapa, ou
+  um hash do conteúdo quando o dataset veio de fora do pipeline);
+- o código-fonte da função da etapa, das funções globais do mesmo módulo
+  que ela chama (recursivamente) e os valores capturados em closures;
+- os parâmetros da etapa.
+
+DataFrames e arrays capturados entram pelo conteúdo (não pelo repr, que
+mostra só as pontas). Uma etapa que captura um objeto cujo repr traz
+endereço de memória não tem impressão estável e roda sempre, sem cache.
+
+Se a impressão já está no cache, a etapa é pulada e a saída é lida do disco
+(Parquet ou Feather). O diretório tem um limite de tamanho, com descarte dos
+arquivos usados há mais tempo (LRU).
+
+Uso típico:
+
+    cache = CacheEtapas('.cache_etapas', limite_mb=500)
+    chave = cache.chave(func, parametros, impressoes_entradas)
+    df = cache.obter(chave)
+    if df is None:
+        df = func(...)
+        cache.guardar(chave, df)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+# repr padrão de objetos: '<modulo.Classe object at 0x7f...>' muda a cada execução
+_ENDERECO_MEMORIA = re.compile(r'\bat 0x[0-9a-fA-F]+')
+
+
+def impressao_dataframe(df):
+    """Hash do conteúdo de um DataFrame (valores, índice, colunas e dtypes)"""
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(t) for t in df.dtypes]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def _nomes_globais(codigo):
+    """Nomes usados pelo código, incluindo lambdas, funções internas e compreensões"""
+    nomes = set(codigo.co_names)
+    for constante in codigo.co_consts:
+        if inspect.iscode(constante):
+            nomes |= _nomes_globais(constante)
+    return nomes
+
+
+def _repr_codigo(codigo):
+    """Bytecode e constantes, sem endereços de memória dos code objects internos"""
+    constantes = [_repr_codigo(c) if inspect.iscode(c) else repr(c) for c in codigo.co_consts]
+    return repr((codigo.co_code, constantes))
+
+
+def _fonte_funcao(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        codigo = getattr(func, '__code__', None)
+        return _repr_codigo(codigo) if codigo else repr(func)
+
+
+def _impressao_valor(valor, visitadas):
+    """Impressão estável de um valor capturado pela etapa (closure, default, parâmetro)
+
+    Dados (DataFrame, Series, Index, ndarray) entram pelo conteúdo, não pelo
+    repr truncado. Valores cujo repr traz endereço de memória não têm
+    impressão estável: ValueError, e a etapa fica sem cache.
+    """
+    if inspect.isfunction(valor):
+        if id(valor) in visitadas:
+            return valor.__qualname__
+        return impressao_funcao(valor, visitadas)
+    if inspect.ismethod(valor):
+        # Método ligado: o objeto faz parte do que a etapa usa
+        return f"{_impressao_valor(valor.__self__, visitadas)}.{_impressao_valor(valor.__func__, visitadas)}"
+    if isinstance(valor, pd.DataFrame):
+        return f"DataFrame:{impressao_dataframe(valor)}"
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return f"{type(valor).__name__}:{impressao_dataframe(valor.to_frame())}"
+    if isinstance(valor, np.ndarray):
+        if valor.dtype == object:
+            return f"ndarray{valor.shape}:" + _impressao_valor(valor.ravel().tolist(), visitadas)
+        h = hashlib.sha256(f"{valor.dtype.str}{valor.shape}".encode())
+        h.update(np.ascontiguousarray(valor).tobytes())
+        return f"ndarray:{h.hexdigest()}"
+    if isinstance(valor, (list, tuple)):
+        itens = ', '.join(_impressao_valor(item, visitadas) for item in valor)
+        return f"{type(valor).__name__}({itens})"
+    if isinstance(valor, (set, frozenset)):
+        itens = sorted(_impressao_valor(item, visitadas) for item in valor)
+        return f"{type(valor).__name__}({', '.join(itens)})"
+    if isinstance(valor, dict):
+        itens = sorted(f"{_impressao_valor(chave, visitadas)}: {_impressao_valor(item, visitadas)}"
+                       for chave, item in valor.items())
+        return '{' + ', '.join(itens) + '}'
+    if callable(valor) and hasattr(valor, '__qualname__') and getattr(valor, '__module__', None):
+        # Funções embutidas e de bibliotecas (np.sum, len...): o nome basta
+        return f"{valor.__module__}.{valor.__qualname__}"
+    texto = repr(valor)
+    if _ENDERECO_MEMORIA.search(texto):
+        raise ValueError(f"Sem impressão estável para {type(valor).__name__}: {texto}")
+    return texto
+
+
+def impressao_funcao(func, _visitadas=None):
+    """Código-fonte da função mais o que ela captura (closures e defaults)
+
+    Funções globais do mesmo módulo chamadas pela etapa (ex.: _etapa_filter →
+    _mascara_filtro) entram na impressão recursivamente: editar um helper
+    invalida as etapas que dependem dele. Funções de outros módulos
+    (pandas, numpy...) e atributos acessados em tempo de execução
+    (self.metodo, getattr) não são seguidos. Levanta ValueError se algum
+    valor capturado não tiver impressão estável (ver _impressao_valor).
+    """
+    visitadas = set() if _visitadas is None else _visitadas
+    visitadas.add(id(func))
+
+    partes = [_fonte_funcao(func)]
+    celulas = getattr(func, '__closure__', None) or ()
+    partes.append(_impressao_valor([celula.cell_contents for celula in celulas], visitadas))
+    partes.append(_impressao_valor(getattr(func, '__defaults__', None), visitadas))
+
+    codigo = getattr(func, '__code__', None)
+    globais = getattr(func, '__globals__', {})
+    if codigo is not None:
+        for nome in sorted(_nomes_globais(codigo)):
+            valor = globais.get(nome)
+            if (inspect.isfunction(valor) and valor.__module__ == func.__module__
+                    and id(valor) not in visitadas):
+                partes.append(f"{nome}={impressao_funcao(valor, visitadas)}")
+    return '\n'.join(partes)
+
+
+class CacheEtapas:
+    """Saídas de etapas em disco, endereçadas pela impressão digital da etapa"""
+
+    def __init__(self, diretorio='.cache_etapas', limite_mb=500, formato='parquet'):
+        if formato not in ('parquet', 'feather'):
+            raise ValueError(f"Formato inválido: {formato}")
+        self.diretorio = diretorio
+        self.limite_bytes = limite_mb * 1024 * 1024
+        self.formato = formato
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+    def chave(self, func, parametros=None, entradas=()):
+        """Impressão digital da etapa: fonte da função + parâmetros + impressões das entradas
+
+        None quando a etapa não tem impressão estável (uma entrada sem
+        impressão ou um valor capturado sem repr confiável): não cachear.
+        """
+        if any(entrada is None for entrada in entradas):
+            return None
+        h = hashlib.sha256()
+        try:
+            h.update(impressao_funcao(func).encode())
+            h.update(json.dumps(parametros or {}, sort_keys=True,
+                                default=lambda valor: _impressao_valor(valor, set())).encode())
+        except ValueError:
+            return None
+        for entrada in entradas:
+            h.update(entrada.encode())
+        return h.hexdigest()
+
+    def _caminho(self, chave):
+        for extensao in ('.parquet', '.feather'):
+            caminho = os.path.join(self.diretorio, chave + extensao)
+            if os.path.exists(caminho):
+                return caminho
+        return None
+
+    def obter(self, chave):
+        """DataFrame guardado para a chave, ou None"""
+        if chave is None:
+            return None
+        with self._lock:
+            caminho = self._caminho(chave)
+            if caminho is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            os.utime(caminho)  # mtime = último uso, para o LRU
+        if caminho.endswith('.feather'):
+            return pd.read_feather(caminho)
+        return pd.read_parquet(caminho)
+
+    def guardar(self, chave, df):
+        """Guardar a saída de uma etapa (objetos que não são DataFrame não são cacheados)"""
+        if chave is None or not isinstance(df, pd.DataFrame):
+            return False
+        base = os.path.join(self.diretorio, chave)
+        temporario = f"{base}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            if self.formato == 'feather':
+                try:
+                    # Feather exige índice padrão e nomes de coluna em texto
+                    df.to_feather(temporario)
+                    destino = base + '.feather'
+                except (ValueError, TypeError):
+                    df.to_parquet(temporario)
+                    destino = base + '.parquet'
+            else:
+                df.to_parquet(temporario)
+                destino = base + '.parquet'
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return False  # sem cache para esta saída; a etapa segue normal
+        os.replace(temporario, destino)
+        self._descartar_excesso()
+        return True
+
+    def _descartar_excesso(self):
+        """LRU: remover os arquivos usados há mais tempo até caber no limite"""
+        with self._lock:
+            arquivos = []
+            for nome in os.listdir(self.diretorio):
+                if nome.endswith(('.parquet', '.feather')):
+                    caminho = os.path.join(self.diretorio, nome)
+                    info = os.stat(caminho)
+                    arquivos.append((info.st_mtime, info.st_size, caminho))
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.limite_bytes:
+                    break
+                os.remove(caminho)
+                total -= tamanho
+                self.descartes += 1
+
+    def tamanho_mb(self):
+        return sum(os.path.getsize(os.path.join(self.diretorio, nome))
+                   for nome in os.listdir(self.diretorio)) / 1024 / 1024
+
+    def estatisticas(self):
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'descartes': self.descartes,
+            'tamanho_mb': round(self.tamanho_mb(), 3)
+        }
+
+    def limpar(self):
+        """Apagar todas as entradas do cache"""
+        with self._lock:
+            for nome in os.listdir(self.diretorio):
+                os.remove(os.path.join(self.diretorio, nome))
@@ -0,0 +1,285 @@
+"""
+Governador de memória para pipelines
+====================================
+
+monitorar_memoria e info_memoria_df (aula 10) só informam o uso de memória.
+Este módulo age sobre esses números: pipelines (PipelineAvancado na aula 11,
+PipelineETL na aula 12) registram seus DataFrames intermediários em um
+GovernadorMemoria. Quando o RSS do processo passa do limite configurado, os
+maiores intermediários ociosos são despejados (spill) para Parquet em disco
+e recarregados de forma preguiçosa no próximo acesso. Em vez de um OOM, o
+pipeline fica apenas mais lento.
+
+Uso típico:
+
+    governador = GovernadorMemoria(limite_rss_mb=2048)
+    dados = governador.registrar('Pipeline Vendas')   # dict-like
+    dados['pedidos'] = df_pedidos                     # pode ir para disco
+    df = dados['pedidos']                             # recarregado se preciso
+
+    with dados.em_uso('pedidos'):                     # protegido de spill
+        ...
+"""
+
+import gc
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+import pandas as pd
+import psutil
+# Importado já aqui: carregar o Arrow custa dezenas de MB de RSS e, se isso
+# acontecesse no primeiro spill, o próprio spill empurraria o RSS para cima
+import pyarrow
+import pyarrow.parquet  # noqa: F401
+
+
+def rss_mb():
+    """RSS atual do processo em MB (mesma medida de monitorar_memoria)"""
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+
+
+class _Entrada:
+    """Um DataFrame governado: em memória ou despejado em disco"""
+
+    def __init__(self, df):
+        self.df = df
+        self.arquivo = None
+        # Só DataFrames vão para disco; outros objetos (fluxos, iteradores) ficam como estão
+        self.despejavel = isinstance(df, pd.DataFrame)
+        self.bytes = int(df.memory_usage(deep=True).sum()) if self.despejavel else 0
+        self.forma = df.shape if self.despejavel else None
+        self.ultimo_acesso = 0
+        self.em_uso = 0
+
+    @property
+    def em_disco(self):
+        return self.df is None
+
+
+class DadosGovernados(MutableMapping):
+    """Dicionário de DataFrames de um pipeline, com spill e recarga transparentes"""
+
+    def __init__(self, governador, dono):
+        self.governador = governador
+        self.dono = dono
+        self._entradas = {}
+
+    def __setitem__(self, nome, df):
+        with self.governador._lock:
+            antiga = self._entradas.get(nome)
+            if antiga is not None:
+                self.governador._descartar_arquivo(antiga)
+            entrada = _Entrada(df)
+            entrada.ultimo_acesso = self.governador._tique()
+            self._entradas[nome] = entrada
+        self.governador.verificar()
+
+    def __getitem__(self, nome):
+        with self.governador._lock:
+            entrada = self._entradas[nome]
+            entrada.ultimo_acesso = self.governador._tique()
+            if entrada.em_disco:
+                self.governador._recarregar(self.dono, nome, entrada)
+            df = entrada.df
+        # A recarga pode ter empurrado o processo acima do limite
+        self.governador.verificar()
+        return df
+
+    def __delitem__(self, nome):
+        with self.governador._lock:
+            entrada = self._entradas.pop(nome)
+            self.governador._descartar_arquivo(entrada)
+
+    def __iter__(self):
+        return iter(list(self._entradas))
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def forma(self, nome):
+        """Shape do dataset sem recarregá-lo do disco"""
+        return self._entradas[nome].forma
+
+    def em_disco(self, nome):
+        return self._entradas[nome].em_disco
+
+    @contextmanager
+    def em_uso(self, *nomes):
+        """Proteger datasets de spill enquanto uma etapa trabalha com eles"""
+        with self.governador._lock:
+            for nome in nomes:
+                self._entradas[nome].em_uso += 1
+        try:
+            yield
+        finally:
+            with self.governador._lock:
+                for nome in nomes:
+                    if nome in self._entradas:
+                        self._entradas[nome].em_uso -= 1
+
+
+class GovernadorMemoria:
+    """Despejar os maiores DataFrames ociosos em disco quando o RSS passa do limite
+
+    - limite_rss_mb: RSS a partir do qual o spill começa
+    - alvo_fracao: o spill continua até a estimativa de RSS ficar abaixo de
+      limite × alvo_fracao (histerese, evita spill a cada atribuição)
+    - ocioso_acessos: uma entrada é ociosa se houve pelo menos esse número
+      de acessos a outras entradas desde o seu último uso (a entrada recém
+      atribuída/lida nunca é despejada pelo mesmo acesso que a tocou)
+    - intervalo_monitor: se > 0, uma thread verifica o RSS periodicamente
+      além das verificações feitas a cada atribuição/acesso
+    """
+
+    def __init__(self, limite_rss_mb, diretorio_spill=None, alvo_fracao=0.8,
+                 ocioso_acessos=1, intervalo_monitor=0, compressao='lz4'):
+        self.limite_rss_mb = limite_rss_mb
+        self.alvo_fracao = alvo_fracao
+        self.ocioso_acessos = ocioso_acessos
+        self.compressao = compressao
+        self._diretorio_proprio = diretorio_spill is None
+        self.diretorio_spill = diretorio_spill or tempfile.mkdtemp(prefix='spill_pandas_')
+        os.makedirs(self.diretorio_spill, exist_ok=True)
+        self._lock = threading.RLock()
+        self._registros = []
+        self._contador = 0
+        self._relogio = 0
+        self.eventos = []
+
+        self._parar = threading.Event()
+        self._monitor = None
+        if intervalo_monitor > 0:
+            self._monitor = threading.Thread(target=self._monitorar, args=(intervalo_monitor,), daemon=True)
+            self._monitor.start()
+
+    def registrar(self, dono):
+        """Registrar um pipeline; retorna o dicionário governado de seus datasets"""
+        dados = DadosGovernados(self, dono)
+        with self._lock:
+            self._registros.append(dados)
+        return dados
+
+    def _tique(self):
+        """Relógio lógico de acessos, usado para decidir o que está ocioso"""
+        self._relogio += 1
+        return self._relogio
+
+    def _monitorar(self, intervalo):
+        while not self._parar.wait(intervalo):
+            self.verificar()
+
+    def _candidatos(self):
+        """Entradas em memória, ociosas e não protegidas, das maiores para as menores"""
+        candidatos = [
+            (dados, nome, entrada)
+            for dados in self._registros
+            for nome, entrada in dados._entradas.items()
+            if entrada.despejavel and not entrada.em_disco and entrada.em_uso == 0
+            and self._relogio - entrada.ultimo_acesso >= self.ocioso_acessos
+        ]
+        return sorted(candidatos, key=lambda c: -c[2].bytes)
+
+    def verificar(self):
+        """Checar o RSS e despejar intermediários até voltar abaixo do alvo"""
+        with self._lock:
+            rss = rss_mb()
+            if rss <= self.limite_rss_mb:
+                return 0
+
+            # O allocator nem sempre devolve memória ao SO na hora: a meta é
+            # estimada pelos bytes liberados, não por novas leituras de RSS
+            excesso = (rss - self.limite_rss_mb * self.alvo_fracao) * 1024 * 1024
+            liberado = 0
+            despejados = 0
+            for dados, nome, entrada in self._candidatos():
+                if liberado >= excesso:
+                    break
+                self._despejar(dados.dono, nome, entrada)
+                liberado += entrada.bytes
+                despejados += 1
+
+            if despejados:
+                gc.collect()
+                # O pool de memória do Arrow retém o buffer usado na conversão
+                pyarrow.default_memory_pool().release_unused()
+            return despejados
+
+    def _despejar(self, dono, nome, entrada):
+        inicio = time.perf_counter()
+        if entrada.arquivo is None:
+            self._contador += 1
+            seguro = re.sub(r'[^\w.-]+', '_', str(nome))
+            base = os.path.join(self.diretorio_spill, f"{self._contador:05d}_{seguro}")
+            try:
+                entrada.df.to_parquet(base + '.parquet', compression=self.compressao)
+                entrada.arquivo = base + '.parquet'
+            except (ValueError, TypeError, ImportError):
+                # Colunas que o Arrow não representa (objetos mistos etc.)
+                if os.path.exists(base + '.parquet'):
+                    os.remove(base + '.parquet')
+                entrada.df.to_pickle(base + '.pkl')
+                entrada.arquivo = base + '.pkl'
+        # Arquivo já existente continua válido: o DataFrame não muda após atribuído
+        entrada.df = None
+        self.eventos.append({
+            'evento': 'spill', 'dono': dono, 'dataset': nome,
+            'mb': entrada.bytes / 1024 / 1024,
+            'tempo': time.perf_counter() - inicio, 'rss_mb': rss_mb()
+        })
+
+    def _recarregar(self, dono, nome, entrada):
+        inicio = time.perf_counter()
+        if entrada.arquivo.endswith('.parquet'):
+            entrada.df = pd.read_parquet(entrada.arquivo)
+        else:
+            entrada.df = pd.read_pickle(entrada.arquivo)
+        self.eventos.append({
+            'evento': 'recarga', 'dono': dono, 'dataset': nome,
+            'mb': entrada.bytes / 1024 / 1024,
+            'tempo': time.perf_counter() - inicio, 'rss_mb': rss_mb()
+        })
+
+    def _descartar_arquivo(self, entrada):
+        if entrada.arquivo and os.path.exists(entrada.arquivo):
+            os.remove(entrada.arquivo)
+        entrada.arquivo = None
+
+    def estatisticas(self):
+        """Resumo de spills/recargas e do que está em memória ou em disco"""
+        eventos = pd.DataFrame(self.eventos, columns=['evento', 'dono', 'dataset', 'mb', 'tempo', 'rss_mb'])
+        entradas = [e for dados in self._registros for e in dados._entradas.values()]
+        return {
+            'spills': int((eventos['evento'] == 'spill').sum()),
+            'recargas': int((eventos['evento'] == 'recarga').sum()),
+            'mb_despejados': float(eventos.loc[eventos['evento'] == 'spill', 'mb'].sum()),
+            'tempo_io': float(eventos['tempo'].sum()),
+            'em_memoria': sum(not e.em_disco for e in entradas),
+            'em_disco': sum(e.em_disco for e in entradas),
+        }
+
+    def fechar(self):
+        """Parar o monitor e remover os arquivos de spill (datasets em disco são descartados)"""
+        self._parar.set()
+        if self._monitor is not None:
+            self._monitor.join()
+        with self._lock:
+            for dados in self._registros:
+                for nome, entrada in list(dados._entradas.items()):
+                    self._descartar_arquivo(entrada)
+                    # Sem o arquivo não há como recarregar: entradas em disco somem
+                    if entrada.em_disco:
+                        del dados._entradas[nome]
+        if self._diretorio_proprio:
+            shutil.rmtree(self.diretorio_spill, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
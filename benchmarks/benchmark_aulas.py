@@ -0,0 +1,153 @@
+"""
+Benchmarks das recomendações de performance das aulas
+=====================================================
+
+Reúne as comparações feitas com um único time.time() nas aulas 06, 07, 09 e 10
+e as executa com o RunnerBenchmark, em vários tamanhos de entrada.
+
+Exemplos:
+    python benchmarks/benchmark_aulas.py --tamanhos 1e3 1e5
+    python benchmarks/benchmark_aulas.py --filtro aula10 --saida output/atual.json
+    python benchmarks/benchmark_aulas.py --saida output/atual.json --baseline output/benchmark_aulas.json
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from executor_benchmark import main, registrar_caso
+
+CASOS = {}
+
+# AULA 06 - apply vs agg em groupby
+@registrar_caso(CASOS, 'aula06_groupby_apply_vs_agg', 'Soma por vendedor: apply vs agg')
+def preparar_vendas(n, rng):
+    vendedores = ['Ana Silva', 'João Santos', 'Maria Costa', 'Pedro Lima', 'Carlos Rocha']
+    return pd.DataFrame({
+        'vendedor': rng.choice(vendedores, n),
+        'valor_liquido': rng.uniform(50, 5000, n)
+    })
+
+@preparar_vendas.variante('apply', max_linhas=1_000_000)
+def groupby_apply(df):
+    return df.groupby('vendedor').apply(lambda x: x['valor_liquido'].sum())
+
+@preparar_vendas.variante('agg')
+def groupby_agg(df):
+    return df.groupby('vendedor')['valor_liquido'].sum()
+
+# AULA 07 - merge em coluna vs join em índice
+@registrar_caso(CASOS, 'aula07_merge_vs_join', 'Inner join: merge em coluna vs join em índice')
+def preparar_join(n, rng):
+    esquerda = pd.DataFrame({'id': np.arange(n), 'valor': rng.standard_normal(n)})
+    ids_direita = rng.choice(n, n // 2, replace=False)
+    direita = pd.DataFrame({'id': ids_direita, 'categoria': rng.choice(['A', 'B', 'C'], n // 2)})
+    return {
+        'esquerda': esquerda,
+        'direita': direita,
+        'esquerda_idx': esquerda.set_index('id'),
+        'direita_idx': direita.set_index('id')
+    }
+
+@preparar_join.variante('merge_coluna')
+def merge_coluna(dados):
+    return pd.merge(dados['esquerda'], dados['direita'], on='id')
+
+@preparar_join.variante('join_indice')
+def join_indice(dados):
+    return dados['esquerda_idx'].join(dados['direita_idx'], how='inner')
+
+@preparar_join.variante('join_indice_incluindo_set_index')
+def join_indice_com_set_index(dados):
+    # Custo real quando o índice não existe ainda
+    return dados['esquerda'].set_index('id').join(dados['direita'].set_index('id'), how='inner')
+
+# AULA 09 - pivot_table vs groupby + unstack
+@registrar_caso(CASOS, 'aula09_pivot_vs_groupby_unstack', 'Região x produto: pivot_table vs groupby+unstack')
+def preparar_pivot(n, rng):
+    return pd.DataFrame({
+        'regiao': rng.choice(['Norte', 'Sul', 'Sudeste', 'Nordeste'], n),
+        'produto': rng.choice(['Notebook', 'Mouse', 'Teclado', 'Monitor'], n),
+        'valor_liquido': rng.uniform(50, 3000, n)
+    })
+
+@preparar_pivot.variante('pivot_table')
+def pivot_table(df):
+    return df.pivot_table(values='valor_liquido', index='regiao', columns='produto', aggfunc='sum')
+
+@preparar_pivot.variante('groupby_unstack')
+def groupby_unstack(df):
+    return df.groupby(['regiao', 'produto'])['valor_liquido'].sum().unstack(fill_value=0)
+
+# AULA 10 - loop vs apply vs vectorização vs NumPy
+@registrar_caso(CASOS, 'aula10_multiplicacao', 'a * b: loop, apply, vectorização e NumPy')
+def preparar_multiplicacao(n, rng):
+    return pd.DataFrame({'a': rng.integers(1, 100, n), 'b': rng.integers(1, 100, n)})
+
+@preparar_multiplicacao.variante('loop', max_linhas=10_000)
+def metodo_loop(df):
+    resultado = []
+    for i in range(len(df)):
+        resultado.append(df.iloc[i]['a'] * df.iloc[i]['b'])
+    return resultado
+
+@preparar_multiplicacao.variante('apply', max_linhas=100_000)
+def metodo_apply(df):
+    return df.apply(lambda row: row['a'] * row['b'], axis=1)
+
+@preparar_multiplicacao.variante('vectorizado')
+def metodo_vectorizado(df):
+    return df['a'] * df['b']
+
+@preparar_multiplicacao.variante('numpy')
+def metodo_numpy(df):
+    return np.multiply(df['a'].values, df['b'].values)
+
+# AULA 10 - query vs boolean indexing
+@registrar_caso(CASOS, 'aula10_query_vs_boolean', 'Filtro a > 500 e categoria == X')
+def preparar_filtro(n, rng):
+    return pd.DataFrame({
+        'a': rng.integers(1, 1000, n),
+        'b': rng.integers(1, 1000, n),
+        'categoria': rng.choice(['X', 'Y', 'Z'], n)
+    })
+
+@preparar_filtro.variante('boolean_indexing')
+def filtro_boolean(df):
+    return df[(df['a'] > 500) & (df['categoria'] == 'X')]
+
+@preparar_filtro.variante('query')
+def filtro_query(df):
+    return df.query('a > 500 and categoria == "X"')
+
+# AULA 10 - .str vs apply
+@registrar_caso(CASOS, 'aula10_str_vs_apply', 'Upper em strings: .str vs apply')
+def preparar_strings(n, rng):
+    return pd.Series([f'Produto {i}' for i in rng.integers(1, 1000, n)])
+
+@preparar_strings.variante('str_upper')
+def str_upper(serie):
+    return serie.str.upper()
+
+@preparar_strings.variante('apply_upper')
+def apply_upper(serie):
+    return serie.apply(lambda x: x.upper())
+
+# AULA 10 - busca por id: scan booleano vs índice
+@registrar_caso(CASOS, 'aula10_busca_por_id', 'Busca id == n/2: scan booleano vs .loc em índice')
+def preparar_busca(n, rng):
+    df = pd.DataFrame({'id': np.arange(n), 'valor': rng.standard_normal(n)})
+    return {'df': df, 'df_idx': df.set_index('id'), 'alvo': n // 2}
+
+@preparar_busca.variante('scan_booleano')
+def busca_scan(dados):
+    return dados['df'][dados['df']['id'] == dados['alvo']]
+
+@preparar_busca.variante('loc_indice')
+def busca_indice(dados):
+    return dados['df_idx'].loc[dados['alvo']]
+
+
+if __name__ == '__main__':
+    sys.exit(main(CASOS, saida_padrao='output/benchmark_aulas.json'))
@@ -0,0 +1,175 @@
+"""
+Benchmark de formatos de arquivo
+================================
+
+A seção 2 da aula 12 compara CSV e Parquet padrão com uma escrita e uma
+leitura de 100k linhas. Aqui a comparação vira uma matriz, medida com o
+RunnerBenchmark sobre os schemas do gerador_dados em vários tamanhos:
+
+- formatos: CSV, JSON lines, Parquet (snappy/zstd/gzip, dicionário ligado
+  ou desligado, tamanhos de row group) e Feather/Arrow IPC (lz4, zstd e sem
+  compressão)
+- medidas: tempo de escrita, de leitura completa e de leitura de um
+  subconjunto de colunas, tamanho do arquivo e pico de memória
+
+Exemplos:
+    python benchmarks/benchmark_formatos.py --tamanhos 1e4 1e5 1e6
+    python benchmarks/benchmark_formatos.py --filtro metricas --repeticoes 3
+"""
+
+import atexit
+import functools
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from executor_benchmark import Caso, main
+from gerador_dados import gerar_dataframe
+
+# Schemas com perfis diferentes: misto com categorias, texto e numérico
+SCHEMAS = ['vendas', 'logs_sistema', 'metricas_performance']
+COLUNAS_SUBCONJUNTO = {
+    'vendas': ['data', 'preco_unitario'],
+    'logs_sistema': ['timestamp', 'status'],
+    'metricas_performance': ['servidor', 'cpu_percent'],
+}
+
+DIRETORIO = tempfile.mkdtemp(prefix='benchmark_formatos_')
+atexit.register(shutil.rmtree, DIRETORIO, ignore_errors=True)
+
+
+def _ler_json_lines(caminho, colunas=None):
+    # JSON não tem projeção de colunas: o arquivo inteiro é lido e depois recortado
+    df = pd.read_json(caminho, lines=True)
+    return df[colunas] if colunas else df
+
+
+def _parquet(**opcoes):
+    return {
+        'extensao': 'parquet',
+        'escrever': lambda df, caminho: df.to_parquet(caminho, index=False, **opcoes),
+        'ler': lambda caminho, colunas=None: pd.read_parquet(caminho, columns=colunas)
+    }
+
+
+def _feather(compressao):
+    return {
+        'extensao': 'feather',
+        'escrever': lambda df, caminho: df.to_feather(caminho, compression=compressao),
+        'ler': lambda caminho, colunas=None: pd.read_feather(caminho, columns=colunas)
+    }
+
+
+FORMATOS = {
+    'csv': {
+        'extensao': 'csv',
+        'escrever': lambda df, caminho: df.to_csv(caminho, index=False),
+        'ler': lambda caminho, colunas=None: pd.read_csv(caminho, usecols=colunas)
+    },
+    'json_lines': {
+        'extensao': 'jsonl',
+        'escrever': lambda df, caminho: df.to_json(caminho, orient='records', lines=True, date_format='iso'),
+        'ler': _ler_json_lines
+    },
+    'parquet_snappy': _parquet(compression='snappy'),
+    'parquet_zstd': _parquet(compression='zstd'),
+    'parquet_gzip': _parquet(compression='gzip'),
+    'parquet_snappy_sem_dicionario': _parquet(compression='snappy', use_dictionary=False),
+    'parquet_zstd_rg_64k': _parquet(compression='zstd', row_group_size=64 * 1024),
+    'parquet_zstd_rg_1m': _parquet(compression='zstd', row_group_size=1024 * 1024),
+    'feather_lz4': _feather('lz4'),
+    'feather_zstd': _feather('zstd'),
+    'feather_sem_compressao': _feather('uncompressed'),
+}
+
+
+def _caminho(schema, n, formato):
+    return os.path.join(DIRETORIO, f"{schema}_{n}_{formato}.{FORMATOS[formato]['extensao']}")
+
+
+@functools.lru_cache(maxsize=1)
+def _dados(schema, n):
+    """DataFrame do gerador (o mesmo para os três casos de um schema/tamanho)"""
+    return gerar_dataframe(schema, n)
+
+
+@functools.lru_cache(maxsize=None)
+def _arquivos(schema, n):
+    """Escrever os arquivos de todos os formatos uma vez, para os casos de leitura"""
+    df = _dados(schema, n)
+    for formato, spec in FORMATOS.items():
+        spec['escrever'](df, _caminho(schema, n, formato))
+    return n
+
+
+def _escrever(formato, dados):
+    FORMATOS[formato]['escrever'](dados['df'], _caminho(dados['schema'], dados['n'], formato))
+
+
+def _ler(formato, dados):
+    return FORMATOS[formato]['ler'](_caminho(dados['schema'], dados['n'], formato), dados['colunas'])
+
+
+def _tamanho(formato, dados):
+    tamanho = os.path.getsize(_caminho(dados['schema'], dados['n'], formato))
+    return {'tamanho_mb': round(tamanho / 1024 / 1024, 3)}
+
+
+CASOS = {}
+for schema in SCHEMAS:
+    def preparar_escrita(n, rng, schema=schema):
+        return {'schema': schema, 'n': n, 'df': _dados(schema, n)}
+
+    def preparar_leitura(n, rng, schema=schema, colunas=None):
+        _arquivos(schema, n)
+        return {'schema': schema, 'n': n, 'colunas': colunas}
+
+    casos_schema = {
+        'escrita': Caso(f'formatos_{schema}_escrita', preparar_escrita, f'{schema}: escrita do DataFrame inteiro'),
+        'leitura': Caso(f'formatos_{schema}_leitura', preparar_leitura, f'{schema}: leitura completa'),
+        'colunas': Caso(f'formatos_{schema}_colunas',
+                        functools.partial(preparar_leitura, schema=schema, colunas=COLUNAS_SUBCONJUNTO[schema]),
+                        f'{schema}: leitura de {COLUNAS_SUBCONJUNTO[schema]}'),
+    }
+    for formato in FORMATOS:
+        casos_schema['escrita'].variante(formato, extras=functools.partial(_tamanho, formato))(
+            functools.partial(_escrever, formato))
+        casos_schema['leitura'].variante(formato)(functools.partial(_ler, formato))
+        casos_schema['colunas'].variante(formato)(functools.partial(_ler, formato))
+    CASOS.update({caso.nome: caso for caso in casos_schema.values()})
+
+
+def matriz_formatos(runner):
+    """Uma linha por schema/tamanho/formato com todas as medidas lado a lado"""
+    if not runner.resultados:
+        return
+    df = pd.DataFrame(runner.resultados)
+    partes = df['caso'].str.extract(r'^formatos_(?P<schema>.+)_(?P<operacao>escrita|leitura|colunas)$')
+    df = pd.concat([df, partes], axis=1)
+    df['ms'] = df['mediana_s'] * 1000
+    df['pico_mb'] = df['pico_memoria_bytes'] / 1024 / 1024
+
+    matriz = df.pivot_table(index=['schema', 'linhas', 'variante'], columns='operacao',
+                            values=['ms', 'pico_mb'], aggfunc='first')
+    matriz.columns = [f"{operacao}_{medida}" for medida, operacao in matriz.columns]
+    if 'tamanho_mb' in df:
+        # Tamanho do arquivo vem das variantes de escrita
+        escrita = df.dropna(subset=['tamanho_mb'])
+        matriz['tamanho_mb'] = escrita.set_index(['schema', 'linhas', 'variante'])['tamanho_mb']
+    ordem = ['escrita_ms', 'leitura_ms', 'colunas_ms', 'tamanho_mb',
+             'escrita_pico_mb', 'leitura_pico_mb', 'colunas_pico_mb']
+    matriz = matriz[[coluna for coluna in ordem if coluna in matriz]]
+
+    print("\nMATRIZ DE FORMATOS (ms = mediana; pico = tracemalloc + pool do Arrow):")
+    for (schema, linhas), grupo in matriz.groupby(level=['schema', 'linhas']):
+        print(f"\n{schema} - {linhas:,} linhas")
+        grupo = grupo.droplevel(['schema', 'linhas'])
+        print(grupo.sort_values(grupo.columns[0]).round(2).to_string())
+
+
+if __name__ == '__main__':
+    sys.exit(main(CASOS, saida_padrao='output/benchmark_formatos.json', tamanhos_padrao=(1e4, 1e5, 1e6),
+                  relatorio=matriz_formatos))
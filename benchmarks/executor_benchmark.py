@@ -0,0 +1,294 @@
+"""
+Executor de benchmarks reprodutíveis
+====================================
+
+Substitui as comparações com um único time.time() das aulas por medições
+repetidas: warmup, várias repetições com perf_counter, varredura de tamanhos
+de entrada, mediana/IQR, pico de memória (tracemalloc mais o pool de memória
+do Arrow, quando pyarrow está instalado) e comparação com um baseline salvo
+em JSON para detectar regressões.
+
+Uso típico (ver benchmark_aulas.py):
+
+    runner = RunnerBenchmark(repeticoes=7, warmup=1)
+    runner.executar(CASOS, tamanhos=[1_000, 100_000])
+    runner.salvar_json('output/benchmark.json')
+    runner.comparar_baseline('output/baseline.json')
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class Caso:
+    """Um cenário de benchmark: gera os dados e compara variantes da mesma operação"""
+    
+    def __init__(self, nome, preparar, descricao=''):
+        self.nome = nome
+        self.preparar = preparar  # preparar(n_linhas, rng) -> dados
+        self.descricao = descricao
+        self.variantes = {}
+    
+    def variante(self, nome, max_linhas=None, extras=None):
+        """Decorator para registrar uma variante (max_linhas limita variantes lentas)
+
+        extras(dados) -> dict: métricas adicionais gravadas junto com a medição
+        (ex: tamanho do arquivo gerado), calculadas depois das repetições
+        """
+        def decorator(func):
+            self.variantes[nome] = {'func': func, 'max_linhas': max_linhas, 'extras': extras}
+            return func
+        return decorator
+
+
+def registrar_caso(registro, nome, descricao=''):
+    """Decorator para registrar a função de preparação de um caso em um dicionário"""
+    def decorator(preparar):
+        caso = Caso(nome, preparar, descricao)
+        registro[nome] = caso
+        return caso
+    return decorator
+
+
+class RunnerBenchmark:
+    """Executar casos registrados com repetições, varredura de tamanhos e baseline"""
+    
+    def __init__(self, repeticoes=7, warmup=1, tempo_minimo=0.005, limite_segundos=10.0, semente=42):
+        self.repeticoes = repeticoes
+        self.warmup = warmup
+        self.tempo_minimo = tempo_minimo        # Tempo mínimo por repetição (agrupa loops rápidos)
+        self.limite_segundos = limite_segundos  # Variante mais lenta que isso não sobe de tamanho
+        self.semente = semente
+        self.resultados = []
+    
+    def _calibrar_loops(self, func, dados):
+        """Número de chamadas por repetição para medir acima do tempo mínimo (como timeit)"""
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func(dados)
+            decorrido = time.perf_counter() - start
+            if decorrido >= self.tempo_minimo or loops >= 1_000_000:
+                return loops
+            loops *= 2
+    
+    def _pico_memoria(self, func, dados):
+        """Pico de memória alocada em uma execução isolada (fora da medição de tempo)
+
+        O tracemalloc não enxerga os buffers do Arrow (leitura/escrita de
+        Parquet e Feather): eles são contados por um pool proxy próprio.
+        """
+        ja_rastreando = tracemalloc.is_tracing()
+        if not ja_rastreando:
+            tracemalloc.start()
+        pool_padrao = pool_arrow = None
+        if pa is not None:
+            pool_padrao = pa.default_memory_pool()
+            pool_arrow = pa.proxy_memory_pool(pool_padrao)
+            pa.set_memory_pool(pool_arrow)
+        tracemalloc.reset_peak()
+        inicio, _ = tracemalloc.get_traced_memory()
+        try:
+            func(dados)
+        finally:
+            _, pico = tracemalloc.get_traced_memory()
+            if pool_arrow is not None:
+                pa.set_memory_pool(pool_padrao)
+            if not ja_rastreando:
+                tracemalloc.stop()
+        return pico - inicio + (pool_arrow.max_memory() if pool_arrow is not None else 0)
+    
+    def medir(self, func, dados):
+        """Medir uma variante: warmup, calibração, repetições e pico de memória"""
+        for _ in range(self.warmup):
+            func(dados)
+        
+        loops = self._calibrar_loops(func, dados)
+        tempos = []
+        gc_ativo = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(self.repeticoes):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    func(dados)
+                tempos.append((time.perf_counter() - start) / loops)
+        finally:
+            if gc_ativo:
+                gc.enable()
+        
+        q1, mediana, q3 = np.percentile(tempos, [25, 50, 75])
+        return {
+            'mediana_s': float(mediana),
+            'q1_s': float(q1),
+            'q3_s': float(q3),
+            'iqr_s': float(q3 - q1),
+            'min_s': float(min(tempos)),
+            'repeticoes': self.repeticoes,
+            'loops': loops,
+            'pico_memoria_bytes': int(self._pico_memoria(func, dados))
+        }
+    
+    def executar(self, casos, tamanhos, filtro=None):
+        """Rodar todos os casos (ou os que contêm `filtro` no nome) em todos os tamanhos"""
+        for nome_caso, caso in casos.items():
+            if filtro and filtro not in nome_caso:
+                continue
+            
+            print(f"\n{nome_caso}: {caso.descricao}")
+            lentas = set()
+            for n_linhas in tamanhos:
+                rng = np.random.default_rng(self.semente)
+                dados = caso.preparar(int(n_linhas), rng)
+                
+                for nome_variante, variante in caso.variantes.items():
+                    max_linhas = variante['max_linhas']
+                    if nome_variante in lentas or (max_linhas and n_linhas > max_linhas):
+                        continue
+                    
+                    medicao = self.medir(variante['func'], dados)
+                    extras = variante['extras'](dados) if variante['extras'] else {}
+                    self.resultados.append({
+                        'caso': nome_caso,
+                        'variante': nome_variante,
+                        'linhas': int(n_linhas),
+                        **medicao,
+                        **extras
+                    })
+                    print(f"  {int(n_linhas):>12,} | {nome_variante:<28} "
+                          f"{medicao['mediana_s']*1000:>11.3f} ms ± {medicao['iqr_s']*1000:.3f} "
+                          f"| pico {medicao['pico_memoria_bytes']/1024/1024:.2f} MB"
+                          + "".join(f" | {chave} {valor}" for chave, valor in extras.items()))
+                    
+                    if medicao['mediana_s'] > self.limite_segundos:
+                        lentas.add(nome_variante)
+                
+                del dados
+        return self
+    
+    def resumo(self):
+        """Variante mais rápida por caso/tamanho e speedup sobre as demais"""
+        if not self.resultados:
+            return pd.DataFrame()
+        
+        df = pd.DataFrame(self.resultados)
+        linhas = []
+        for (caso, n_linhas), grupo in df.groupby(['caso', 'linhas']):
+            grupo = grupo.sort_values('mediana_s')
+            mais_rapida = grupo.iloc[0]
+            for _, row in grupo.iloc[1:].iterrows():
+                linhas.append({
+                    'caso': caso,
+                    'linhas': n_linhas,
+                    'mais_rapida': mais_rapida['variante'],
+                    'comparada': row['variante'],
+                    'speedup': row['mediana_s'] / mais_rapida['mediana_s'],
+                    # Sobreposição dos intervalos interquartis = diferença dentro do ruído
+                    'significativo': row['q1_s'] > mais_rapida['q3_s']
+                })
+        return pd.DataFrame(linhas)
+    
+    def metadados(self):
+        """Ambiente da execução (necessário para comparar baselines honestamente)"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'processador': platform.processor(),
+            'cpus': os.cpu_count(),
+            'repeticoes': self.repeticoes,
+            'warmup': self.warmup,
+            'semente': self.semente
+        }
+    
+    def salvar_json(self, arquivo):
+        """Salvar resultados e metadados em JSON"""
+        os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            json.dump({'metadados': self.metadados(), 'resultados': self.resultados}, f, indent=2)
+        return arquivo
+    
+    def comparar_baseline(self, arquivo_baseline, tolerancia=0.10):
+        """Comparar com um baseline salvo; retorna (regressões, melhorias)
+
+        Uma regressão exige mediana acima de (1 + tolerancia) × baseline E diferença
+        maior que o IQR das duas medições (para não sinalizar ruído).
+        """
+        with open(arquivo_baseline, encoding='utf-8') as f:
+            baseline = pd.DataFrame(json.load(f)['resultados'])
+        
+        atual = pd.DataFrame(self.resultados)
+        comparacao = atual.merge(baseline, on=['caso', 'variante', 'linhas'], suffixes=('', '_base'))
+        comparacao['razao'] = comparacao['mediana_s'] / comparacao['mediana_s_base']
+        ruido = np.maximum(comparacao['iqr_s'], comparacao['iqr_s_base'])
+        diferenca = comparacao['mediana_s'] - comparacao['mediana_s_base']
+        
+        comparacao['regressao'] = (comparacao['razao'] > 1 + tolerancia) & (diferenca > ruido)
+        comparacao['melhoria'] = (comparacao['razao'] < 1 - tolerancia) & (-diferenca > ruido)
+        
+        colunas = ['caso', 'variante', 'linhas', 'mediana_s_base', 'mediana_s', 'razao']
+        return comparacao.loc[comparacao['regressao'], colunas], comparacao.loc[comparacao['melhoria'], colunas]
+
+
+def main(casos, argv=None, saida_padrao='output/benchmark.json', tamanhos_padrao=(1e3, 1e4, 1e5, 1e6, 1e7),
+         relatorio=None):
+    """CLI comum para os scripts de benchmark (relatorio(runner): tabela extra antes do resumo)"""
+    parser = argparse.ArgumentParser(description="Executar benchmarks reprodutíveis")
+    parser.add_argument('--tamanhos', type=float, nargs='+', default=list(tamanhos_padrao),
+                        help="Números de linhas (ex: 1e3 1e5 1e7)")
+    parser.add_argument('--repeticoes', type=int, default=7)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--limite-segundos', type=float, default=10.0,
+                        help="Não executar tamanhos maiores para variantes acima deste tempo")
+    parser.add_argument('--filtro', help="Executar apenas casos cujo nome contém este texto")
+    parser.add_argument('--saida', default=saida_padrao)
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.10)
+    args = parser.parse_args(argv)
+    if args.baseline and os.path.abspath(args.saida) == os.path.abspath(args.baseline):
+        # Salvar por cima do baseline apagaria a referência da comparação
+        parser.error("--saida e --baseline apontam para o mesmo arquivo; use outra --saida")
+    
+    runner = RunnerBenchmark(repeticoes=args.repeticoes, warmup=args.warmup,
+                             limite_segundos=args.limite_segundos)
+    runner.executar(casos, [int(t) for t in args.tamanhos], filtro=args.filtro)
+    
+    if relatorio is not None:
+        relatorio(runner)
+    
+    print("\nRESUMO (mais rápida vs demais):")
+    resumo = runner.resumo()
+    if not resumo.empty:
+        print(resumo.round(2).to_string(index=False))
+    
+    regressoes = None
+    if args.baseline:
+        regressoes, melhorias = runner.comparar_baseline(args.baseline, args.tolerancia)
+        print(f"\nComparação com baseline {args.baseline}:")
+        print(f"Melhorias: {len(melhorias)}")
+        if not melhorias.empty:
+            print(melhorias.round(4).to_string(index=False))
+        print(f"Regressões: {len(regressoes)}")
+        if not regressoes.empty:
+            print(regressoes.round(4).to_string(index=False))
+    
+    print(f"\n✓ Resultados salvos em {runner.salvar_json(args.saida)}")
+    return 1 if regressoes is not None and not regressoes.empty else 0
@@ -0,0 +1,307 @@
+"""
+Gerador de dados sintéticos em escala
+=====================================
+
+Gera os schemas usados nas aulas (vendas, clientes, pedidos, produtos,
+logs_sistema e metricas_performance) de forma vetorizada, em chunks de
+memória limitada, escrevendo direto em Parquet ou CSV.
+
+- Determinístico: cada chunk usa uma seed derivada de (semente, schema,
+  partição, chunk); a mesma chamada sempre gera os mesmos arquivos
+- IDs e timestamps derivam do número global da linha, então partições
+  geradas em paralelo (ou separadamente) se encaixam sem sobreposição
+- Strings são montadas com pyarrow.compute ou como dicionário (categoria),
+  nunca com list comprehensions em Python
+
+Exemplos:
+    python benchmarks/gerador_dados.py vendas 1e9 --destino output/carga --workers 32
+    python benchmarks/gerador_dados.py metricas_performance 1e7 --formato csv
+
+    from gerador_dados import gerar_dataframe
+    df = gerar_dataframe('pedidos', 100_000)
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Dimensões compartilhadas pelos schemas (mesmos valores dos arquivos em data/)
+VENDEDORES = ['Ana Silva', 'João Santos', 'Maria Costa', 'Pedro Lima', 'Carlos Rocha', 'Lucia Mendes']
+REGIOES = ['Sudeste', 'Sul', 'Nordeste', 'Norte', 'Centro-Oeste']
+CIDADES = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Salvador', 'Brasília']
+SEGMENTOS = ['Corporativo', 'Varejo', 'Governo']
+STATUS_PEDIDO = ['Pendente', 'Processando', 'Enviado', 'Entregue']
+CATEGORIAS = ['Eletrônicos', 'Acessórios', 'Rede', 'Casa', 'Esporte']
+CATALOGO = pd.DataFrame({
+    'nome_produto': ['Notebook Dell', 'Mouse Logitech', 'Teclado Mecânico', 'Monitor 24"', 'Headset Gamer',
+                     'Webcam Full HD', 'Impressora Canon', 'Tablet iPad', 'Smartphone Samsung', 'SSD 1TB',
+                     'Roteador Wi-Fi', 'Cabo HDMI', 'Carregador Portátil', 'Caixa de Som Bluetooth',
+                     'Notebook HP'],
+    'categoria': ['Eletrônicos', 'Acessórios', 'Acessórios', 'Eletrônicos', 'Acessórios',
+                  'Acessórios', 'Eletrônicos', 'Eletrônicos', 'Eletrônicos', 'Eletrônicos',
+                  'Rede', 'Acessórios', 'Acessórios', 'Eletrônicos', 'Eletrônicos'],
+    'preco_base': [2500.0, 85.5, 320.0, 899.0, 220.0, 180.0, 450.0, 1200.0, 800.0, 380.0,
+                   280.0, 25.0, 95.0, 150.0, 2300.0]
+})
+ACOES = ['login', 'logout', 'upload_arquivo', 'download_arquivo', 'consulta', 'exportacao']
+USER_AGENTS = ['Mozilla/5.0', 'Chrome/96.0', 'Safari/15.1', 'Edge/96.0', 'curl/7.79']
+TIPOS_SERVIDOR = ['web', 'api', 'db', 'cache', 'worker']
+
+# Parâmetros padrão (relações entre schemas e período coberto)
+PARAMETROS_PADRAO = {
+    'n_clientes': 1_000_000,
+    'n_usuarios': 100_000,
+    'n_servidores': 50,
+    'inicio': '2024-01-01',
+    'passo_segundos': 1,          # Intervalo médio entre eventos (vendas, pedidos, logs)
+    'passo_metricas_segundos': 60  # Resolução das métricas por servidor
+}
+
+
+def _categoria(rng, categorias, n, p=None):
+    """Coluna categórica a partir de códigos inteiros (sem criar strings por linha)"""
+    codigos = rng.choice(len(categorias), n, p=p).astype('int8' if len(categorias) < 128 else 'int32')
+    return pa.DictionaryArray.from_arrays(pa.array(codigos), pa.array(categorias))
+
+
+def _texto(prefixo, numeros, sufixo=''):
+    """'prefixo{numero}sufixo' vetorizado com pyarrow.compute"""
+    return pc.binary_join_element_wise(prefixo, pc.cast(pa.array(numeros), pa.string()), sufixo, '')
+
+
+def _timestamps(params, linhas, rng, passo):
+    """Timestamps crescentes com o número global da linha, com jitter dentro do passo"""
+    inicio = np.datetime64(params['inicio'], 's')
+    segundos = linhas * passo + rng.integers(0, max(1, passo), len(linhas))
+    return pa.array(inicio + segundos.astype('timedelta64[s]'))
+
+
+def gerar_vendas(rng, linhas, params):
+    n = len(linhas)
+    produto = rng.integers(0, len(CATALOGO), n)
+    preco = CATALOGO['preco_base'].to_numpy()[produto] * rng.uniform(0.9, 1.1, n)
+    return pa.table({
+        'venda_id': pa.array(linhas + 1),
+        'data': _timestamps(params, linhas, rng, params['passo_segundos']),
+        'cliente_id': pa.array(rng.integers(1, params['n_clientes'] + 1, n)),
+        'vendedor': _categoria(rng, VENDEDORES, n),
+        'produto': pa.DictionaryArray.from_arrays(pa.array(produto.astype('int8')),
+                                                  pa.array(CATALOGO['nome_produto'])),
+        'categoria': pa.DictionaryArray.from_arrays(
+            pa.array(pd.Categorical(CATALOGO['categoria'], categories=CATEGORIAS).codes[produto]),
+            pa.array(CATEGORIAS)),
+        'quantidade': pa.array(rng.integers(1, 20, n).astype('int16')),
+        'preco_unitario': pa.array(preco.round(2)),
+        'regiao': _categoria(rng, REGIOES, n)
+    })
+
+
+def gerar_clientes(rng, linhas, params):
+    n = len(linhas)
+    ids = linhas + 1
+    return pa.table({
+        'cliente_id': pa.array(ids),
+        'nome': _texto('Cliente ', ids),
+        'email': _texto('cliente', ids, '@email.com'),
+        'cidade': _categoria(rng, CIDADES, n),
+        'segmento': _categoria(rng, SEGMENTOS, n, p=[0.2, 0.7, 0.1]),
+        'data_cadastro': _timestamps(params, linhas, rng, 600)
+    })
+
+
+def gerar_pedidos(rng, linhas, params):
+    n = len(linhas)
+    return pa.table({
+        'pedido_id': pa.array(linhas + 1),
+        'cliente_id': pa.array(rng.integers(1, params['n_clientes'] + 1, n)),
+        'valor': pa.array(rng.uniform(50, 1000, n).round(2)),
+        'data_pedido': _timestamps(params, linhas, rng, params['passo_segundos']),
+        'status': _categoria(rng, STATUS_PEDIDO, n, p=[0.1, 0.15, 0.25, 0.5])
+    })
+
+
+def gerar_produtos(rng, linhas, params):
+    n = len(linhas)
+    ids = linhas + 1
+    return pa.table({
+        'produto_id': pa.array(ids),
+        'nome_produto': _texto('Produto ', ids),
+        'categoria': _categoria(rng, CATEGORIAS, n),
+        'preco_sugerido': pa.array(np.exp(rng.normal(5, 1.2, n)).round(2))  # Log-normal: muitos baratos
+    })
+
+
+def gerar_logs_sistema(rng, linhas, params):
+    n = len(linhas)
+    octetos = [pc.cast(pa.array(rng.integers(0, 256, n)), pa.string()) for _ in range(2)]
+    return pa.table({
+        'timestamp': _timestamps(params, linhas, rng, params['passo_segundos']),
+        'usuario': _texto('user', rng.integers(1, params['n_usuarios'] + 1, n)),
+        'acao': _categoria(rng, ACOES, n, p=[0.25, 0.2, 0.15, 0.2, 0.15, 0.05]),
+        'status': _categoria(rng, ['sucesso', 'falha'], n, p=[0.93, 0.07]),
+        'ip_address': pc.binary_join_element_wise('192.168.', octetos[0], '.', octetos[1], ''),
+        'user_agent': _categoria(rng, USER_AGENTS, n)
+    })
+
+
+def gerar_metricas_performance(rng, linhas, params):
+    # Grade (instante, servidor): a linha i é o servidor i % n_servidores no instante i // n_servidores
+    n = len(linhas)
+    n_servidores = params['n_servidores']
+    servidor = linhas % n_servidores
+    instante = linhas // n_servidores
+    nomes = [f'srv-{TIPOS_SERVIDOR[i % len(TIPOS_SERVIDOR)]}-{i // len(TIPOS_SERVIDOR) + 1:02d}'
+             for i in range(n_servidores)]
+
+    inicio = np.datetime64(params['inicio'], 's')
+    passo = params['passo_metricas_segundos']
+    data_hora = inicio + (instante * passo).astype('timedelta64[s]')
+
+    # Carga base por servidor + ciclo diário + ruído
+    hora = (instante * passo / 3600) % 24
+    ciclo = np.sin((hora - 6) / 24 * 2 * np.pi)
+    base_cpu = 30 + (servidor * 37 % 40)
+    cpu = np.clip(base_cpu + 15 * ciclo + rng.normal(0, 5, n), 0, 100)
+    memoria = np.clip(55 + (servidor * 13 % 30) + 5 * ciclo + rng.normal(0, 2, n), 0, 100)
+    disco = np.clip(50 + (servidor * 7 % 40) + instante * passo / 86400 * 0.05, 0, 100)
+    rede_in = np.maximum(0, 100 + 60 * ciclo + rng.normal(0, 15, n))
+
+    return pa.table({
+        'data_hora': pa.array(data_hora),
+        'servidor': pa.DictionaryArray.from_arrays(pa.array(servidor.astype('int32')), pa.array(nomes)),
+        'cpu_percent': pa.array(cpu.round(1)),
+        'memoria_percent': pa.array(memoria.round(1)),
+        'disco_percent': pa.array(disco.round(1)),
+        'rede_in_mb': pa.array(rede_in.round(1)),
+        'rede_out_mb': pa.array((rede_in * rng.uniform(0.6, 0.8, n)).round(1))
+    })
+
+
+SCHEMAS = {
+    'vendas': gerar_vendas,
+    'clientes': gerar_clientes,
+    'pedidos': gerar_pedidos,
+    'produtos': gerar_produtos,
+    'logs_sistema': gerar_logs_sistema,
+    'metricas_performance': gerar_metricas_performance,
+}
+
+
+def gerar_chunk(schema, inicio, n_linhas, semente=42, particao=0, indice_chunk=0, parametros=None):
+    """Gerar as linhas [inicio, inicio + n_linhas) de um schema como pyarrow.Table"""
+    params = {**PARAMETROS_PADRAO, **(parametros or {})}
+    chave_schema = zlib.crc32(schema.encode())
+    rng = np.random.default_rng(np.random.SeedSequence(semente, spawn_key=(chave_schema, particao, indice_chunk)))
+    linhas = np.arange(inicio, inicio + n_linhas, dtype='int64')
+    return SCHEMAS[schema](rng, linhas, params)
+
+
+def _escrever_particao(tarefa):
+    """Gerar uma partição chunk a chunk, escrevendo incrementalmente (executa no worker)"""
+    schema, particao, inicio, n_linhas, arquivo, formato, chunk_size, semente, parametros, compressao = tarefa
+    escritor = None
+    schema_csv = None
+    start = time.perf_counter()
+
+    try:
+        for indice_chunk, deslocamento in enumerate(range(0, n_linhas, chunk_size)):
+            tamanho = min(chunk_size, n_linhas - deslocamento)
+            tabela = gerar_chunk(schema, inicio + deslocamento, tamanho, semente, particao, indice_chunk, parametros)
+
+            if escritor is None:
+                if formato == 'parquet':
+                    escritor = pq.ParquetWriter(arquivo, tabela.schema, compression=compressao)
+                else:
+                    # CSV não tem dicionário: materializa as strings só na escrita
+                    schema_csv = pa.schema(
+                        [pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+                         for f in tabela.schema])
+                    escritor = pa_csv.CSVWriter(arquivo, schema_csv)
+
+            if formato == 'csv':
+                tabela = tabela.cast(schema_csv)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    return {'arquivo': arquivo, 'linhas': n_linhas, 'bytes': os.path.getsize(arquivo),
+            'segundos': time.perf_counter() - start}
+
+
+def gerar_dataset(schema, n_linhas, destino, formato='parquet', linhas_por_particao=10_000_000,
+                  chunk_size=1_000_000, semente=42, n_workers=None, parametros=None, compressao='snappy'):
+    """Gerar um dataset particionado em disco (uma partição por arquivo, em paralelo)
+
+    Memória por worker ~ um chunk; ex: 1e9 linhas = 100 partições de 1e7,
+    escritas em chunks de 1e6 linhas por n_workers processos.
+    """
+    if schema not in SCHEMAS:
+        raise ValueError(f"Schema desconhecido: {schema}. Opções: {list(SCHEMAS)}")
+    if formato not in ('parquet', 'csv'):
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    pasta = os.path.join(destino, schema)
+    os.makedirs(pasta, exist_ok=True)
+
+    tarefas = []
+    for particao, inicio in enumerate(range(0, int(n_linhas), linhas_por_particao)):
+        tamanho = min(linhas_por_particao, int(n_linhas) - inicio)
+        arquivo = os.path.join(pasta, f'part-{particao:05d}.{formato}')
+        tarefas.append((schema, particao, inicio, tamanho, arquivo, formato,
+                        chunk_size, semente, parametros, compressao))
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tarefas))
+    if n_workers <= 1:
+        return [_escrever_particao(tarefa) for tarefa in tarefas]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(_escrever_particao, tarefas))
+
+
+def gerar_dataframe(schema, n_linhas, semente=42, parametros=None, chunk_size=1_000_000):
+    """Gerar um DataFrame em memória (colunas de dicionário viram category)"""
+    tabelas = [gerar_chunk(schema, inicio, min(chunk_size, int(n_linhas) - inicio), semente, 0, i, parametros)
+               for i, inicio in enumerate(range(0, int(n_linhas), chunk_size))]
+    return pa.concat_tables(tabelas).to_pandas()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerar dados sintéticos dos schemas das aulas")
+    parser.add_argument('schema', choices=list(SCHEMAS))
+    parser.add_argument('linhas', type=float, help="Número de linhas (ex: 1e9)")
+    parser.add_argument('--destino', default='output/dados_sinteticos')
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--linhas-por-particao', type=float, default=1e7)
+    parser.add_argument('--chunk-size', type=float, default=1e6)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--compressao', default='snappy')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    arquivos = gerar_dataset(args.schema, int(args.linhas), args.destino, args.formato,
+                             int(args.linhas_por_particao), int(args.chunk_size), args.semente,
+                             args.workers, compressao=args.compressao)
+    tempo = time.perf_counter() - start
+
+    total_linhas = sum(a['linhas'] for a in arquivos)
+    total_bytes = sum(a['bytes'] for a in arquivos)
+    print(f"✓ {args.schema}: {total_linhas:,} linhas em {len(arquivos)} arquivos "
+          f"({total_bytes / 1024 / 1024:.1f} MB) em {tempo:.1f}s "
+          f"({total_linhas / tempo:,.0f} linhas/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())